@@ -0,0 +1,111 @@
+"""转换准入控制：按估算的内存占用和并发数限制同时进行的转换，超出时短暂排队或拒绝"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+    """服务繁忙，转换未被接受；retry_after 为建议的重试等待秒数"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_memory_cost(compressed_size, document_xml_size, config):
+    """估算转换一个文档的峰值内存（字节）
+
+    主要开销是lxml解析 document.xml 后的元素树和python-docx对象，与其解压后大小近似成正比
+    （document.xml 的大小见 package_inspector.inspect_package）。
+    """
+    return int(config['base_cost'] + compressed_size * config['compressed_factor'] +
+               document_xml_size * config['xml_factor'])
+
+
+class AdmissionController:
+    """限制同时进行的转换
+
+    - 同时进行的转换数不超过 max_concurrent，估算内存之和不超过 memory_budget；
+      单个估算超过预算的文档在没有其他转换进行时仍可单独执行
+    - 暂时不能执行的请求按到达顺序排队，最多等待 queue_timeout 秒；
+      排队数达到 max_queue 或等待超时时抛出 AdmissionRejected
+    """
+
+    def __init__(self, max_concurrent, memory_budget, max_queue=32, queue_timeout=10, retry_after=5):
+        self.max_concurrent = max_concurrent
+        self.memory_budget = memory_budget
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._active = 0
+        self._reserved = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def _fits(self, cost):
+        if self._active == 0:
+            return True
+        return self._active < self.max_concurrent and self._reserved + cost <= self.memory_budget
+
+    @contextmanager
+    def admit(self, cost):
+        """在准入的情况下执行with块，块结束时释放占用"""
+        self.acquire(cost)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+    def acquire(self, cost):
+        ticket = object()
+        deadline = time.monotonic() + self.queue_timeout
+        with self._condition:
+            if not self._queue and self._fits(cost):
+                self._grant(cost)
+                return
+
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected('服务繁忙，转换队列已满，请稍后重试', self.retry_after)
+
+            # 按到达顺序排队，只有队首可以开始转换
+            self._queue.append(ticket)
+            try:
+                while not (self._queue[0] is ticket and self._fits(cost)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise AdmissionRejected('服务繁忙，等待转换超时，请稍后重试', self.retry_after)
+                    self._condition.wait(remaining)
+                self._grant(cost)
+            finally:
+                self._queue.remove(ticket)
+                # 队首变化，唤醒其他等待者检查是否轮到自己
+                self._condition.notify_all()
+
+    def _grant(self, cost):
+        self._active += 1
+        self._reserved += cost
+        self.admitted += 1
+
+    def release(self, cost):
+        with self._condition:
+            self._active -= 1
+            self._reserved -= cost
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'active': self._active,
+                'queued': len(self._queue),
+                'reserved_memory': self._reserved,
+                'memory_budget': self.memory_budget,
+                'max_concurrent': self.max_concurrent,
+                'admitted': self.admitted,
+                'rejected': self.rejected
+            }
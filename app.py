@@ -1,13 +1,303 @@
-from flask import Flask, request, jsonify, render_template_string, send_from_directory
-from word_to_html_converter import word_to_html_array
+from flask import Flask, request, jsonify, send_file, has_request_context
+from werkzeug.exceptions import HTTPException
+from word_to_html_converter import (content_hash, download_word_from_url, load_word_document,
+                                    convert_document, document_to_html_array, document_outline, SelectionError,
+                                    conversion_deadline)
+from upload_store import UploadStore
+from chunked_upload import ChunkedUploadManager, LimitedReader, UploadTooLarge, OffsetMismatch
+from frontend import FrontendAssets
+from response_codec import negotiate_format, negotiate_encoding, encode_payload, compress
+from version_store import VersionStore
+from image_store import image_store_from_config
+from single_flight import SingleFlight, SingleFlightTimeout
+from deadline import ConversionTimeout
+from warmup import WarmUp
+from memory_monitor import MemoryMonitor
+from prefetch import Prefetcher, PrefetchQueueFull
+from conversion_pool import convert_in_pool
+from result_cache import create_result_cache
+from admission import AdmissionController, AdmissionRejected, estimate_memory_cost
+from package_inspector import DocumentRejected, inspect_package
 import os
 import time
-import datetime
 import threading
 import logging
-from config import SERVER_CONFIG, UPLOAD_CONFIG, CONVERT_CONFIG, API_CONFIG, CLEANUP_CONFIG
+from config import SERVER_CONFIG, UPLOAD_CONFIG, CONVERT_CONFIG, API_CONFIG, CLEANUP_CONFIG, STATIC_CONFIG, RESPONSE_CONFIG, VERSION_CONFIG, IMAGE_CONFIG, COALESCE_CONFIG, CACHE_CONFIG, ADMISSION_CONFIG, PACKAGE_CONFIG, WARMUP_CONFIG, MEMORY_CONFIG, PREFETCH_CONFIG
 
 app = Flask(__name__)
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_CONFIG['max_content_length']
+app.config['USE_X_SENDFILE'] = SERVER_CONFIG['use_x_sendfile']
+# JSON响应直接输出UTF-8，不把中文转义为\uXXXX
+app.json.ensure_ascii = False
+
+# 上传文件存储（带元数据索引、容量配额和过期堆）
+upload_store = UploadStore(
+    UPLOAD_CONFIG['upload_dir'],
+    max_total_size=UPLOAD_CONFIG['max_total_size'],
+    retention_seconds=CLEANUP_CONFIG['retention_days'] * 24 * 60 * 60 if CLEANUP_CONFIG['enabled'] else None,
+    shard_depth=UPLOAD_CONFIG['shard_depth']
+)
+
+# 文档图片存储（按内容哈希去重，跨文档共用）
+image_store = image_store_from_config(
+    IMAGE_CONFIG,
+    retention_seconds=CLEANUP_CONFIG['retention_days'] * 24 * 60 * 60 if CLEANUP_CONFIG['enabled'] else None,
+    shard_depth=UPLOAD_CONFIG['shard_depth']
+)
+
+# 文档版本记录（增量重新转换）
+version_store = VersionStore(VERSION_CONFIG['max_versions'], VERSION_CONFIG['max_cached_chars'])
+
+# 前端页面资源（启动时构建并预压缩）
+frontend_assets = FrontendAssets()
+
+# 分块上传会话（断点续传）
+chunked_uploads = ChunkedUploadManager(
+    UPLOAD_CONFIG['upload_dir'],
+    max_size=UPLOAD_CONFIG['max_content_length'],
+    session_ttl=UPLOAD_CONFIG['chunk_session_ttl']
+)
+
+# 转换结果缓存（多个工作进程共享），有效期与上传文件保留天数一致
+result_cache = create_result_cache(
+    CACHE_CONFIG,
+    ttl=CLEANUP_CONFIG['retention_days'] * 24 * 60 * 60 if CLEANUP_CONFIG['enabled'] else None
+)
+
+# 并发请求合并：同一URL的下载、同一内容和参数的转换各只执行一次
+downloads = SingleFlight('下载')
+conversions = SingleFlight('转换')
+
+# 转换准入控制：按估算内存和并发数限制同时进行的转换
+admission = AdmissionController(
+    ADMISSION_CONFIG['max_concurrent'],
+    ADMISSION_CONFIG['memory_budget'],
+    max_queue=ADMISSION_CONFIG['max_queue'],
+    queue_timeout=ADMISSION_CONFIG['queue_timeout'],
+    retry_after=ADMISSION_CONFIG['retry_after']
+) if ADMISSION_CONFIG['enabled'] else None
+
+# 转换内存统计：每次转换的RSS峰值、抽样的Python分配峰值和最近转换的汇总（见 /health）
+memory_monitor = MemoryMonitor(
+    window=MEMORY_CONFIG['window'],
+    sample_interval=MEMORY_CONFIG['sample_interval'],
+    tracemalloc_rate=MEMORY_CONFIG['tracemalloc_rate'],
+    outlier_rss=MEMORY_CONFIG['outlier_rss'],
+    outlier_factor=MEMORY_CONFIG['outlier_factor']
+) if MEMORY_CONFIG['enabled'] else None
+
+# 预先转换：在后台以低优先级把已知文档转换进结果缓存，交互请求繁忙时暂停
+prefetcher = Prefetcher(
+    lambda fileurl, variant: prefetch_variant(fileurl, variant),
+    rate=PREFETCH_CONFIG['rate'],
+    is_busy=lambda: interactive_busy(),
+    busy_wait=PREFETCH_CONFIG['busy_wait'],
+    retry_exceptions=(AdmissionRejected, SingleFlightTimeout),
+    max_attempts=PREFETCH_CONFIG['max_attempts'],
+    max_pending=PREFETCH_CONFIG['max_pending'],
+    max_jobs=PREFETCH_CONFIG['max_jobs'],
+    nice=PREFETCH_CONFIG['nice']
+) if PREFETCH_CONFIG['enabled'] and result_cache is not None else None
+
+# 启动预热：在后台导入并转换内置的小文档，完成后 /ready 才报告就绪
+warmup = WarmUp()
+if WARMUP_CONFIG['enabled']:
+    warmup.start()
+else:
+    warmup.skip()
+
+# 转换在请求线程中进行；ASGI前端（asgi.py）启动时设为True，改为交给转换进程池
+use_conversion_pool = False
+
+# ASGI前端异步下载的文档内容（或下载异常）放在请求environ的该键中：{fileurl: 内容或异常}
+PREFETCHED_ENVIRON_KEY = 'word2html.prefetched'
+
+def fetch_word_content(fileurl):
+    """下载Word文件，同一URL进行中的下载由并发请求共享
+    
+    ASGI前端已在事件循环中下载过时直接使用其结果。
+    """
+    if has_request_context():
+        prefetched = request.environ.get(PREFETCHED_ENVIRON_KEY, {})
+        if fileurl in prefetched:
+            content = prefetched[fileurl]
+            if isinstance(content, Exception):
+                raise content
+            return content
+    if not COALESCE_CONFIG['enabled']:
+        return download_word_from_url(fileurl)
+    content, _ = downloads.do(fileurl, download_word_from_url, fileurl,
+                              timeout=COALESCE_CONFIG['wait_timeout'])
+    return content
+
+def load_document(source):
+    """解析Word文档，并为进行中的转换记录段落数和表格数
+    
+    只在 run_admitted 执行的转换中调用，文档包已在准入前检查过，解析时不再检查。
+    """
+    doc = load_word_document(source, skip_inspection=True)
+    if memory_monitor is not None:
+        memory_monitor.tag_document(doc)
+    return doc
+
+def run_admitted(source, fn, *args, label=None, in_process=True):
+    """检查文档包后在准入控制下执行转换
+    
+    source为文档内容或本地路径。无效或过大的文档在排队前即抛出 DocumentRejected；
+    服务繁忙时抛出 AdmissionRejected。转换的内存占用按检查得到的 document.xml 大小估算。
+    label 为内存统计中标识文档的名称（内容哈希或存储键）；
+    fn 把转换交给转换进程池时 in_process 为False，内存统计不采样本进程的RSS。
+    """
+    package = inspect_package(source, PACKAGE_CONFIG)
+    if admission is None:
+        return run_tracked(package, label, in_process, fn, *args)
+    cost = estimate_memory_cost(package['compressed_size'], package['document_xml_size'], ADMISSION_CONFIG)
+    with admission.admit(cost):
+        return run_tracked(package, label, in_process, fn, *args)
+
+def run_tracked(package, label, in_process, fn, *args):
+    """执行转换并记录其内存占用（见memory_monitor）"""
+    if memory_monitor is None:
+        return fn(*args)
+    with memory_monitor.track(label, package['compressed_size'], package['document_xml_size'],
+                              sample_rss=in_process):
+        return fn(*args)
+
+def run_coalesced(word_content, key, fn, in_process=True):
+    """以 (内容哈希, key) 为键执行转换，相同内容和参数的并发请求共享同一次转换的结果
+    
+    同一文档的不同URL（如带签名参数的下载地址）在下载后按内容哈希合并。
+    结果先查共享的结果缓存，未命中时转换并写入缓存。
+    只有实际执行转换的请求经过准入控制，命中缓存和等待合并结果的请求不占用转换名额。
+    in_process 见 run_admitted。
+    """
+    document_hash = content_hash(word_content)
+    cache_key = f'{document_hash}:{content_hash(repr(key))}'
+    
+    if result_cache is not None:
+        try:
+            cached = result_cache.get(cache_key)
+        except Exception as e:
+            logging.warning(f"读取结果缓存失败: {str(e)}")
+            cached = None
+        if cached is not None:
+            return cached
+    
+    def compute():
+        result = run_admitted(word_content, fn, label=document_hash[:16], in_process=in_process)
+        if result_cache is not None:
+            try:
+                result_cache.set(cache_key, result)
+            except Exception as e:
+                logging.warning(f"写入结果缓存失败: {str(e)}")
+        return result
+    
+    if not COALESCE_CONFIG['enabled']:
+        return compute()
+    result, _ = conversions.do((document_hash,) + key, compute,
+                               timeout=COALESCE_CONFIG['wait_timeout'])
+    return result
+
+def convert_url_coalesced(fileurl, maxlength, key_extra=(), **options):
+    """下载并转换Word文档（参数见convert_document），返回的结果可能与其他请求共享，不应修改
+    
+    image_store 和 previous_blocks 在合并键中只记录是否提供，上一版本由调用方通过key_extra区分；
+    parallel 不影响结果，不计入合并键。
+    """
+    word_content = fetch_word_content(fileurl)
+    options_key = tuple(sorted(
+        (name, value is not None if name in ('image_store', 'previous_blocks') else repr(value))
+        for name, value in options.items() if name != 'parallel'
+    ))
+    
+    def convert():
+        deadline = conversion_deadline()
+        if use_conversion_pool:
+            return convert_in_pool(word_content, maxlength, skip_inspection=True, deadline=deadline, **options)
+        print("正在解析Word文档...")
+        return convert_document(load_document(word_content), maxlength, deadline=deadline, **options)
+    
+    return run_coalesced(word_content, ('convert', maxlength, options_key) + tuple(key_extra), convert,
+                         in_process=not use_conversion_pool)
+
+def outline_coalesced(word_content):
+    """生成文档标题树，结果与其他请求共享"""
+    return run_coalesced(word_content, ('outline',), lambda: document_outline(load_document(word_content)))
+
+def prefetch_variant(fileurl, variant):
+    """按变体（见 _parse_prefetch_variant）转换文档并写入结果缓存
+    
+    合并键与对应接口相同请求参数时的合并键一致（/convert 未指定 sections、blocks 和增量参数），
+    之后的请求直接命中缓存。预先转换不并行渲染，避免占满渲染进程池。
+    """
+    endpoint = variant['endpoint']
+    if endpoint == 'outline':
+        outline_coalesced(fetch_word_content(fileurl))
+    elif endpoint == 'convert-plain':
+        convert_url_coalesced(fileurl, variant['maxlength'], max_fragments=None)
+    else:
+        convert_url_coalesced(
+            fileurl, variant['maxlength'], key_extra=(None,), split=variant['split'], overlap=variant['overlap'],
+            hashes=variant['hashes'],
+            previous_blocks=None,
+            track_sources=False,
+            parallel=False,
+            output_format=variant['format'],
+            image_store=image_store if IMAGE_CONFIG['enabled'] and variant['images'] else None,
+            sections=None,
+            block_range=None,
+            fragment_range=None,
+            max_fragments=None
+        )
+
+def interactive_busy():
+    """交互请求是否需要全部转换名额：有请求在排队、空闲名额不足 PREFETCH_CONFIG['idle_slots']，
+    或内存接近容器上限；未启用准入控制时有任何转换在进行即视为繁忙"""
+    if memory_monitor is not None:
+        ratio = memory_monitor.usage_ratio()
+        if ratio is not None and ratio >= MEMORY_CONFIG['not_ready_ratio']:
+            return True
+    if admission is None:
+        return conversions.stats()['in_flight'] > 0
+    stats = admission.stats()
+    return stats['queued'] > 0 or stats['max_concurrent'] - stats['active'] <= PREFETCH_CONFIG['idle_slots']
+
+def timeout_response(e):
+    return jsonify({
+        'success': False,
+        'error': str(e)
+    }), 504
+
+def admission_rejected_response(e):
+    response = jsonify({
+        'success': False,
+        'error': str(e)
+    })
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+def make_payload_response(payload):
+    """按 Accept / Accept-Encoding 协商格式和压缩方式生成响应
+    
+    格式: application/json（默认，UTF-8不转义）、application/x-msgpack（需安装msgpack）、
+         application/vnd.word2html.frames（长度前缀二进制）
+    压缩: zstd（需安装zstandard）、gzip、deflate，小于 compress_min_size 的响应不压缩
+    """
+    mimetype = negotiate_format(request.accept_mimetypes)
+    body = encode_payload(payload, mimetype)
+    
+    encoding = None
+    if len(body) >= RESPONSE_CONFIG['compress_min_size']:
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding:
+            body = compress(body, encoding, RESPONSE_CONFIG['compress_level'].get(encoding))
+    
+    content_type = mimetype + ('; charset=utf-8' if mimetype == 'application/json' else '')
+    response = app.response_class(body, content_type=content_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(['Accept', 'Accept-Encoding'])
+    return response
 
 @app.route('/convert', methods=['POST'])
 def convert_word_to_html():
@@ -16,10 +306,30 @@ def convert_word_to_html():
     接收参数:
     - fileurl: Word文件的URL地址
     - maxlength: 每个片段的最大长度（可选，默认10000）
+    - mode: 返回模式（可选）: fragments（默认，返回片段数组）/ offsets（返回完整HTML和片段位置）
+    - overlap: offsets模式下相邻片段的重叠字符数（可选，默认0）
+    - split: 分割方式（可选）: default（按长度智能分割）/ anchored（按块边界内容锚定，编辑只影响所在片段）
+    - hashes: 为true时返回每个片段和每个块的稳定内容哈希（可选）
+    - incremental: 为true时记录本次转换的版本并返回version_id（可选）
+    - previous_version: 上一版本的version_id，只重新渲染有变化的块（可选，隐含incremental）
+    - parallel: 为false时禁止并行渲染（可选，默认大文档自动在进程池中并行渲染）
+    - format: 输出格式（可选）: html（默认）/ markdown / json（JSON AST，片段为块对象数组，不支持offsets模式）
+    - images: 为false时不输出图片（可选，默认提取图片并以 /images/ 下的URL引用）
+    - sections: 只转换指定章节（可选）: 标题id（见 /outline）或标题文本的列表，包含其下级章节
+    - blocks: 只转换顶层元素范围 [起始, 结束)（可选，见 /outline 的 start_block / end_block）
+    - fragments: 只返回第 N..M 个片段 [N, M]（可选，含两端，从0开始）
+    - max_fragments: 最多返回的片段数（可选），得到这些片段后立即停止渲染和分割
+    - preview: 为true时相当于 max_fragments 为 CONVERT_CONFIG['preview_fragments']（可选）
     
     返回:
     - success: 是否成功
-    - data: 转换后的HTML片段数组
+    - data: 转换后的HTML片段数组（fragments模式）
+    - html / offsets: 完整HTML及每个片段的 [起始, 结束) 字符位置（offsets模式）
+    - hashes / block_hashes: 片段和块的内容哈希（hashes为true时）
+    - version_id / changed_fragments: 本次版本ID及相对上一版本有变化的片段序号（增量转换时）
+    - selection: 实际转换的顶层元素范围（部分转换时）
+    - fragment_range: 返回的片段序号范围，此时total_fragments为全部片段数，提前停止时为null（指定fragments时）
+    - truncated: 之后是否还有未返回的片段（指定fragments、max_fragments或preview时）
     - error: 错误信息（如果有）
     """
     try:
@@ -47,23 +357,237 @@ def convert_word_to_html():
                 'error': 'maxlength必须为正整数'
             }), 400
         
-        # 调用转换函数
-        result = word_to_html_array(fileurl, maxlength)
+        mode = data.get('mode', 'fragments')
+        if mode not in ('fragments', 'offsets'):
+            return jsonify({
+                'success': False,
+                'error': 'mode必须为fragments或offsets'
+            }), 400
+        
+        overlap = data.get('overlap', 0)
+        if not isinstance(overlap, int) or overlap < 0 or overlap >= maxlength:
+            return jsonify({
+                'success': False,
+                'error': 'overlap必须为小于maxlength的非负整数'
+            }), 400
+        
+        split = data.get('split', 'default')
+        if split not in ('default', 'anchored'):
+            return jsonify({
+                'success': False,
+                'error': 'split必须为default或anchored'
+            }), 400
+        
+        output_format = data.get('format', 'html')
+        if output_format not in ('html', 'markdown', 'json'):
+            return jsonify({
+                'success': False,
+                'error': 'format必须为html、markdown或json'
+            }), 400
+        
+        if output_format == 'json' and (mode == 'offsets' or overlap):
+            return jsonify({
+                'success': False,
+                'error': 'json格式不支持offsets模式和overlap'
+            }), 400
+        
+        hashes = bool(data.get('hashes', False))
+        
+        sections = data.get('sections')
+        if sections is not None and (not isinstance(sections, list) or not sections or
+                                     not all(isinstance(item, (int, str)) and not isinstance(item, bool)
+                                             for item in sections)):
+            return jsonify({
+                'success': False,
+                'error': 'sections必须为标题id或标题文本组成的非空数组'
+            }), 400
+        
+        block_range = _parse_range(data.get('blocks'))
+        if block_range is False:
+            return jsonify({
+                'success': False,
+                'error': 'blocks必须为 [起始, 结束] 形式的非负整数数组'
+            }), 400
+        
+        fragment_range = _parse_range(data.get('fragments'))
+        if fragment_range is False:
+            return jsonify({
+                'success': False,
+                'error': 'fragments必须为 [N, M] 形式的非负整数数组'
+            }), 400
+        
+        max_fragments, error = _parse_max_fragments(data)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        previous_version = data.get('previous_version')
+        incremental = bool(data.get('incremental', False)) or bool(previous_version)
+        if incremental and (sections or block_range):
+            return jsonify({
+                'success': False,
+                'error': '增量转换不支持sections和blocks'
+            }), 400
+        previous_record = version_store.get(previous_version) if previous_version else None
+        
+        # 调用转换函数（增量转换时源哈希未变的块直接复用上一版本的HTML）
+        result = convert_url_coalesced(
+            fileurl, maxlength, key_extra=(previous_version if previous_record else None,), split=split, overlap=overlap, hashes=hashes or incremental,
+            previous_blocks=VersionStore.reusable_blocks(previous_record) if previous_record else None,
+            track_sources=incremental,
+            parallel=bool(data.get('parallel', True)),
+            output_format=output_format,
+            image_store=image_store if IMAGE_CONFIG['enabled'] and data.get('images', True) else None,
+            sections=sections,
+            block_range=block_range,
+            fragment_range=fragment_range,
+            max_fragments=max_fragments
+        )
+        html_content = result['html']
+        offsets = result['offsets']
+        
+        if mode == 'offsets':
+            # 只返回一份完整HTML和片段位置，不在服务端生成片段副本
+            payload = {
+                'success': True,
+                'html': html_content,
+                'offsets': offsets,
+                'total_fragments': len(offsets),
+                'maxlength': maxlength,
+                'overlap': overlap
+            }
+        else:
+            if output_format == 'json':
+                fragments = result['fragment_blocks']
+            else:
+                fragments = [html_content[start:end] for start, end in offsets]
+            payload = {
+                'success': True,
+                'data': fragments,
+                'total_fragments': len(fragments),
+                'maxlength': maxlength
+            }
+        payload['format'] = output_format
+        
+        if 'selection' in result:
+            payload['selection'] = result['selection']
+        if fragment_range is not None:
+            payload['fragment_range'] = result['fragment_range']
+            payload['total_fragments'] = result['total_fragments']
+        if 'truncated' in result:
+            payload['truncated'] = result['truncated']
+        
+        if hashes:
+            payload['hashes'] = result['fragment_hashes']
+            payload['block_hashes'] = result['block_hashes']
+        
+        if incremental:
+            # 版本ID由各块源哈希决定，相同内容的文档得到相同的版本ID
+            version_id = content_hash('\n'.join(result['source_hashes']))
+            version_store.save(version_id, result['source_hashes'], result['block_html'],
+                               result['fragment_hashes'])
+            payload.update({
+                'version_id': version_id,
+                'previous_version_found': previous_record is not None,
+                'reused_blocks': result['reused_blocks'],
+                'rendered_blocks': result['rendered_blocks']
+            })
+            if previous_record is not None:
+                previous_fragments = set(previous_record['fragment_hashes'])
+                payload['changed_fragments'] = [
+                    index for index, fragment_hash in enumerate(result['fragment_hashes'])
+                    if fragment_hash not in previous_fragments
+                ]
         
         # 返回结果
-        return jsonify({
-            'success': True,
-            'data': result,
-            'total_fragments': len(result),
-            'maxlength': maxlength
-        })
+        return make_payload_response(payload)
         
+    except (SelectionError, DocumentRejected) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except (SingleFlightTimeout, ConversionTimeout) as e:
+        return timeout_response(e)
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
         return jsonify({
             'success': False,
             'error': f'转换过程中发生错误: {str(e)}'
         }), 500
 
+def _parse_max_fragments(data):
+    """解析 max_fragments / preview 参数，返回 (片段数或None, 错误信息或None)"""
+    max_fragments = data.get('max_fragments')
+    if max_fragments is not None and (not isinstance(max_fragments, int) or isinstance(max_fragments, bool)
+                                      or max_fragments <= 0):
+        return None, 'max_fragments必须为正整数'
+    if max_fragments is None and data.get('preview'):
+        max_fragments = CONVERT_CONFIG['preview_fragments']
+    return max_fragments, None
+
+def _parse_range(value):
+    """解析 [起始, 结束] 形式的范围参数：未提供返回None，格式无效返回False"""
+    if value is None:
+        return None
+    if (not isinstance(value, list) or len(value) != 2 or
+            not all(isinstance(item, int) and not isinstance(item, bool) and item >= 0 for item in value)):
+        return False
+    return tuple(value)
+
+@app.route('/outline', methods=['POST'])
+def get_document_outline():
+    """文档大纲API接口
+    
+    接收参数:
+    - fileurl: Word文件的URL地址
+    
+    返回:
+    - success: 是否成功
+    - headings: 标题树，每个节点含 id、title、level、start_block / end_block（章节的顶层元素范围 [起始, 结束)）、children
+    - heading_count: 标题总数
+    - total_blocks: 顶层元素（段落+表格）总数
+    
+    返回的标题id和块范围可作为 /convert 的 sections / blocks 参数，只转换需要的部分。
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': '请求体必须为JSON格式'
+            }), 400
+        
+        fileurl = data.get('fileurl')
+        if not fileurl:
+            return jsonify({
+                'success': False,
+                'error': '缺少fileurl参数'
+            }), 400
+        
+        outline = outline_coalesced(fetch_word_content(fileurl))
+        payload = {'success': True}
+        payload.update(outline)
+        return make_payload_response(payload)
+        
+    except (SingleFlightTimeout, ConversionTimeout) as e:
+        return timeout_response(e)
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except DocumentRejected as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'获取文档大纲时发生错误: {str(e)}'
+        }), 500
+
 @app.route('/convert-plain', methods=['POST'])
 def convert_word_to_plain_text():
     """Word转纯文本分割API接口（删除所有HTML标签）
@@ -71,10 +595,12 @@ def convert_word_to_plain_text():
     接收参数:
     - fileurl: Word文件的URL地址
     - maxlength: 每个片段的最大长度（可选，默认10000）
+    - max_fragments / preview: 只返回前几个片段（可选，同 /convert）
     
     返回:
     - success: 是否成功
     - data: 转换后的纯文本片段数组（已删除HTML标签）
+    - truncated: 之后是否还有未返回的片段（指定max_fragments或preview时）
     - error: 错误信息（如果有）
     """
     try:
@@ -102,8 +628,17 @@ def convert_word_to_plain_text():
                 'error': 'maxlength必须为正整数'
             }), 400
         
+        max_fragments, error = _parse_max_fragments(data)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
         # 调用转换函数获取HTML片段
-        html_fragments = word_to_html_array(fileurl, maxlength)
+        result = convert_url_coalesced(fileurl, maxlength, max_fragments=max_fragments)
+        html_fragments = [result['html'][start:end] for start, end in result['offsets']]
+        truncated = result.get('truncated')
         
         # 删除所有HTML标签，转换为纯文本
         import re
@@ -116,27 +651,226 @@ def convert_word_to_plain_text():
             plain_fragments.append(plain_text)
         
         # 返回结果
-        return jsonify({
+        payload = {
             'success': True,
             'data': plain_fragments,
             'total_fragments': len(plain_fragments),
             'maxlength': maxlength
-        })
+        }
+        if truncated is not None:
+            payload['truncated'] = truncated
+        return make_payload_response(payload)
         
+    except (SingleFlightTimeout, ConversionTimeout) as e:
+        return timeout_response(e)
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except DocumentRejected as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': f'转换过程中发生错误: {str(e)}'
         }), 500
 
+def _parse_prefetch_variant(item):
+    """解析预先转换的一个变体，返回 (变体, 错误信息或None)
+    
+    endpoint 为 convert（默认）、convert-plain 或 outline，其余字段与对应接口的参数相同：
+    maxlength、format、split、overlap、hashes、images；mode 不影响转换结果（fragments和offsets共用缓存），只做校验。
+    """
+    if not isinstance(item, dict):
+        return None, 'variants中的每一项必须为对象'
+    endpoint = item.get('endpoint', 'convert')
+    if endpoint not in ('convert', 'convert-plain', 'outline'):
+        return None, 'endpoint必须为convert、convert-plain或outline'
+    if endpoint == 'outline':
+        return {'endpoint': endpoint}, None
+    
+    maxlength = item.get('maxlength', CONVERT_CONFIG['default_maxlength'])
+    if not isinstance(maxlength, int) or isinstance(maxlength, bool) or maxlength <= 0:
+        return None, 'maxlength必须为正整数'
+    if endpoint == 'convert-plain':
+        return {'endpoint': endpoint, 'maxlength': maxlength}, None
+    
+    variant = {
+        'endpoint': endpoint,
+        'maxlength': maxlength,
+        'format': item.get('format', 'html'),
+        'split': item.get('split', 'default'),
+        'overlap': item.get('overlap', 0),
+        'hashes': bool(item.get('hashes', False)),
+        'images': bool(item.get('images', True))
+    }
+    if item.get('mode', 'fragments') not in ('fragments', 'offsets'):
+        return None, 'mode必须为fragments或offsets'
+    if variant['format'] not in ('html', 'markdown', 'json'):
+        return None, 'format必须为html、markdown或json'
+    if variant['split'] not in ('default', 'anchored'):
+        return None, 'split必须为default或anchored'
+    overlap = variant['overlap']
+    if not isinstance(overlap, int) or isinstance(overlap, bool) or overlap < 0 or overlap >= maxlength:
+        return None, 'overlap必须为小于maxlength的非负整数'
+    if variant['format'] == 'json' and (item.get('mode') == 'offsets' or overlap):
+        return None, 'json格式不支持offsets模式和overlap'
+    return variant, None
+
+@app.route('/prefetch', methods=['POST'])
+def create_prefetch_job():
+    """提交预先转换任务
+    
+    接收参数:
+    - urls: Word文件URL数组
+    - variants: 转换变体数组（可选，默认为 /convert 的默认参数），每项见 _parse_prefetch_variant，如
+      [{"maxlength": 5000}, {"maxlength": 5000, "format": "markdown"}, {"endpoint": "outline"}]
+    
+    文档在后台逐个转换并写入结果缓存，立即返回202和任务ID，进度见 GET /prefetch/<job_id>。
+    """
+    if prefetcher is None:
+        return jsonify({
+            'success': False,
+            'error': '预先转换未启用（需要启用结果缓存）'
+        }), 400
+    
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({
+            'success': False,
+            'error': '请求体必须为JSON格式'
+        }), 400
+    
+    urls = data.get('urls')
+    if not isinstance(urls, list) or not urls or not all(isinstance(url, str) and url for url in urls):
+        return jsonify({
+            'success': False,
+            'error': 'urls必须为URL组成的非空数组'
+        }), 400
+    if len(urls) > PREFETCH_CONFIG['max_urls']:
+        return jsonify({
+            'success': False,
+            'error': f"urls最多 {PREFETCH_CONFIG['max_urls']} 个"
+        }), 400
+    
+    raw_variants = data.get('variants', [{}])
+    if not isinstance(raw_variants, list) or not raw_variants:
+        return jsonify({
+            'success': False,
+            'error': 'variants必须为非空数组'
+        }), 400
+    if len(raw_variants) > PREFETCH_CONFIG['max_variants']:
+        return jsonify({
+            'success': False,
+            'error': f"variants最多 {PREFETCH_CONFIG['max_variants']} 个"
+        }), 400
+    variants = []
+    for item in raw_variants:
+        variant, error = _parse_prefetch_variant(item)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        if variant not in variants:
+            variants.append(variant)
+    
+    try:
+        job = prefetcher.submit(list(dict.fromkeys(urls)), variants)
+    except PrefetchQueueFull as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'total': job.total,
+        'variants': variants,
+        'status_url': f'/prefetch/{job.id}'
+    }), 202
+
+@app.route('/prefetch', methods=['GET'])
+def list_prefetch_jobs():
+    """预先转换的队列状态和最近的任务"""
+    if prefetcher is None:
+        return jsonify({'success': True, 'enabled': False, 'jobs': []})
+    stats = prefetcher.stats()
+    stats['interactive_busy'] = interactive_busy()
+    return jsonify({
+        'success': True,
+        'enabled': True,
+        'queue': stats,
+        'jobs': prefetcher.jobs()
+    })
+
+@app.route('/prefetch/<job_id>', methods=['GET', 'DELETE'])
+def prefetch_job_status(job_id):
+    """查询预先转换任务的进度；DELETE取消任务中尚未开始的文档"""
+    if prefetcher is None:
+        job = None
+    elif request.method == 'DELETE':
+        job = prefetcher.cancel(job_id)
+    else:
+        job = prefetcher.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在或已过期'
+        }), 404
+    status = job.status()
+    status['success'] = True
+    return jsonify(status)
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """健康检查接口"""
+    """健康检查接口：进程内存、进行中的转换、排队数和缓存统计
+    
+    内存接近容器上限时 status 为 degraded（仍返回200，由 /ready 停止分配流量）。
+    """
+    memory = memory_monitor.stats() if memory_monitor is not None else None
+    status = 'healthy'
+    ratio = memory['memory_usage_ratio'] if memory is not None else None
+    if ratio is not None and ratio >= MEMORY_CONFIG['not_ready_ratio']:
+        status = 'degraded'
+    cache = None
+    if result_cache is not None:
+        try:
+            cache = result_cache.stats()
+        except Exception as e:
+            cache = {'error': str(e)}
     return jsonify({
-        'status': 'healthy',
-        'service': 'Word转HTML转换器'
+        'status': status,
+        'service': 'Word转HTML转换器',
+        'memory': memory,
+        'admission': admission.stats() if admission is not None else None,
+        'coalescing': {
+            'downloads': downloads.stats(),
+            'conversions': conversions.stats()
+        },
+        'cache': cache,
+        'prefetch': prefetcher.stats() if prefetcher is not None else None
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """就绪检查接口：预热完成前返回503，供负载均衡/自动扩缩容判断是否可以分配流量"""
+    status = warmup.status()
+    if status['ready']:
+        status['status'] = 'ready'
+    else:
+        status['status'] = 'failed' if 'error' in status else 'starting'
+    # 内存接近容器上限时暂停接收新流量，进行中的转换完成、内存回落后恢复
+    ratio = memory_monitor.usage_ratio() if memory_monitor is not None else None
+    if ratio is not None:
+        status['memory_usage_ratio'] = round(ratio, 4)
+        if status['ready'] and ratio >= MEMORY_CONFIG['not_ready_ratio']:
+            status['ready'] = False
+            status['status'] = 'memory_pressure'
+    return jsonify(status), 200 if status['ready'] else 503
+
 @app.route('/cleanup', methods=['POST'])
 def manual_cleanup():
     """手动触发文件清理接口"""
@@ -168,6 +902,85 @@ def manual_cleanup():
             'error': f'清理过程中发生错误: {str(e)}'
         }), 500
 
+def _check_upload_filename(raw_filename):
+    """校验上传文件名，返回 (安全文件名, 扩展名, 错误响应)"""
+    # 检查文件扩展名
+    allowed_extensions = UPLOAD_CONFIG['allowed_extensions']
+    file_ext = os.path.splitext(raw_filename)[1].lower()
+    if file_ext not in allowed_extensions:
+        return None, None, (jsonify({
+            'success': False,
+            'error': f'不支持的文件格式，仅支持: {", ".join(allowed_extensions)}'
+        }), 400)
+    
+    # 生成安全的文件名（去掉路径部分，防止目录穿越）
+    filename = os.path.basename(raw_filename.replace('\\', '/'))
+    return filename, file_ext, None
+
+def _stored_upload_response(meta, deduplicated, filename, file_ext, extra=None):
+    """为已存储的上传内容分配上传ID并生成响应数据"""
+    upload_dir = UPLOAD_CONFIG['upload_dir']
+    
+    # 每次上传分配独立的上传ID，同名文件互不覆盖
+    upload_id = upload_store.register_upload(meta['key'], filename)
+    
+    # 返回文件URL
+    file_url = f'http://localhost:5000/{upload_dir}/{upload_id}{file_ext}'
+    
+    result = {
+        'success': True,
+        'fileUrl': file_url,
+        'filename': filename,
+        'upload_id': upload_id,
+        'content_hash': meta['hash'],
+        'deduplicated': deduplicated,
+        'storage_type': 'local'
+    }
+    
+    # 上传完成后立即转换（可选）
+    if request.args.get('convert', '').lower() in ('1', 'true'):
+        maxlength = request.args.get('maxlength', CONVERT_CONFIG['default_maxlength'], type=int)
+        if not maxlength or maxlength <= 0:
+            maxlength = CONVERT_CONFIG['default_maxlength']
+        try:
+            fragments = run_admitted(
+                meta['path'],
+                lambda: document_to_html_array(load_document(meta['path']), maxlength,
+                                               deadline=conversion_deadline()),
+                label=meta['key']
+            )
+        except AdmissionRejected as e:
+            # 文件已保存，服务繁忙时只跳过转换，客户端稍后可用fileUrl调用 /convert
+            result.update({
+                'converted': False,
+                'convert_error': str(e),
+                'retry_after': e.retry_after
+            })
+        except (DocumentRejected, ConversionTimeout) as e:
+            # 文件已保存，但无法转换（如旧版.doc）或转换超时
+            result.update({
+                'converted': False,
+                'convert_error': str(e)
+            })
+        else:
+            result.update({
+                'data': fragments,
+                'total_fragments': len(fragments),
+                'maxlength': maxlength
+            })
+    
+    if extra:
+        result.update(extra)
+    return result
+
+@app.errorhandler(413)
+def request_entity_too_large(e):
+    """请求体超过MAX_CONTENT_LENGTH"""
+    return jsonify({
+        'success': False,
+        'error': f'文件大小超过限制 {UPLOAD_CONFIG["max_content_length"]} bytes'
+    }), 413
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """文件上传接口"""
@@ -185,556 +998,291 @@ def upload_file():
                 'error': '没有选择文件'
             }), 400
         
-        # 检查文件扩展名
-        allowed_extensions = UPLOAD_CONFIG['allowed_extensions']
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        if file_ext not in allowed_extensions:
+        filename, file_ext, error = _check_upload_filename(file.filename)
+        if error:
+            return error
+        
+        # 按内容哈希保存文件（边写边计算哈希，相同内容只保存一份）
+        meta, deduplicated = upload_store.put_content(file.stream, file_ext)
+        
+        return jsonify(_stored_upload_response(meta, deduplicated, filename, file_ext))
+    
+    except HTTPException:
+        # 请求体超过MAX_CONTENT_LENGTH时读取request.stream抛出413，交给对应的错误处理函数
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'文件上传失败: {str(e)}'
+        }), 500
+
+@app.route('/upload/stream', methods=['POST'])
+def upload_file_stream():
+    """流式文件上传接口（请求体即文件内容，不经过表单解析）
+    
+    接收参数（查询字符串）:
+    - filename: 原始文件名
+    - convert: 为1/true时上传完成后立即转换（可选）
+    - maxlength: 转换时每个片段的最大长度（可选）
+    """
+    try:
+        filename, file_ext, error = _check_upload_filename(request.args.get('filename', ''))
+        if error:
+            return error
+        
+        # 按固定大小分块写入磁盘，超过大小限制时立即中止
+        reader = LimitedReader(request.stream, UPLOAD_CONFIG['max_content_length'])
+        meta, deduplicated = upload_store.put_content(reader, file_ext)
+        
+        return jsonify(_stored_upload_response(meta, deduplicated, filename, file_ext))
+    
+    except UploadTooLarge as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 413
+    except HTTPException:
+        # 请求体超过MAX_CONTENT_LENGTH时读取request.stream抛出413，交给对应的错误处理函数
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'文件上传失败: {str(e)}'
+        }), 500
+
+@app.route('/upload/chunked', methods=['POST'])
+def create_chunked_upload():
+    """创建分块上传会话
+    
+    接收参数:
+    - filename: 原始文件名
+    - total_size: 文件总大小（可选，提供时最后一个分块到达后自动完成上传）
+    
+    返回:
+    - upload_id: 上传会话ID
+    - offset: 已接收的字节数
+    - chunk_size: 建议的分块大小
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        filename, file_ext, error = _check_upload_filename(data.get('filename', ''))
+        if error:
+            return error
+        
+        total_size = data.get('total_size')
+        if total_size is not None and (not isinstance(total_size, int) or total_size <= 0):
             return jsonify({
                 'success': False,
-                'error': f'不支持的文件格式，仅支持: {", ".join(allowed_extensions)}'
+                'error': 'total_size必须为正整数'
             }), 400
         
-        upload_dir = UPLOAD_CONFIG['upload_dir']
-        if not os.path.exists(upload_dir):
-            os.makedirs(upload_dir)
-
-        # 生成安全的文件名
-        filename = file.filename
-        file_path = os.path.join(upload_dir, filename)
-
-        # 保存文件
-        file.save(file_path)
-
-        # 返回文件URL
-        file_url = f'http://localhost:5000/{upload_dir}/{filename}'
-
-        return jsonify({
+        info = chunked_uploads.create(filename, total_size)
+        info.update({
             'success': True,
-            'fileUrl': file_url,
-            'filename': filename,
-            'storage_type': 'local'
+            'chunk_size': UPLOAD_CONFIG['chunk_size']
         })
+        return jsonify(info)
     
+    except UploadTooLarge as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 413
+    except HTTPException:
+        # 请求体超过MAX_CONTENT_LENGTH时读取request.stream抛出413，交给对应的错误处理函数
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
-            'error': f'文件上传失败: {str(e)}'
+            'error': f'创建上传会话失败: {str(e)}'
+        }), 500
+
+@app.route('/upload/chunked/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    """查询分块上传会话的当前偏移量（用于断点续传）"""
+    info = chunked_uploads.status(upload_id)
+    if info is None:
+        return jsonify({
+            'success': False,
+            'error': '上传会话不存在'
+        }), 404
+    info['success'] = True
+    return jsonify(info)
+
+@app.route('/upload/chunked/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """上传一个分块
+    
+    接收参数:
+    - offset: 分块起始偏移量（查询字符串或Upload-Offset请求头），必须等于已接收的字节数
+    - final: 为1/true时表示最后一个分块（未提供total_size时使用）
+    - convert / maxlength: 同 /upload/stream，上传完成后立即转换
+    - 请求体: 分块内容
+    
+    偏移量不匹配时返回409及服务端当前偏移量，客户端从该位置续传。
+    """
+    try:
+        offset = request.args.get('offset', request.headers.get('Upload-Offset'), type=int)
+        if offset is None or offset < 0:
+            return jsonify({
+                'success': False,
+                'error': '缺少offset参数'
+            }), 400
+        
+        info = chunked_uploads.append(upload_id, offset, request.stream)
+        
+        if not info['complete'] and request.args.get('final', '').lower() not in ('1', 'true'):
+            info['success'] = True
+            return jsonify(info)
+        
+        # 最后一个分块已到达，移入内容寻址存储
+        data_path, content_hash, info = chunked_uploads.finish(upload_id)
+        filename = info['filename']
+        file_ext = os.path.splitext(filename)[1].lower()
+        meta, deduplicated = upload_store.adopt_file(data_path, file_ext, content_hash)
+        chunked_uploads.discard(upload_id)
+        
+        return jsonify(_stored_upload_response(meta, deduplicated, filename, file_ext,
+                                               extra={'offset': info['offset'], 'complete': True}))
+    
+    except FileNotFoundError:
+        return jsonify({
+            'success': False,
+            'error': '上传会话不存在'
+        }), 404
+    except OffsetMismatch as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'offset': e.expected
+        }), 409
+    except UploadTooLarge as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 413
+    except HTTPException:
+        # 请求体超过MAX_CONTENT_LENGTH时读取request.stream抛出413，交给对应的错误处理函数
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'分块上传失败: {str(e)}'
         }), 500
 
+def send_stored_file(meta, download_name=None, immutable=False):
+    """发送存储中的文件
+    
+    - ETag 使用内容哈希（强校验），If-None-Match 命中时返回304
+    - 支持 Range / If-Range 请求，返回206部分内容
+    - 内容寻址的文件内容永不变化，设置长期缓存和 immutable
+    - 文件体通过 wsgi.file_wrapper 发送，服务器支持时走零拷贝 sendfile；
+      启用 SERVER_CONFIG['use_x_sendfile'] 时交给前置的 Nginx/Apache 发送
+    """
+    max_age = STATIC_CONFIG['immutable_max_age'] if immutable else STATIC_CONFIG['default_max_age']
+    response = send_file(
+        os.path.abspath(meta['path']),
+        download_name=download_name or meta['key'],
+        etag=meta['hash'],
+        conditional=True,
+        last_modified=meta['mtime'],
+        max_age=max_age
+    )
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
 @app.route('/uploads/<filename>')
 def serve_uploaded_file(filename):
     """提供上传的文件"""
     try:
-        return send_from_directory('uploads', filename)
+        # 优先按上传ID解析到内容键，兼容直接使用存储键的旧链接
+        download_name = None
+        key = filename
+        upload = upload_store.resolve_upload(os.path.splitext(filename)[0])
+        if upload:
+            key, download_name = upload
+        
+        meta = upload_store.get(key)
+        if meta is None:
+            raise FileNotFoundError(filename)
+        
+        # 上传ID和内容键指向的内容都不会变化
+        immutable = upload is not None or key.startswith(meta['hash'])
+        return send_stored_file(meta, download_name, immutable)
     except FileNotFoundError:
         return jsonify({
             'success': False,
             'error': '文件不存在'
         }), 404
 
+@app.route('/images/<name>', methods=['GET'])
+def serve_image(name):
+    """提供从文档中提取的图片
+    
+    图片URL包含内容哈希，内容永不变化，以 immutable 长期缓存。
+    查询参数 w 指定宽度时返回缩略图（按配置的档位向上取整，首次请求时生成并缓存）；
+    原图不大于该宽度或无法生成缩略图时返回原图。
+    """
+    meta = image_store.get(name)
+    if meta is None:
+        return jsonify({
+            'success': False,
+            'error': '文件不存在'
+        }), 404
+    
+    width = request.args.get('w', type=int)
+    if width and width > 0:
+        thumbnail_width = image_store.thumbnail_width(width)
+        if thumbnail_width:
+            try:
+                meta = image_store.thumbnail(name, thumbnail_width) or meta
+            except Exception as e:
+                logging.warning(f"生成缩略图失败 {name}: {str(e)}")
+    
+    return send_stored_file(meta, immutable=True)
+
+def _send_frontend_asset(asset, immutable):
+    """发送预构建的前端资源，客户端支持gzip时直接返回预压缩内容"""
+    use_gzip = request.accept_encodings['gzip'] > 0
+    # 压缩和未压缩是不同的表示，使用不同的ETag
+    etag = asset['etag'] + ('-gz' if use_gzip else '')
+    
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(asset['gzip'] if use_gzip else asset['body'],
+                                      content_type=asset['mimetype'])
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_CONFIG['immutable_max_age']
+        response.cache_control.immutable = True
+    else:
+        # 首页地址固定，每次使用前向服务端确认，未变化时返回304
+        response.cache_control.no_cache = True
+    return response
+
 @app.route('/', methods=['GET'])
 def index():
     """首页 - Word文档分割工具"""
-    return render_template_string('''
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Word文档分割工具</title>
-    <!-- 使用原生文件上传 -->
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            max-width: 800px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }
-        .container {
-            background: white;
-            padding: 30px;
-            border-radius: 8px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }
-        h1 {
-            color: #333;
-            text-align: center;
-            margin-bottom: 30px;
-        }
-        .form-group {
-            margin-bottom: 20px;
-        }
-        label {
-            display: block;
-            margin-bottom: 5px;
-            font-weight: bold;
-            color: #555;
-        }
-        input[type="file"], input[type="number"] {
-            width: 100%;
-            padding: 10px;
-            border: 1px solid #ddd;
-            border-radius: 4px;
-            box-sizing: border-box;
-        }
-        button {
-            background-color: #007bff;
-            color: white;
-            padding: 12px 24px;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 16px;
-            width: 100%;
-        }
-        button:hover {
-            background-color: #0056b3;
-        }
-        button:disabled {
-            background-color: #ccc;
-            cursor: not-allowed;
-        }
-        .status {
-            margin-top: 20px;
-            padding: 10px;
-            border-radius: 4px;
-            display: none;
-        }
-        .status.success {
-            background-color: #d4edda;
-            color: #155724;
-            border: 1px solid #c3e6cb;
-        }
-        .status.error {
-            background-color: #f8d7da;
-            color: #721c24;
-            border: 1px solid #f5c6cb;
-        }
-        .status.info {
-            background-color: #d1ecf1;
-            color: #0c5460;
-            border: 1px solid #bee5eb;
-        }
-        .result {
-            margin-top: 30px;
-        }
-        .fragment {
-            background: #f8f9fa;
-            border: 1px solid #dee2e6;
-            border-radius: 4px;
-            padding: 15px;
-            margin-bottom: 15px;
-        }
-        .fragment h3 {
-            margin-top: 0;
-            color: #495057;
-        }
-        .fragment-content {
-            max-height: 200px;
-            overflow-y: auto;
-            border: 1px solid #ced4da;
-            padding: 10px;
-            background: white;
-        }
-        .loading {
-            text-align: center;
-            margin: 20px 0;
-        }
-        .spinner {
-            border: 4px solid #f3f3f3;
-            border-top: 4px solid #007bff;
-            border-radius: 50%;
-            width: 40px;
-            height: 40px;
-            animation: spin 1s linear infinite;
-            margin: 0 auto;
-        }
-        @keyframes spin {
-            0% { transform: rotate(0deg); }
-            100% { transform: rotate(360deg); }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Word文档分割工具</h1>
-        
-        <div class="form-group">
-            <label for="fileInput">选择Word文档：</label>
-            <input type="file" id="fileInput" accept=".doc,.docx" required>
-        </div>
-        
-        <div class="form-group">
-            <label for="maxlength">片段最大长度（字符数）：</label>
-            <input type="number" id="maxlength" value="10000" min="1000" max="50000" required>
-        </div>
-        
-        <button id="uploadBtn" onclick="uploadAndProcess()">上传并分割文档</button>
-        
-        <button id="uploadBtnPlain" onclick="uploadAndProcessPlain()" style="margin-top: 10px; background-color: #28a745;">上传并分割文档（纯文本）</button>
-        
-        <div id="status" class="status"></div>
-        
-        <div id="loading" class="loading" style="display: none;">
-            <div class="spinner"></div>
-            <p>正在处理文档，请稍候...</p>
-        </div>
-        
-        <div id="result" class="result"></div>
-    </div>
-
-    <script>
-        // 文件上传配置
-        const uploadConfig = {
-            apiEndpoint: '/upload'
-        };
-
-        // API服务地址
-        const API_BASE_URL = '';
-
-        function showStatus(message, type = 'info') {
-            const statusDiv = document.getElementById('status');
-            statusDiv.textContent = message;
-            statusDiv.className = `status ${type}`;
-            statusDiv.style.display = 'block';
-        }
-
-        function hideStatus() {
-            const statusDiv = document.getElementById('status');
-            statusDiv.style.display = 'none';
-        }
-
-        function showLoading(show = true) {
-            const loadingDiv = document.getElementById('loading');
-            const uploadBtn = document.getElementById('uploadBtn');
-            
-            if (show) {
-                loadingDiv.style.display = 'block';
-                uploadBtn.disabled = true;
-                uploadBtn.textContent = '处理中...';
-            } else {
-                loadingDiv.style.display = 'none';
-                uploadBtn.disabled = false;
-                uploadBtn.textContent = '上传并分割文档';
-            }
-        }
-
-        function generateFileName() {
-            const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
-            const random = Math.random().toString(36).substr(2, 9);
-            return `word_${timestamp}_${random}.docx`;
-        }
-
-        async function uploadFile(file) {
-            try {
-                showStatus('正在上传文件...', 'info');
-                
-                // 创建FormData对象
-                const formData = new FormData();
-                formData.append('file', file);
-                
-                // 发送上传请求
-                const response = await fetch(uploadConfig.apiEndpoint, {
-                    method: 'POST',
-                    body: formData
-                });
-                
-                if (!response.ok) {
-                    throw new Error('上传失败');
-                }
-                
-                const result = await response.json();
-                
-                if (result.success) {
-                    showStatus('文件上传成功', 'success');
-                    return result.fileUrl;
-                } else {
-                    throw new Error(result.error || '上传失败');
-                }
-            } catch (error) {
-                showStatus('文件上传失败: ' + error.message, 'error');
-                throw error;
-            }
-        }
+    return _send_frontend_asset(frontend_assets.index, immutable=False)
 
-        async function convertWordToHtml(fileUrl, maxlength) {
-            try {
-                showStatus('正在转换文档...', 'info');
-                
-                const response = await fetch(`${API_BASE_URL}/convert`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        fileurl: fileUrl,
-                        maxlength: parseInt(maxlength)
-                    })
-                });
-
-                const result = await response.json();
-                
-                if (!response.ok) {
-                    throw new Error(result.error || '转换失败');
-                }
-                
-                showStatus('文档转换成功！', 'success');
-                return result;
-                
-            } catch (error) {
-                console.error('转换错误:', error);
-                showStatus(`文档转换失败: ${error.message}`, 'error');
-                throw error;
-            }
-        }
-
-        function displayResults(result) {
-            const resultDiv = document.getElementById('result');
-            
-            if (!result.success || !result.data || result.data.length === 0) {
-                resultDiv.innerHTML = '<p style="color: red;">没有生成有效的分割结果</p>';
-                return;
-            }
-
-            let html = `
-                <h2>分割结果</h2>
-                <p><strong>总片段数:</strong> ${result.total_fragments}</p>
-                <p><strong>片段最大长度:</strong> ${result.maxlength} 字符</p>
-                <hr>
-            `;
-
-            result.data.forEach((fragment, index) => {
-                // 计算片段长度（去除HTML标签后的纯文本长度）
-                const plainTextLength = fragment.replace(/<[^>]*>/g, '').length;
-                const htmlLength = fragment.length;
-                
-                html += `
-                    <div class="fragment">
-                        <h3>片段 ${index + 1}</h3>
-                        <div style="margin-bottom: 10px; color: #666; font-size: 14px;">
-                            <strong>纯文本长度:</strong> ${plainTextLength} 字符 | 
-                            <strong>HTML长度:</strong> ${htmlLength} 字符
-                        </div>
-                        <div class="fragment-content" id="editor-${index}" style="height: 200px; border: 1px solid #dee2e6; border-radius: 4px;"></div>
-                    </div>
-                `;
-            });
-
-            resultDiv.innerHTML = html;
-            
-            // 使用textarea显示HTML内容，防止浏览器解析HTML标签
-            setTimeout(() => {
-                result.data.forEach((fragment, index) => {
-                    const editorElement = document.getElementById(`editor-${index}`);
-                    if (!editorElement) {
-                        console.error(`找不到编辑器容器: editor-${index}`);
-                        return;
-                    }
-                    
-                    // 创建textarea元素
-                    const textarea = document.createElement('textarea');
-                    textarea.value = fragment;
-                    textarea.readOnly = true;
-                    textarea.style.cssText = 'width: 100%; height: 200px; font-family: monospace; font-size: 12px; background-color: #f8f9fa; border: 1px solid #dee2e6; border-radius: 4px; padding: 10px; resize: vertical; white-space: pre; overflow-wrap: normal; overflow-x: auto;';
-                    
-                    // 清空容器并添加textarea
-                    editorElement.innerHTML = '';
-                    editorElement.appendChild(textarea);
-                    
-                    console.log(`片段 ${index} 显示成功`);
-                });
-            }, 100);
-        }
-
-        async function convertWordToPlainText(fileUrl, maxlength) {
-            try {
-                showStatus('正在转换文档为纯文本...', 'info');
-                
-                const response = await fetch(`${API_BASE_URL}/convert-plain`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        fileurl: fileUrl,
-                        maxlength: parseInt(maxlength)
-                    })
-                });
-
-                const result = await response.json();
-                
-                if (!response.ok) {
-                    throw new Error(result.error || '转换失败');
-                }
-                
-                showStatus('文档转换为纯文本成功！', 'success');
-                return result;
-                
-            } catch (error) {
-                console.error('转换错误:', error);
-                showStatus(`文档转换失败: ${error.message}`, 'error');
-                throw error;
-            }
-        }
-
-        function displayPlainResults(result) {
-            const resultDiv = document.getElementById('result');
-            
-            if (!result.success || !result.data || result.data.length === 0) {
-                resultDiv.innerHTML = '<p style="color: red;">没有生成有效的分割结果</p>';
-                return;
-            }
-
-            let html = `
-                <h2>分割结果（纯文本）</h2>
-                <p><strong>总片段数:</strong> ${result.total_fragments}</p>
-                <p><strong>片段最大长度:</strong> ${result.maxlength} 字符</p>
-                <hr>
-            `;
-
-            result.data.forEach((fragment, index) => {
-                const textLength = fragment.length;
-                
-                html += `
-                    <div class="fragment">
-                        <h3>片段 ${index + 1}</h3>
-                        <div style="margin-bottom: 10px; color: #666; font-size: 14px;">
-                            <strong>纯文本长度:</strong> ${textLength} 字符
-                        </div>
-                        <div class="fragment-content" id="plain-editor-${index}" style="height: 200px; border: 1px solid #dee2e6; border-radius: 4px;"></div>
-                    </div>
-                `;
-            });
-
-            resultDiv.innerHTML = html;
-            
-            // 使用textarea显示纯文本内容
-            setTimeout(() => {
-                result.data.forEach((fragment, index) => {
-                    const editorElement = document.getElementById(`plain-editor-${index}`);
-                    if (!editorElement) {
-                        console.error(`找不到编辑器容器: plain-editor-${index}`);
-                        return;
-                    }
-                    
-                    // 创建textarea元素
-                    const textarea = document.createElement('textarea');
-                    textarea.value = fragment;
-                    textarea.readOnly = true;
-                    textarea.style.cssText = 'width: 100%; height: 200px; font-family: monospace; font-size: 12px; background-color: #f8f9fa; border: 1px solid #dee2e6; border-radius: 4px; padding: 10px; resize: vertical; white-space: pre; overflow-wrap: normal; overflow-x: auto;';
-                    
-                    // 清空容器并添加textarea
-                    editorElement.innerHTML = '';
-                    editorElement.appendChild(textarea);
-                    
-                    console.log(`纯文本片段 ${index} 显示成功`);
-                });
-            }, 100);
-        }
-
-        async function uploadAndProcessPlain() {
-            const fileInput = document.getElementById('fileInput');
-            const maxlengthInput = document.getElementById('maxlength');
-            
-            // 验证输入
-            if (!fileInput.files || fileInput.files.length === 0) {
-                showStatus('请选择一个Word文档', 'error');
-                return;
-            }
-            
-            const file = fileInput.files[0];
-            const maxlength = maxlengthInput.value;
-            
-            if (!maxlength || maxlength < 1000) {
-                showStatus('片段长度必须大于1000字符', 'error');
-                return;
-            }
-            
-            // 重置结果区域
-            document.getElementById('result').innerHTML = '';
-            
-            try {
-                showLoading(true);
-                hideStatus();
-                
-                // 1. 上传文件
-                const fileUrl = await uploadFile(file);
-                
-                // 2. 调用纯文本转换接口
-                const result = await convertWordToPlainText(fileUrl, maxlength);
-                
-                // 3. 显示结果
-                displayPlainResults(result);
-                
-            } catch (error) {
-                console.error('处理过程出错:', error);
-                // 错误信息已经在各个步骤中显示
-            } finally {
-                showLoading(false);
-            }
-        }
-
-        async function uploadAndProcess() {
-            const fileInput = document.getElementById('fileInput');
-            const maxlengthInput = document.getElementById('maxlength');
-            
-            // 验证输入
-            if (!fileInput.files || fileInput.files.length === 0) {
-                showStatus('请选择一个Word文档', 'error');
-                return;
-            }
-            
-            const file = fileInput.files[0];
-            const maxlength = maxlengthInput.value;
-            
-            if (!maxlength || maxlength < 1000) {
-                showStatus('片段长度必须大于1000字符', 'error');
-                return;
-            }
-            
-            // 重置结果区域
-            document.getElementById('result').innerHTML = '';
-            
-            try {
-                showLoading(true);
-                hideStatus();
-                
-                // 1. 上传文件
-                const fileUrl = await uploadFile(file);
-                
-                // 2. 调用转换接口
-                const result = await convertWordToHtml(fileUrl, maxlength);
-                
-                // 3. 显示结果
-                displayResults(result);
-                
-            } catch (error) {
-                console.error('处理过程出错:', error);
-                // 错误信息已经在各个步骤中显示
-            } finally {
-                showLoading(false);
-            }
-        }
-
-        // 页面加载完成后检查API服务状态
-        document.addEventListener('DOMContentLoaded', async function() {
-            try {
-                const response = await fetch(API_BASE_URL + '/health');
-                if (response.ok) {
-                    showStatus('API服务连接正常', 'success');
-                    setTimeout(hideStatus, 3000);
-                } else {
-                    showStatus('API服务连接异常', 'error');
-                }
-            } catch (error) {
-                showStatus('无法连接到API服务，请确保服务正在运行', 'error');
-            }
-        });
-    </script>
-</body>
-</html>
-    ''')
+@app.route('/assets/<name>', methods=['GET'])
+def serve_frontend_asset(name):
+    """提供带内容哈希文件名的前端资源"""
+    asset = frontend_assets.get(name)
+    if asset is None:
+        return jsonify({
+            'success': False,
+            'error': '文件不存在'
+        }), 404
+    return _send_frontend_asset(asset, immutable=True)
 
 # 文件清理功能
 def cleanup_old_files():
@@ -743,45 +1291,27 @@ def cleanup_old_files():
         return
     
     try:
-        uploads_dir = UPLOAD_CONFIG['upload_dir']
-        retention_days = CLEANUP_CONFIG['retention_days']
-        
-        if not os.path.exists(uploads_dir):
-            logging.warning(f"上传目录不存在: {uploads_dir}")
-            return
+        # 只弹出过期堆中已到期的条目，无需扫描整个目录
+        deleted_count, total_size = upload_store.expire()
+        image_count, image_size = image_store.expire()
+        deleted_count += image_count
+        total_size += image_size
         
-        # 计算截止时间
-        cutoff_time = time.time() - (retention_days * 24 * 60 * 60)
+        # 清理过期的转换结果缓存
+        if result_cache is not None:
+            expired_results = result_cache.expire()
+            if expired_results and CLEANUP_CONFIG['log_cleanup']:
+                logging.info(f"已清理 {expired_results} 条过期的转换结果缓存")
         
-        # 统计清理的文件数量
-        deleted_count = 0
-        total_size = 0
-        
-        # 遍历uploads目录
-        for filename in os.listdir(uploads_dir):
-            filepath = os.path.join(uploads_dir, filename)
-            
-            # 只处理文件，不处理目录
-            if os.path.isfile(filepath):
-                # 获取文件修改时间
-                file_mtime = os.path.getmtime(filepath)
-                
-                # 如果文件超过保留天数，则删除
-                if file_mtime < cutoff_time:
-                    try:
-                        file_size = os.path.getsize(filepath)
-                        os.remove(filepath)
-                        deleted_count += 1
-                        total_size += file_size
-                        
-                        if CLEANUP_CONFIG['log_cleanup']:
-                            logging.info(f"已删除过期文件: {filename} (大小: {file_size} bytes)")
-                    except Exception as e:
-                        logging.error(f"删除文件失败 {filename}: {str(e)}")
+        # 清理长时间未继续的分块上传会话
+        expired_sessions = chunked_uploads.expire()
+        if expired_sessions and CLEANUP_CONFIG['log_cleanup']:
+            logging.info(f"已清理 {expired_sessions} 个过期的分块上传会话")
         
         # 记录清理结果
         if deleted_count > 0:
-            logging.info(f"文件清理完成: 删除了 {deleted_count} 个文件，释放空间 {total_size} bytes")
+            if CLEANUP_CONFIG['log_cleanup']:
+                logging.info(f"文件清理完成: 删除了 {deleted_count} 个文件，释放空间 {total_size} bytes")
         else:
             logging.info("没有找到需要清理的过期文件")
             
@@ -793,37 +1323,27 @@ def schedule_cleanup():
     if not CLEANUP_CONFIG['enabled']:
         return
     
+    def next_expiry_time():
+        # 上传文件和图片存储中最早的过期时间
+        expiries = [expiry for expiry in (upload_store.next_expiry(), image_store.next_expiry())
+                    if expiry is not None]
+        return min(expiries) if expiries else None
+    
     def cleanup_task():
         while True:
             try:
-                # 获取当前时间
-                now = datetime.datetime.now()
-                cleanup_time_str = CLEANUP_CONFIG['cleanup_time']
-                cleanup_hour, cleanup_minute = map(int, cleanup_time_str.split(':'))
-                
-                # 计算下次执行时间
-                next_run = now.replace(hour=cleanup_hour, minute=cleanup_minute, second=0, microsecond=0)
-                
-                # 如果今天的执行时间已经过了，则安排到明天
-                if now >= next_run:
-                    next_run += datetime.timedelta(days=1)
-                
-                # 计算等待时间（秒）
-                wait_seconds = (next_run - now).total_seconds()
-                
-                logging.info(f"下次文件清理任务将在 {next_run} 执行")
-                
-                # 等待到执行时间
-                time.sleep(wait_seconds)
+                # 等待到最早的文件过期，最长不超过配置的检查间隔（秒）
+                wait_seconds = CLEANUP_CONFIG['cleanup_interval']
+                next_expiry = next_expiry_time()
+                if next_expiry is not None:
+                    wait_seconds = min(wait_seconds, max(0, next_expiry - time.time()))
                 
-                # 执行清理任务
-                logging.info("开始执行定时文件清理任务...")
-                cleanup_old_files()
+                # 有新文件写入时提前醒来重新计算等待时间
+                upload_store.wait_for_change(wait_seconds)
                 
-                # 等待配置的间隔时间
-                interval_hours = CLEANUP_CONFIG['cleanup_interval']
-                logging.info(f"文件清理任务完成，等待 {interval_hours} 小时后再次执行")
-                time.sleep(interval_hours * 60 * 60)
+                next_expiry = next_expiry_time()
+                if next_expiry is not None and next_expiry <= time.time():
+                    cleanup_old_files()
                 
             except Exception as e:
                 logging.error(f"定时清理任务发生错误: {str(e)}")
@@ -853,5 +1373,7 @@ if __name__ == '__main__':
     print(f"服务地址: http://localhost:{port}")
     print(f"API文档: http://localhost:{port}/")
     print(f"健康检查: http://localhost:{port}/health")
+    print(f"就绪检查: http://localhost:{port}/ready")
+    print(f"预先转换: POST http://localhost:{port}/prefetch")
     
     app.run(host=SERVER_CONFIG['host'], port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,292 @@
+"""ASGI前端：在事件循环中异步下载Word文件，下载完成后把请求连同内容交给Flask应用处理，转换在进程池中进行
+
+用法: uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+- /convert、/convert-plain、/outline 请求体中的 fileurl 在事件循环中下载（见 AsyncDownloader），
+  等待远端文件服务器时不占用线程；下载完成后才占用一个线程运行Flask的处理函数
+- 处理函数中的转换交给转换进程池（见 conversion_pool），线程只等待结果，CPU工作进程保持满负荷
+- 其余接口原样转发给Flask应用，参数校验、结果缓存、请求合并和准入控制与WSGI部署完全相同；
+  其请求体（如 /upload/stream、分块上传的PUT）不在内存中整体缓冲，由处理函数边接收边读取（见 ReceiveReader）
+"""
+import io
+import sys
+import json
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import ClientDisconnected
+
+import app as flask_module
+from async_ingest import AsyncDownloader
+from config import ASYNC_CONFIG, API_CONFIG, UPLOAD_CONFIG
+
+# 请求体中带fileurl、需要先下载文档的接口
+DOWNLOAD_PATHS = ('/convert', '/convert-plain', '/outline')
+
+# 事件循环与WSGI线程之间最多排队的请求体消息数，队列满时暂停接收（背压）
+RECEIVE_QUEUE_SIZE = 8
+
+
+class ReceiveReader(io.RawIOBase):
+    """WSGI线程中读取的请求体（wsgi.input）
+
+    事件循环中的 pump() 把ASGI receive() 收到的消息体放入有界队列，WSGI线程读取时从队列中取出，
+    请求体不在内存中整体缓冲。客户端在请求体结束前断开时，读取抛出 ClientDisconnected。
+    """
+
+    def __init__(self, receive, loop, queue_size=RECEIVE_QUEUE_SIZE):
+        super().__init__()
+        self._receive = receive
+        self._loop = loop
+        self._queue = asyncio.Queue(queue_size)
+        self._chunk = memoryview(b'')
+        self._eof = False
+
+    async def pump(self):
+        """在事件循环中接收请求体，直到最后一个消息或客户端断开"""
+        while True:
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                await self._queue.put(ClientDisconnected())
+                return
+            chunk = message.get('body', b'')
+            if chunk:
+                await self._queue.put(chunk)
+            if not message.get('more_body', False):
+                await self._queue.put(None)
+                return
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._chunk and not self._eof:
+            item = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+            if isinstance(item, Exception):
+                raise item
+            if item is None:
+                self._eof = True
+            else:
+                self._chunk = memoryview(item)
+        size = min(len(buffer), len(self._chunk))
+        buffer[:size] = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return size
+
+
+class ASGIFrontend:
+    """把Flask（WSGI）应用包装为ASGI应用，并在转发前异步下载请求中的文档"""
+
+    def __init__(self, wsgi_app, config):
+        self.wsgi_app = wsgi_app
+        self.config = config
+        self.downloader = None
+        self._threads = ThreadPoolExecutor(max_workers=config['wsgi_threads'], thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        if not (scope['method'] == 'POST' and scope['path'] in DOWNLOAD_PATHS):
+            # 不需要预先下载的请求：请求体由处理函数在线程中边接收边读取
+            reader = ReceiveReader(receive, asyncio.get_running_loop())
+            pump = asyncio.ensure_future(reader.pump())
+            environ = self._environ(scope, io.BufferedReader(reader), self._content_length(scope))
+            environ[flask_module.PREFETCHED_ENVIRON_KEY] = {}
+            try:
+                await self._call_wsgi(environ, send)
+            finally:
+                pump.cancel()
+            return
+
+        # 只有需要读取fileurl的JSON请求体在转发前完整读取（体积很小）
+        body = await self._read_body(receive)
+        if body is None:
+            await self._send_json(send, 413, {
+                'success': False,
+                'error': f'文件大小超过限制 {UPLOAD_CONFIG["max_content_length"]} bytes'
+            })
+            return
+
+        prefetched = {}
+        fileurl = self._fileurl(body)
+        if fileurl:
+            try:
+                prefetched[fileurl] = await self._get_downloader().fetch(fileurl)
+            except Exception as e:
+                # 下载异常交给Flask处理函数抛出，错误响应与WSGI部署相同
+                prefetched[fileurl] = e
+
+        environ = self._environ(scope, io.BytesIO(body), len(body))
+        environ[flask_module.PREFETCHED_ENVIRON_KEY] = prefetched
+        await self._call_wsgi(environ, send)
+
+    # ---- 生命周期 ----
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def startup(self):
+        self._get_downloader()
+        if self.config['convert_in_processes']:
+            flask_module.use_conversion_pool = True
+        flask_module.schedule_cleanup()
+        logging.info("ASGI前端已启动")
+
+    async def shutdown(self):
+        if self.downloader is not None:
+            await self.downloader.aclose()
+        self._threads.shutdown(wait=False)
+
+    def _get_downloader(self):
+        # 服务器不发送lifespan事件时在第一个请求中创建
+        if self.downloader is None:
+            self.downloader = AsyncDownloader(
+                max_connections=self.config['max_connections'],
+                max_keepalive_connections=self.config['max_keepalive_connections'],
+                max_per_host=self.config['max_per_host'],
+                timeout=API_CONFIG['timeout'],
+                max_size=self.config['max_download_size']
+            )
+        return self.downloader
+
+    # ---- 请求 ----
+
+    @staticmethod
+    async def _read_body(receive):
+        """读取完整请求体，超过 max_content_length 时返回None"""
+        limit = UPLOAD_CONFIG['max_content_length']
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > limit:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    @staticmethod
+    def _fileurl(body):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        fileurl = data.get('fileurl') if isinstance(data, dict) else None
+        return fileurl if isinstance(fileurl, str) else None
+
+    @staticmethod
+    def _content_length(scope):
+        """请求头中的Content-Length，没有（如分块传输编码）时返回None"""
+        for name, value in scope['headers']:
+            if name.lower() == b'content-length':
+                return int(value) if value.strip().isdigit() else None
+        return None
+
+    @staticmethod
+    def _environ(scope, stream, content_length):
+        """构造WSGI environ，stream为请求体（已终止：读到请求体末尾即结束，由Flask按
+        MAX_CONTENT_LENGTH 限制读取量）"""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client')
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0] if client else '',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': stream,
+            'wsgi.input_terminated': True,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+        if content_length is not None:
+            environ['CONTENT_LENGTH'] = str(content_length)
+        for name, value in scope['headers']:
+            name = name.decode('latin-1')
+            value = value.decode('latin-1')
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'content-length':
+                key = 'HTTP_' + name.upper().replace('-', '_')
+                if key in environ:
+                    # 重复的请求头以逗号合并，Cookie按RFC 6265以"; "合并
+                    separator = '; ' if name == 'cookie' else ','
+                    value = f'{environ[key]}{separator}{value}'
+                environ[key] = value
+        return environ
+
+    async def _call_wsgi(self, environ, send):
+        """在线程池中运行WSGI应用，响应体逐块发送"""
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            response_start = {}
+
+            def start_response(status, headers, exc_info=None):
+                response_start.update({
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                for name, value in headers]
+                })
+
+            result = self.wsgi_app(environ, start_response)
+            try:
+                started = False
+                for chunk in result:
+                    if not chunk:
+                        continue
+                    if not started:
+                        send_from_thread(response_start)
+                        started = True
+                    send_from_thread({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                if not started:
+                    send_from_thread(response_start)
+                send_from_thread({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+
+        await loop.run_in_executor(self._threads, run)
+
+    @staticmethod
+    async def _send_json(send, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json; charset=utf-8'),
+                        (b'content-length', str(len(body)).encode('ascii'))]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+app = ASGIFrontend(flask_module.app, ASYNC_CONFIG)
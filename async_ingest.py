@@ -0,0 +1,136 @@
+"""异步下载：在事件循环中下载Word文件，连接池有总连接数上限，每个主机有并发下载数上限"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from package_inspector import check_url_extension
+
+try:
+    import httpx
+except ImportError:  # 可选依赖，未安装时在线程池中用requests下载
+    httpx = None
+
+
+class DownloadTooLarge(Exception):
+    """下载内容超过大小上限"""
+
+
+class _HostLimit:
+    __slots__ = ('semaphore', 'users')
+
+    def __init__(self, limit):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class AsyncDownloader:
+    """事件循环中的下载器
+
+    - 使用 httpx.AsyncClient 的连接池（max_connections / max_keepalive_connections），
+      等待远端文件服务器时不占用线程，一个进程可以同时进行数百个下载
+    - 同一主机同时进行的下载不超过 max_per_host，避免压垮单个文件服务器
+    - 同一URL进行中的下载只执行一次，并发请求共享结果
+    - 未安装httpx时退化为在线程池（线程数为max_connections）中用requests下载，限制相同
+    """
+
+    def __init__(self, max_connections=256, max_keepalive_connections=32, max_per_host=16,
+                 timeout=30, max_size=None):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.max_size = max_size
+        if httpx is not None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections,
+                                    max_keepalive_connections=max_keepalive_connections),
+                timeout=timeout,
+                follow_redirects=True
+            )
+            self._threads = None
+        else:
+            self._client = None
+            self._threads = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='download')
+        self._hosts = {}
+        self._in_flight = {}
+        self.active = 0
+        self.completed = 0
+        self.coalesced = 0
+
+    async def fetch(self, url):
+        """下载URL的内容并返回字节数据，失败时抛出异常（.doc地址抛出DocumentRejected）"""
+        check_url_extension(url)
+        task = self._in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_limited(url))
+            self._in_flight[url] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        else:
+            self.coalesced += 1
+        # 单个请求被取消（客户端断开）时不影响其他等待同一下载的请求
+        return await asyncio.shield(task)
+
+    async def _fetch_limited(self, url):
+        host = urlsplit(url).netloc
+        limit = self._hosts.get(host)
+        if limit is None:
+            limit = self._hosts[host] = _HostLimit(self.max_per_host)
+        limit.users += 1
+        try:
+            async with limit.semaphore:
+                self.active += 1
+                try:
+                    content = await self._download(url)
+                finally:
+                    self.active -= 1
+                self.completed += 1
+                return content
+        finally:
+            limit.users -= 1
+            if limit.users == 0 and self._hosts.get(host) is limit:
+                del self._hosts[host]
+
+    async def _download(self, url):
+        if self._client is None:
+            from word_to_html_converter import download_word_from_url
+            loop = asyncio.get_running_loop()
+            content = await loop.run_in_executor(self._threads, download_word_from_url, url, self.timeout)
+            if self.max_size is not None and len(content) > self.max_size:
+                raise Exception(f"下载Word文件失败: 文件大小超过限制 {self.max_size} bytes")
+            return content
+
+        try:
+            async with self._client.stream('GET', url) as response:
+                response.raise_for_status()
+                declared = response.headers.get('Content-Length')
+                if declared and declared.isdigit():
+                    self._check_size(int(declared))
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    self._check_size(size)
+                    chunks.append(chunk)
+                return b''.join(chunks)
+        except Exception as e:
+            raise Exception(f"下载Word文件失败: {e}")
+
+    def _check_size(self, size):
+        if self.max_size is not None and size > self.max_size:
+            raise DownloadTooLarge(f'文件大小超过限制 {self.max_size} bytes')
+
+    def stats(self):
+        return {
+            'active': self.active,
+            'waiting': sum(limit.users for limit in self._hosts.values()) - self.active,
+            'in_flight_urls': len(self._in_flight),
+            'hosts': len(self._hosts),
+            'completed': self.completed,
+            'coalesced': self.coalesced,
+            'client': 'httpx' if self._client is not None else 'threads'
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+        if self._threads is not None:
+            self._threads.shutdown(wait=False)
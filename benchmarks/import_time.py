@@ -0,0 +1,89 @@
+"""启动耗时测量：模块导入时间、最慢的导入模块、预热前后的首次转换耗时
+
+用法（在项目根目录）:
+    python benchmarks/import_time.py [--repeat 5] [--top 15]
+
+每次测量都在新的Python进程中进行，工作目录为临时目录，不会在项目中创建上传、缓存文件。
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['word_to_html_converter', 'app']
+
+IMPORT_SCRIPT = '''
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+'''
+
+WARMUP_SCRIPT = '''
+import io, time, contextlib
+from warmup import warm_up
+with contextlib.redirect_stdout(io.StringIO()):
+    first = warm_up()
+    second = warm_up()
+print(first, second)
+'''
+
+
+def run_python(code, workdir, *options):
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run([sys.executable, *options, '-c', code], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    return result
+
+
+def import_time(module, workdir, repeat):
+    """在新进程中导入模块，返回多次测量的耗时中位数（秒）"""
+    timings = []
+    for _ in range(repeat):
+        result = run_python(IMPORT_SCRIPT.format(module=module), workdir)
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def slowest_imports(module, workdir, top):
+    """用 -X importtime 统计导入模块时各依赖的累计耗时，返回 [(累计微秒, 模块名), ...]"""
+    result = run_python(f'import {module}', workdir, '-X', 'importtime')
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 只统计直接被导入的模块（缩进最少的两层），避免同一耗时被子模块重复计入
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量服务的启动耗时')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模块的测量次数')
+    parser.add_argument('--top', type=int, default=15, help='列出的最慢导入模块数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print('模块导入耗时（新进程，中位数）:')
+        for module in MODULES:
+            print(f'  {module:<24} {import_time(module, workdir, args.repeat) * 1000:8.1f} ms')
+
+        print(f'\n导入 app 时最慢的 {args.top} 个模块（累计耗时）:')
+        for cumulative, name in slowest_imports('app', workdir, args.top):
+            print(f'  {name:<40} {cumulative / 1000:8.1f} ms')
+
+        first, second = map(float, run_python(WARMUP_SCRIPT, workdir).stdout.split())
+        print('\n内置小文档的转换耗时:')
+        print(f'  首次（冷启动） {first * 1000:8.1f} ms')
+        print(f'  预热后         {second * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
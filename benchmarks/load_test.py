@@ -0,0 +1,416 @@
+"""压力测试：用本地模拟文件服务器提供合成文档，按目标速率或并发数请求转换服务，统计吞吐、延迟分位数、错误率和服务进程内存
+
+用法（在项目根目录）:
+    python benchmarks/load_test.py --server wsgi --concurrency 16 --duration 30
+    python benchmarks/load_test.py --server asgi --rate 20 --duration 60 --latency 0.5 --bandwidth 1048576
+    python benchmarks/load_test.py --url http://localhost:5000 --pid 1234 --concurrency 8
+
+- --server 在临时目录中启动服务（wsgi: python app.py；asgi: uvicorn asgi:app），上传、缓存文件不会写入项目目录；
+  --url 测试已经运行的服务，此时文档服务器地址须能被该服务访问（--file-host），--pid 指定服务进程以统计内存
+- --rate 为开环模式：按固定间隔发出请求，不等待前面的请求完成，延迟从计划发出的时间算起（包含排队时间）；
+  --concurrency 为闭环模式：固定数量的客户端各自连续发送请求
+- 文档大小、接口按 --mix、--endpoints 的权重随机选择，随机数种子固定（--seed），同样的参数得到同样的请求序列
+- 结果转换缓存以文档内容为键，同一文档第二次请求即命中缓存；--variants 为每种大小生成多个内容不同的文档
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import importlib.util
+import tempfile
+import threading
+import statistics
+import subprocess
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_server import StubFileServer
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 合成文档的大小：每个文档包含的段落组数（每组为一个标题、三个段落、一个列表项，每20组一个表格）
+DOCUMENT_SIZES = {
+    'small': 20,
+    'medium': 200,
+    'large': 1000
+}
+
+ENDPOINTS = ('convert', 'convert-plain', 'outline')
+
+WORDS = ('文档', '转换', '服务', '性能', '测试', '段落', '表格', '标题', '内容', '格式',
+         'document', 'render', 'latency', 'throughput', 'paragraph', 'table', 'style')
+
+
+def parse_weights(text, names):
+    """解析 "a=3,b=1" 形式的权重"""
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in names:
+            raise argparse.ArgumentTypeError(f'未知的名称: {name}（可选: {", ".join(names)}）')
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def build_document(path, groups, rng):
+    """生成包含标题、格式化段落、列表和表格的docx文件"""
+    from docx import Document
+
+    def sentence(count):
+        return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+    doc = Document()
+    for index in range(groups):
+        doc.add_heading(f'{index + 1}. {sentence(4)}', level=1 + index % 3)
+        for _ in range(3):
+            paragraph = doc.add_paragraph(sentence(30))
+            run = paragraph.add_run(' ' + sentence(5))
+            run.bold = True
+            paragraph.add_run(' ' + sentence(10)).italic = True
+        doc.add_paragraph(sentence(8), style='List Bullet')
+        if index % 20 == 19:
+            table = doc.add_table(rows=4, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = sentence(3)
+    doc.save(path)
+
+
+def build_corpus(directory, variants, seed):
+    """在目录中生成合成文档，返回 {大小名称: [文件名, ...]}"""
+    rng = random.Random(seed)
+    corpus = {}
+    for size, groups in DOCUMENT_SIZES.items():
+        names = []
+        for variant in range(variants):
+            name = f'{size}-{variant}.docx'
+            path = os.path.join(directory, name)
+            if not os.path.exists(path):
+                build_document(path, groups, rng)
+            names.append(name)
+        corpus[size] = names
+    return corpus
+
+
+def process_tree_rss(pid):
+    """进程及其所有子进程（如转换进程池）的常驻内存之和（字节），只支持Linux"""
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # 进程名可能包含空格，ppid是右括号之后的第二个字段
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children[ppid].append(int(entry))
+
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+        pending.extend(children.get(current, ()))
+    return total
+
+
+class RSSSampler:
+    """后台定时采样服务进程树的内存"""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(process_tree_rss(self.pid))
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self.pid is not None:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def start_service(mode, port, workdir, log_path):
+    """在临时工作目录中启动服务进程"""
+    env = dict(os.environ, PYTHONPATH=PROJECT_DIR, PORT=str(port), PYTHONDONTWRITEBYTECODE='1')
+    if mode == 'wsgi':
+        command = [sys.executable, os.path.join(PROJECT_DIR, 'app.py')]
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+                   '--port', str(port), '--log-level', 'warning']
+    log = open(log_path, 'wb')
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(base_url, process=None, timeout=60):
+    """等待服务的 /ready 返回200"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f'服务进程已退出（返回码 {process.returncode}）')
+        try:
+            if requests.get(f'{base_url}/ready', timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'服务在 {timeout} 秒内没有就绪')
+
+
+class LoadGenerator:
+    """生成请求序列并发送，记录每个请求的结果"""
+
+    def __init__(self, base_url, file_base_url, corpus, mix, endpoints, maxlength, seed):
+        self.base_url = base_url
+        self.file_base_url = file_base_url
+        self.corpus = corpus
+        self.rng = random.Random(seed)
+        self.sizes = list(mix)
+        self.size_weights = [mix[name] for name in self.sizes]
+        self.endpoints = list(endpoints)
+        self.endpoint_weights = [endpoints[name] for name in self.endpoints]
+        self.maxlength = maxlength
+        self.results = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def next_request(self):
+        with self._lock:
+            size = self.rng.choices(self.sizes, self.size_weights)[0]
+            endpoint = self.rng.choices(self.endpoints, self.endpoint_weights)[0]
+            name = self.rng.choice(self.corpus[size])
+        return size, endpoint, name
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def send(self, request, scheduled=None):
+        """发送一个请求；scheduled为开环模式下计划发出的时间，延迟从该时间算起"""
+        size, endpoint, name = request
+        payload = {'fileurl': f'{self.file_base_url}/{name}'}
+        if endpoint != 'outline':
+            payload['maxlength'] = self.maxlength
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            response = self._session().post(f'{self.base_url}/{endpoint}', json=payload, timeout=300)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.results.append((endpoint, size, status, latency))
+
+    def run_closed(self, concurrency, duration):
+        """闭环：concurrency个客户端各自连续发送请求，持续duration秒"""
+        stop_at = time.perf_counter() + duration
+
+        def client():
+            while time.perf_counter() < stop_at:
+                self.send(self.next_request())
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, rate, duration, max_in_flight):
+        """开环：每秒发出rate个请求，持续duration秒；同时进行的请求超过max_in_flight时在客户端排队"""
+        interval = 1.0 / rate
+        total = int(rate * duration)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            for index in range(total):
+                scheduled = start + index * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.send, self.next_request(), scheduled)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # 最近秩法
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize(results, elapsed):
+    """汇总请求结果：总体和按接口、按文档大小分组的吞吐、错误率和延迟分位数"""
+    def group_stats(items):
+        latencies = sorted(latency for _, _, _, latency in items)
+        errors = sum(1 for _, _, status, _ in items if status != 200)
+        return {
+            'requests': len(items),
+            'throughput': round((len(items) - errors) / elapsed, 2) if elapsed else 0.0,
+            'error_rate': round(errors / len(items), 4) if items else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0
+        }
+
+    by_endpoint = defaultdict(list)
+    by_size = defaultdict(list)
+    for item in results:
+        by_endpoint[item[0]].append(item)
+        by_size[item[1]].append(item)
+    return {
+        'elapsed': round(elapsed, 2),
+        'overall': group_stats(results),
+        'status': dict(Counter(str(status) for _, _, status, _ in results)),
+        'by_endpoint': {name: group_stats(items) for name, items in sorted(by_endpoint.items())},
+        'by_size': {name: group_stats(items) for name, items in sorted(by_size.items())}
+    }
+
+
+def print_report(report):
+    def row(name, stats):
+        print(f'  {name:<14} {stats["requests"]:>7} {stats["throughput"]:>9.2f} {stats["error_rate"] * 100:>7.2f}% '
+              f'{stats["p50_ms"]:>9.1f} {stats["p95_ms"]:>9.1f} {stats["p99_ms"]:>9.1f} {stats["max_ms"]:>9.1f}')
+
+    print(f'\n持续时间 {report["elapsed"]} 秒，状态码: {report["status"]}')
+    print(f'  {"":<14} {"请求数":>5} {"吞吐(/s)":>7} {"错误率":>6} {"p50(ms)":>9} {"p95(ms)":>9} {"p99(ms)":>9} {"max(ms)":>9}')
+    row('总计', report['overall'])
+    for name, stats in report['by_endpoint'].items():
+        row(f'/{name}', stats)
+    for name, stats in report['by_size'].items():
+        row(name, stats)
+    rss = report.get('rss')
+    if rss:
+        print(f'服务进程内存（含子进程）: 开始 {rss["start_mb"]} MB，峰值 {rss["peak_mb"]} MB，结束 {rss["end_mb"]} MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='转换服务压力测试')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi', help='在临时目录中启动的服务模式')
+    target.add_argument('--url', help='测试已经运行的服务（不启动服务）')
+    parser.add_argument('--pid', type=int, help='--url 模式下统计内存的服务进程号')
+    parser.add_argument('--port', type=int, default=5099, help='启动的服务使用的端口')
+    parser.add_argument('--file-host', default='127.0.0.1', help='服务访问文档服务器使用的地址')
+
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=8, help='闭环模式的客户端数')
+    load.add_argument('--rate', type=float, help='开环模式的目标请求速率（每秒）')
+    parser.add_argument('--max-in-flight', type=int, default=512, help='开环模式同时进行的请求数上限')
+    parser.add_argument('--duration', type=float, default=30, help='测试持续时间（秒）')
+    parser.add_argument('--warmup', type=float, default=0, help='正式测试前的预热时间（秒，结果不计入）')
+
+    parser.add_argument('--mix', default='small=6,medium=3,large=1', help='文档大小的权重')
+    parser.add_argument('--endpoints', default='convert=3,convert-plain=1,outline=1', help='接口的权重')
+    parser.add_argument('--variants', type=int, default=4, help='每种大小生成的文档数')
+    parser.add_argument('--maxlength', type=int, default=5000, help='请求中的maxlength')
+    parser.add_argument('--seed', type=int, default=1, help='随机数种子')
+    parser.add_argument('--corpus-dir', help='合成文档目录（默认使用临时目录，指定后可在多次测试间复用）')
+
+    parser.add_argument('--latency', type=float, default=0.05, help='文档服务器的响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='文档服务器延迟的随机抖动上限（秒）')
+    parser.add_argument('--bandwidth', type=int, default=0, help='文档服务器每个连接的发送速率（字节/秒），0为不限速')
+    parser.add_argument('--json', help='把结果（含参数）写入JSON文件，便于比较不同的服务模式和配置')
+    args = parser.parse_args()
+
+    if not args.url and args.server == 'asgi' and importlib.util.find_spec('uvicorn') is None:
+        parser.error('--server asgi 需要安装uvicorn（pip install uvicorn httpx）')
+    mix = parse_weights(args.mix, DOCUMENT_SIZES)
+    endpoints = parse_weights(args.endpoints, ENDPOINTS)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus_dir = args.corpus_dir or os.path.join(workdir, 'corpus')
+        os.makedirs(corpus_dir, exist_ok=True)
+        print('生成合成文档...')
+        corpus = build_corpus(corpus_dir, args.variants, args.seed)
+
+        file_server = StubFileServer(corpus_dir, args.latency, args.jitter, args.bandwidth)
+        file_port = file_server.start_in_thread(host='0.0.0.0')
+        file_base_url = f'http://{args.file_host}:{file_port}'
+        print(f'文档服务器: {file_base_url}（延迟 {args.latency} 秒，带宽 {args.bandwidth or "不限"}）')
+
+        process = None
+        if args.url:
+            base_url = args.url.rstrip('/')
+            pid = args.pid
+        else:
+            service_dir = os.path.join(workdir, 'service')
+            os.makedirs(service_dir)
+            process = start_service(args.server, args.port, service_dir, os.path.join(workdir, 'service.log'))
+            base_url = f'http://127.0.0.1:{args.port}'
+            pid = process.pid
+            print(f'启动服务（{args.server}）: {base_url}')
+
+        try:
+            wait_ready(base_url, process)
+            generator = LoadGenerator(base_url, file_base_url, corpus, mix, endpoints, args.maxlength, args.seed)
+
+            def run(duration):
+                if args.rate:
+                    generator.run_open(args.rate, duration, args.max_in_flight)
+                else:
+                    generator.run_closed(args.concurrency, duration)
+
+            if args.warmup:
+                print(f'预热 {args.warmup} 秒...')
+                run(args.warmup)
+                generator.results.clear()
+
+            mode = f'速率 {args.rate}/s' if args.rate else f'并发 {args.concurrency}'
+            print(f'开始测试（{mode}，{args.duration} 秒）...')
+            sampler = RSSSampler(pid).start()
+            start = time.perf_counter()
+            run(args.duration)
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+        finally:
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    report = summarize(generator.results, elapsed)
+    if sampler.samples:
+        report['rss'] = {
+            'start_mb': round(sampler.samples[0] / 1024 / 1024, 1),
+            'peak_mb': round(max(sampler.samples) / 1024 / 1024, 1),
+            'end_mb': round(sampler.samples[-1] / 1024 / 1024, 1)
+        }
+    print_report(report)
+    if args.json:
+        report['args'] = vars(args)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {args.json}')
+
+
+if __name__ == '__main__':
+    main()
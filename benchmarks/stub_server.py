@@ -0,0 +1,143 @@
+"""模拟远端文件服务器：按指定的延迟和带宽提供目录中的文件，用于测试下载并发和转换吞吐
+
+用法:
+    python benchmarks/stub_server.py <目录> [--port 8765] [--latency 0.5] [--jitter 0.1] [--bandwidth 1048576]
+
+- 每个请求先等待 latency 秒（另加 0~jitter 秒的随机抖动），模拟远端服务器的响应时间
+- bandwidth 为每个连接的发送速率（字节/秒），0表示不限速
+- 基于asyncio，单进程可以同时保持数千个慢连接；支持HTTP/1.1长连接
+"""
+import os
+import asyncio
+import random
+import argparse
+import threading
+from urllib.parse import unquote, urlsplit
+
+SEND_CHUNK_SIZE = 64 * 1024
+
+
+class StubFileServer:
+    """提供目录中文件的慢速HTTP服务器（只支持GET/HEAD，文件在首次请求时读入内存）"""
+
+    def __init__(self, root, latency=0.0, jitter=0.0, bandwidth=0):
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._files = {}
+        self._server = None
+
+    def _load(self, name):
+        content = self._files.get(name)
+        if content is None:
+            path = os.path.join(self.root, name)
+            if not os.path.isfile(path):
+                return None
+            with open(path, 'rb') as f:
+                content = self._files[name] = f.read()
+        return content
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                method, target, version = request_line.decode('latin-1').split()
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, method, target, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, method, target, keep_alive):
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            delay = self.latency + random.uniform(0, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            name = os.path.basename(unquote(urlsplit(target).path))
+            content = self._load(name) if name and method in ('GET', 'HEAD') else None
+            status = '200 OK' if content is not None else '404 Not Found'
+            body = content if content is not None else b'not found'
+            writer.write((f'HTTP/1.1 {status}\r\n'
+                          f'Content-Type: application/octet-stream\r\n'
+                          f'Content-Length: {len(body)}\r\n'
+                          f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n').encode('latin-1'))
+            if method == 'HEAD':
+                await writer.drain()
+                return
+            for start in range(0, len(body), SEND_CHUNK_SIZE):
+                chunk = body[start:start + SEND_CHUNK_SIZE]
+                writer.write(chunk)
+                await writer.drain()
+                if self.bandwidth:
+                    await asyncio.sleep(len(chunk) / self.bandwidth)
+            await writer.drain()
+        finally:
+            self.active -= 1
+
+    async def start(self, host='127.0.0.1', port=0):
+        """开始监听，返回实际端口"""
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=4096)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host='127.0.0.1', port=0):
+        port = await self.start(host, port)
+        print(f'模拟文件服务器: http://{host}:{port}/ -> {self.root}')
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self, host='127.0.0.1', port=0):
+        """在后台线程的事件循环中运行（供测试和压测脚本使用），返回实际端口"""
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        result = {}
+
+        def run():
+            asyncio.set_event_loop(loop)
+            result['port'] = loop.run_until_complete(self.start(host, port))
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, name='stub-server', daemon=True).start()
+        started.wait()
+        return result['port']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='模拟远端文件服务器')
+    parser.add_argument('root', help='提供文件的目录')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help='每个请求的响应延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟的随机抖动上限（秒）')
+    parser.add_argument('--bandwidth', type=int, default=0, help='每个连接的发送速率（字节/秒），0为不限速')
+    args = parser.parse_args()
+
+    server = StubFileServer(args.root, args.latency, args.jitter, args.bandwidth)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
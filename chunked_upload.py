@@ -0,0 +1,226 @@
+"""流式上传与可断点续传的分块上传"""
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from upload_store import CHUNK_SIZE
+
+# 分块上传的临时目录名（以.开头，存储索引扫描时会跳过）
+PARTIAL_DIR_NAME = '.partial'
+
+
+class UploadTooLarge(Exception):
+    """上传内容超过大小限制"""
+
+
+class OffsetMismatch(Exception):
+    """分块偏移量与服务端已接收的字节数不一致"""
+
+    def __init__(self, expected):
+        super().__init__(f'偏移量不匹配，服务端已接收 {expected} 字节')
+        self.expected = expected
+
+
+class LimitedReader:
+    """包装输入流，按块读取并在累计字节数超过上限时立即抛出UploadTooLarge"""
+
+    def __init__(self, stream, limit, already_read=0):
+        self.stream = stream
+        self.limit = limit
+        self.total = already_read
+
+    def read(self, size=CHUNK_SIZE):
+        chunk = self.stream.read(size)
+        self.total += len(chunk)
+        if self.limit is not None and self.total > self.limit:
+            raise UploadTooLarge(f'文件大小超过限制 {self.limit} bytes')
+        return chunk
+
+
+class ChunkedUploadManager:
+    """分块上传会话管理
+
+    每个会话对应 <root>/.partial/ 下的一个数据文件和一个JSON描述文件。
+    已接收的字节数以数据文件大小为准，因此进程重启后仍可继续上传；
+    内存中保存增量哈希状态，未中断时完成上传无需重新读取文件。
+    同一会话的并发请求（如客户端重试同一分块）持有会话锁串行执行，后到的请求按新的偏移量检查。
+    """
+
+    def __init__(self, root, max_size=None, session_ttl=None):
+        self.directory = os.path.join(root, PARTIAL_DIR_NAME)
+        self.max_size = max_size
+        self.session_ttl = session_ttl
+        self._lock = threading.Lock()
+        # 上传ID -> (已哈希字节数, hashlib对象)
+        self._hashers = {}
+        # 上传ID -> [会话锁, 使用者数]；同一会话的分块追加和完成串行执行
+        self._session_locks = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _data_path(self, upload_id):
+        return os.path.join(self.directory, upload_id)
+
+    def _info_path(self, upload_id):
+        return os.path.join(self.directory, f'{upload_id}.json')
+
+    def create(self, filename, total_size=None):
+        """创建上传会话，返回会话信息"""
+        if total_size is not None and self.max_size is not None and total_size > self.max_size:
+            raise UploadTooLarge(f'文件大小超过限制 {self.max_size} bytes')
+
+        upload_id = uuid.uuid4().hex
+        info = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'total_size': total_size,
+            'created': time.time()
+        }
+        with open(self._info_path(upload_id), 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False)
+        open(self._data_path(upload_id), 'wb').close()
+        with self._lock:
+            self._hashers[upload_id] = (0, hashlib.sha256())
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        """返回会话信息（含当前偏移量），会话不存在时返回None"""
+        if not self._valid_id(upload_id):
+            return None
+        try:
+            with open(self._info_path(upload_id), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            info['offset'] = os.path.getsize(self._data_path(upload_id))
+        except (FileNotFoundError, ValueError):
+            return None
+        return info
+
+    @staticmethod
+    def _valid_id(upload_id):
+        return len(upload_id) == 32 and all(c in '0123456789abcdef' for c in upload_id)
+
+    def append(self, upload_id, offset, stream):
+        """在指定偏移量处追加一个分块，返回追加后的会话信息
+
+        偏移量必须等于服务端已接收的字节数，否则抛出OffsetMismatch，
+        客户端据此从正确位置续传。
+        """
+        with self._session_lock(upload_id):
+            return self._append(upload_id, offset, stream)
+
+    def _append(self, upload_id, offset, stream):
+        """追加分块（调用方持有会话锁，从偏移量检查到写入完成期间不会有同一会话的其他写入）"""
+        info = self.status(upload_id)
+        if info is None:
+            raise FileNotFoundError(upload_id)
+        if offset != info['offset']:
+            raise OffsetMismatch(info['offset'])
+
+        limit = self.max_size
+        if info['total_size'] is not None:
+            limit = info['total_size'] if limit is None else min(limit, info['total_size'])
+        reader = LimitedReader(stream, limit, already_read=offset)
+
+        with self._lock:
+            hashed, hasher = self._hashers.get(upload_id, (None, None))
+        if hashed != offset:
+            # 进程重启或多进程部署时内存中没有对应的哈希状态，完成时再整体计算
+            hasher = None
+
+        data_path = self._data_path(upload_id)
+        with open(data_path, 'r+b') as f:
+            f.seek(offset)
+            try:
+                while True:
+                    chunk = reader.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+            except BaseException:
+                # 丢弃本次不完整的分块，保持文件大小与已确认的偏移量一致
+                f.truncate(offset)
+                with self._lock:
+                    self._hashers.pop(upload_id, None)
+                raise
+
+        with self._lock:
+            if hasher is not None:
+                self._hashers[upload_id] = (reader.total, hasher)
+            else:
+                self._hashers.pop(upload_id, None)
+
+        info['offset'] = reader.total
+        info['complete'] = info['total_size'] is not None and reader.total == info['total_size']
+        return info
+
+    def finish(self, upload_id):
+        """结束上传会话，返回 (数据文件路径, 内容哈希或None, 会话信息)
+
+        内容哈希为None表示增量哈希状态不可用，需要调用方重新计算。
+        调用方负责随后将数据文件移走并调用discard。
+        """
+        with self._session_lock(upload_id):
+            info = self.status(upload_id)
+            if info is None:
+                raise FileNotFoundError(upload_id)
+            if info['total_size'] is not None and info['offset'] != info['total_size']:
+                raise OffsetMismatch(info['offset'])
+
+            content_hash = None
+            with self._lock:
+                hashed, hasher = self._hashers.get(upload_id, (None, None))
+                if hashed == info['offset']:
+                    content_hash = hasher.hexdigest()
+            return self._data_path(upload_id), content_hash, info
+
+    @contextmanager
+    def _session_lock(self, upload_id):
+        """持有会话锁，没有使用者时删除锁"""
+        with self._lock:
+            entry = self._session_locks.setdefault(upload_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._session_locks[upload_id]
+
+    def discard(self, upload_id):
+        """删除会话的临时文件"""
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+        for path in (self._data_path(upload_id), self._info_path(upload_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def expire(self, now=None):
+        """删除超过有效期仍未完成的会话，返回删除数量"""
+        if self.session_ttl is None:
+            return 0
+        if now is None:
+            now = time.time()
+        expired = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.json'):
+                    continue
+                upload_id = entry.name[:-len('.json')]
+                data_path = self._data_path(upload_id)
+                try:
+                    last_write = max(entry.stat().st_mtime, os.path.getmtime(data_path))
+                except OSError:
+                    last_write = entry.stat().st_mtime
+                if last_write + self.session_ttl < now:
+                    self.discard(upload_id)
+                    expired += 1
+        return expired
@@ -4,31 +4,157 @@
 SERVER_CONFIG = {
     'host': '0.0.0.0',
     'port': 5000,
-    'debug': False
+    'debug': False,
+    'use_x_sendfile': False  # 由前置的Nginx/Apache通过X-Sendfile发送文件
 }
 
 # 文件上传配置
 UPLOAD_CONFIG = {
     'upload_dir': 'uploads',
     'max_content_length': 16 * 1024 * 1024,  # 16MB
-    'allowed_extensions': ['.doc', '.docx']
+    'allowed_extensions': ['.doc', '.docx'],
+    'max_total_size': 2 * 1024 * 1024 * 1024,  # 上传目录总容量配额（字节），超出时按LRU淘汰，默认2GB
+    'shard_depth': 2,  # 分片目录层数（uploads/ab/cd/文件）
+    'chunk_size': 4 * 1024 * 1024,  # 分块上传建议的分块大小（字节）
+    'chunk_session_ttl': 24 * 60 * 60  # 分块上传会话无新分块时的有效期（秒）
 }
 
 # 文件清理配置
 CLEANUP_CONFIG = {
     'enabled': True,  # 是否启用自动清理
     'retention_days': 3,  # 文件保留天数
-    'cleanup_interval': 24 * 60 * 60,  # 清理检查间隔（秒），默认24小时
-    'cleanup_time': '02:00',  # 每天清理时间（HH:MM格式）
+    'cleanup_interval': 60 * 60,  # 两次过期检查之间的最长等待时间（秒），默认1小时
     'log_cleanup': True  # 是否记录清理日志
 }
 
 
+# 静态文件配置
+STATIC_CONFIG = {
+    'immutable_max_age': 365 * 24 * 60 * 60,  # 内容寻址文件的缓存时间（秒）
+    'default_max_age': 60 * 60  # 其他文件的缓存时间（秒）
+}
+
+# 文档图片配置
+IMAGE_CONFIG = {
+    'enabled': True,  # 是否提取文档图片并在输出中以URL引用（false时与旧版本一样不输出图片）
+    'image_dir': 'uploads/.images',  # 图片存储目录（按内容哈希去重，跨文档共用）
+    'base_url': '/images',  # 输出中图片URL的前缀
+    'max_total_size': 1024 * 1024 * 1024,  # 图片存储总容量配额（字节），超出时按LRU淘汰，默认1GB
+    'thumbnail_widths': [128, 256, 512, 1024]  # 允许的缩略图宽度（像素），请求时按需生成并缓存，需要安装Pillow
+}
+
 # 转换配置
 CONVERT_CONFIG = {
     'default_maxlength': 10000,
     'min_maxlength': 1000,
-    'max_maxlength': 50000
+    'max_maxlength': 50000,
+    'preview_fragments': 1  # preview为true时返回的片段数
+}
+
+# 并行渲染配置（单个大文档）
+PARALLEL_CONFIG = {
+    'enabled': True,  # 是否允许并行渲染
+    'workers': None,  # 工作进程数，None表示使用CPU核数
+    'min_blocks': 2000,  # 顶层元素（段落+表格）数量达到该值才并行，否则串行以避免进程池开销
+    'chunks_per_worker': 2  # 每个工作进程分到的分块数
+}
+
+# 并发请求合并配置
+COALESCE_CONFIG = {
+    'enabled': True,  # 同一URL的并发下载、同一内容和参数的并发转换只执行一次，结果共享
+    'wait_timeout': 120  # 等待进行中的下载/转换的最长时间（秒），超时返回504
+}
+
+# 转换结果缓存配置（多个工作进程共享，有效期为 CLEANUP_CONFIG['retention_days']）
+CACHE_CONFIG = {
+    'enabled': True,
+    'backend': 'sqlite',  # sqlite: 多进程共享的SQLite（WAL模式）；memory: 只在进程内
+    'path': 'uploads/.cache/results.db',  # sqlite数据库文件
+    'max_size': 512 * 1024 * 1024,  # 共享缓存总大小上限（压缩后字节），超出时按LRU淘汰
+    'max_entry_size': 32 * 1024 * 1024,  # 单个结果的大小上限（压缩后字节），超过时不缓存
+    'memory_entries': 256,  # 进程内前置缓存的条目数
+    'memory_max_size': 64 * 1024 * 1024  # 进程内前置缓存的总大小上限（按压缩后字节计）
+}
+
+# 转换准入控制配置（防止多个大文档同时转换导致内存耗尽）
+ADMISSION_CONFIG = {
+    'enabled': True,
+    'max_concurrent': 4,  # 同时进行的转换数上限
+    'memory_budget': 1024 * 1024 * 1024,  # 同时进行的转换的估算内存之和上限（字节），默认1GB
+    'max_queue': 32,  # 排队等待的请求数上限，超出时立即返回503
+    'queue_timeout': 10,  # 排队的最长时间（秒），超时返回503
+    'retry_after': 5,  # 503响应的Retry-After（秒）
+    # 内存估算: base_cost + 压缩大小 * compressed_factor + document.xml解压后大小 * xml_factor
+    'base_cost': 8 * 1024 * 1024,
+    'compressed_factor': 2,
+    'xml_factor': 16  # 解析后的元素树约为XML大小的十几到几十倍
+}
+
+# 文档包检查配置（解析XML之前只读取zip中央目录，拒绝过大或疑似zip炸弹的文档）
+PACKAGE_CONFIG = {
+    'max_entries': 10000,  # zip中的部件数上限
+    'max_document_xml_size': 64 * 1024 * 1024,  # word/document.xml 解压后大小上限（字节）
+    'max_part_size': 256 * 1024 * 1024,  # 单个部件（含图片）解压后大小上限（字节）
+    'max_uncompressed_size': 512 * 1024 * 1024,  # 所有部件解压后总大小上限（字节）
+    'max_compression_ratio': 200,  # 单个部件的解压/压缩比上限，正常文档的XML约为10~50
+    'ratio_min_size': 1024 * 1024  # 解压后不超过该大小的部件不检查压缩比
+}
+
+# 转换内存统计配置（结果见 /health）
+MEMORY_CONFIG = {
+    'enabled': True,
+    'window': 200,  # 汇总最近多少次转换
+    'sample_interval': 0.05,  # 转换进行期间读取进程RSS的间隔（秒）
+    'tracemalloc_rate': 0.01,  # 用tracemalloc统计Python分配峰值的转换比例（跟踪期间转换明显变慢），0为不统计
+    'outlier_rss': 256 * 1024 * 1024,  # RSS增长超过该值（字节）的转换记录警告日志
+    'outlier_factor': 4.0,  # RSS增长超过最近转换中位数的该倍数时也记录警告日志
+    'not_ready_ratio': 0.9  # 进程RSS超过容器内存上限的该比例时 /ready 返回503
+}
+
+# 预先转换配置（POST /prefetch）
+PREFETCH_CONFIG = {
+    'enabled': True,
+    'rate': 2.0,  # 每秒最多开始预先转换的文档数
+    'idle_slots': 1,  # 至少留给交互请求的空闲转换名额（准入控制的max_concurrent），不足时暂停预先转换
+    'busy_wait': 0.5,  # 暂停后重新检查的间隔（秒）
+    'max_attempts': 5,  # 被准入控制拒绝等可重试错误时，每个文档最多尝试的次数，之后记为失败
+    'max_urls': 10000,  # 每次提交的URL数上限
+    'max_variants': 8,  # 每次提交的变体数上限
+    'max_pending': 100000,  # 等待预先转换的文档总数上限
+    'max_jobs': 50,  # 保留状态的任务数
+    'nice': 10  # 后台线程的nice值增量（只在Linux上有效）
+}
+
+# ASGI前端配置（uvicorn asgi:app，见asgi.py）
+ASYNC_CONFIG = {
+    'max_connections': 256,  # 下载连接池的总连接数上限（同时进行的下载数）
+    'max_keepalive_connections': 32,  # 连接池中保持的空闲连接数
+    'max_per_host': 16,  # 同一主机同时进行的下载数上限
+    'max_download_size': 64 * 1024 * 1024,  # 下载文件的大小上限（字节）
+    'wsgi_threads': 32,  # 运行Flask处理函数的线程数（下载完成后才占用线程）
+    'convert_in_processes': True,  # 是否把转换交给转换进程池
+    'cpu_workers': None  # 转换进程数，None表示使用CPU核数
+}
+
+# 启动预热配置
+WARMUP_CONFIG = {
+    'enabled': True  # 启动后在后台导入延迟加载的模块并转换内置的小文档，完成前 /ready 返回503
+}
+
+# 文档版本记录配置（增量重新转换）
+VERSION_CONFIG = {
+    'max_versions': 1000,  # 最多保留的版本数
+    'max_cached_chars': 200 * 1000 * 1000  # 版本记录中块HTML的总字符数上限
+}
+
+# 响应编码配置
+RESPONSE_CONFIG = {
+    'compress_min_size': 1024,  # 响应体超过该字节数才压缩
+    'compress_level': {  # 各压缩编码的压缩级别
+        'zstd': 3,
+        'gzip': 6,
+        'deflate': 6
+    }
 }
 
 # API配置
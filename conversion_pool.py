@@ -0,0 +1,88 @@
+"""整文档转换进程池：下载完成的文档内容交给工作进程解析和转换，不占用Web进程的GIL"""
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from config import ASYNC_CONFIG, API_CONFIG, IMAGE_CONFIG, UPLOAD_CONFIG, CLEANUP_CONFIG
+from deadline import ConversionTimeout, Deadline
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# 工作进程内的图片存储（与Web进程共用同一目录，按内容寻址，写入互不冲突）
+_worker_image_store = None
+
+
+def get_executor():
+    """返回共享的转换进程池（首次使用时创建）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = ASYNC_CONFIG['cpu_workers'] or os.cpu_count() or 1
+            # 使用spawn启动工作进程，避免在多线程的Web进程中fork
+            _executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(shutdown_executor)
+        return _executor
+
+
+def shutdown_executor():
+    """关闭进程池"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _image_store():
+    global _worker_image_store
+    if _worker_image_store is None:
+        from image_store import image_store_from_config
+        _worker_image_store = image_store_from_config(
+            IMAGE_CONFIG,
+            retention_seconds=CLEANUP_CONFIG['retention_days'] * 24 * 60 * 60 if CLEANUP_CONFIG['enabled'] else None,
+            shard_depth=UPLOAD_CONFIG['shard_depth']
+        )
+    return _worker_image_store
+
+
+def _convert_content(content, max_length, images=False, skip_inspection=False, expires_at=None, timeout=None,
+                     **options):
+    """在工作进程中解析并转换文档内容，参数见convert_document（images为是否提取图片，
+    skip_inspection见load_word_document，expires_at为截止时刻的墙上时间，None表示不限时，
+    timeout只用于超时的错误信息）"""
+    from word_to_html_converter import load_word_document, convert_document
+
+    deadline = Deadline.at(expires_at, timeout) if expires_at is not None else Deadline()
+    # 在队列中等待期间请求已超时的，不再开始转换
+    deadline.check()
+    # 已经在工作进程中，不再把单个文档分到另一个进程池并行渲染
+    options.pop('parallel', None)
+    return convert_document(load_word_document(content, skip_inspection), max_length,
+                            image_store=_image_store() if images else None,
+                            deadline=deadline, **options)
+
+
+def convert_in_pool(content, max_length, image_store=None, skip_inspection=False, deadline=None, **options):
+    """在进程池中转换文档内容并等待结果，参数与convert_document相同
+
+    image_store只表示是否提取图片：工作进程使用按相同配置创建的图片存储，
+    Web进程的 ImageStore.get 会在首次访问时发现这些图片。
+    调用方已检查过文档包时传入 skip_inspection=True，工作进程解析前不再检查。
+    deadline（默认按 API_CONFIG['timeout'] 创建）包含在进程池中排队的时间，超过时取消未开始的转换并抛出
+    ConversionTimeout；截止时刻以墙上时间传给工作进程，取出任务时已超过的不再转换，已开始的转换在同一时刻停止。
+    """
+    if deadline is None:
+        deadline = Deadline(API_CONFIG['timeout'])
+    deadline.check()
+    future = get_executor().submit(_convert_content, content, max_length,
+                                   images=image_store is not None, skip_inspection=skip_inspection,
+                                   expires_at=deadline.wall_expires_at(), timeout=deadline.timeout, **options)
+    try:
+        return future.result(timeout=deadline.remaining())
+    except FutureTimeout:
+        future.cancel()
+        raise ConversionTimeout(f'转换超时（{deadline.timeout}秒）')
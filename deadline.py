@@ -0,0 +1,49 @@
+"""转换截止时间：由转换的各个循环定期检查，超时或取消后尽快停止并释放工作线程"""
+import time
+
+
+class ConversionTimeout(TimeoutError):
+    """转换超过截止时间或已被取消"""
+
+
+class Deadline:
+    """一次转换的截止时间，同时作为取消令牌
+
+    - timeout为None或0时不限时，只能通过 cancel() 停止
+    - check() 在超时或已取消时抛出 ConversionTimeout；遍历、渲染和分割循环每处理一个元素或片段调用一次
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout if timeout else None
+        self.cancelled = False
+
+    @classmethod
+    def at(cls, wall_expires_at, timeout=None):
+        """按墙上时间（time.time()）的截止时刻创建，用于把截止时间传给其他进程；timeout只用于错误信息"""
+        deadline = cls(timeout)
+        deadline.expires_at = time.monotonic() + (wall_expires_at - time.time())
+        return deadline
+
+    def wall_expires_at(self):
+        """截止时刻的墙上时间（time.time()），可在进程间传递；不限时返回None"""
+        remaining = self.remaining()
+        return None if remaining is None else time.time() + remaining
+
+    def cancel(self):
+        self.cancelled = True
+
+    def remaining(self):
+        """剩余秒数，不限时返回None"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.cancelled or (self.expires_at is not None and time.monotonic() >= self.expires_at)
+
+    def check(self):
+        if self.cancelled:
+            raise ConversionTimeout('转换已取消')
+        if self.expires_at is not None and time.monotonic() >= self.expires_at:
+            raise ConversionTimeout(f'转换超时（{self.timeout}秒）')
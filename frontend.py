@@ -0,0 +1,74 @@
+"""前端页面资源：启动时构建一次，生成带内容哈希的文件名并预压缩"""
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+
+# 前端源文件目录
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend')
+
+# 需要加内容哈希的资源文件
+ASSET_FILES = ['app.css', 'app.js']
+
+
+def _content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _make_asset(name, data):
+    """生成资源记录：原始内容、gzip压缩内容、ETag和MIME类型"""
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if mimetype.startswith('text/') or mimetype == 'application/javascript':
+        mimetype += '; charset=utf-8'
+    return {
+        'name': name,
+        'body': data,
+        # mtime=0 保证相同内容的压缩结果一致
+        'gzip': gzip.compress(data, compresslevel=9, mtime=0),
+        'etag': _content_hash(data),
+        'mimetype': mimetype
+    }
+
+
+class FrontendAssets:
+    """构建后的前端资源
+
+    - 页面引用的CSS/JS重命名为 <名称>.<内容哈希>.<扩展名>，可以永久缓存
+    - 所有资源在构建时压缩一次，请求时按 Accept-Encoding 直接返回对应版本
+    - 首页地址固定，只能协商缓存：用内容哈希作为ETag，浏览器和健康检查命中304
+    """
+
+    def __init__(self, source_dir=FRONTEND_DIR, asset_prefix='/assets/'):
+        self.source_dir = source_dir
+        self.asset_prefix = asset_prefix
+        self.assets = {}
+        self.index = None
+        self.build()
+
+    def build(self):
+        """读取源文件，生成哈希文件名、改写首页引用并预压缩"""
+        assets = {}
+        renamed = {}
+        for filename in ASSET_FILES:
+            with open(os.path.join(self.source_dir, filename), 'rb') as f:
+                data = f.read()
+            stem, ext = os.path.splitext(filename)
+            hashed_name = f'{stem}.{_content_hash(data)}{ext}'
+            assets[hashed_name] = _make_asset(hashed_name, data)
+            renamed[filename] = self.asset_prefix + hashed_name
+
+        with open(os.path.join(self.source_dir, 'index.html'), 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        # 将 href="app.css" / src="app.js" 改写为带哈希的地址
+        def replace_reference(match):
+            return f'{match.group(1)}="{renamed.get(match.group(2), match.group(2))}"'
+        html = re.sub(r'(href|src)="([^"]+)"', replace_reference, html)
+
+        self.assets = assets
+        self.index = _make_asset('index.html', html.encode('utf-8'))
+
+    def get(self, name):
+        """返回带哈希文件名对应的资源，不存在时返回None"""
+        return self.assets.get(name)
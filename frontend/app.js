@@ -0,0 +1,346 @@
+// 文件上传配置
+const uploadConfig = {
+    apiEndpoint: '/upload'
+};
+
+// API服务地址
+const API_BASE_URL = '';
+
+function showStatus(message, type = 'info') {
+    const statusDiv = document.getElementById('status');
+    statusDiv.textContent = message;
+    statusDiv.className = `status ${type}`;
+    statusDiv.style.display = 'block';
+}
+
+function hideStatus() {
+    const statusDiv = document.getElementById('status');
+    statusDiv.style.display = 'none';
+}
+
+function showLoading(show = true) {
+    const loadingDiv = document.getElementById('loading');
+    const uploadBtn = document.getElementById('uploadBtn');
+
+    if (show) {
+        loadingDiv.style.display = 'block';
+        uploadBtn.disabled = true;
+        uploadBtn.textContent = '处理中...';
+    } else {
+        loadingDiv.style.display = 'none';
+        uploadBtn.disabled = false;
+        uploadBtn.textContent = '上传并分割文档';
+    }
+}
+
+function generateFileName() {
+    const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
+    const random = Math.random().toString(36).substr(2, 9);
+    return `word_${timestamp}_${random}.docx`;
+}
+
+async function uploadFile(file) {
+    try {
+        showStatus('正在上传文件...', 'info');
+
+        // 创建FormData对象
+        const formData = new FormData();
+        formData.append('file', file);
+
+        // 发送上传请求
+        const response = await fetch(uploadConfig.apiEndpoint, {
+            method: 'POST',
+            body: formData
+        });
+
+        if (!response.ok) {
+            throw new Error('上传失败');
+        }
+
+        const result = await response.json();
+
+        if (result.success) {
+            showStatus('文件上传成功', 'success');
+            return result.fileUrl;
+        } else {
+            throw new Error(result.error || '上传失败');
+        }
+    } catch (error) {
+        showStatus('文件上传失败: ' + error.message, 'error');
+        throw error;
+    }
+}
+
+async function convertWordToHtml(fileUrl, maxlength) {
+    try {
+        showStatus('正在转换文档...', 'info');
+
+        const response = await fetch(`${API_BASE_URL}/convert`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                fileurl: fileUrl,
+                maxlength: parseInt(maxlength)
+            })
+        });
+
+        const result = await response.json();
+
+        if (!response.ok) {
+            throw new Error(result.error || '转换失败');
+        }
+
+        showStatus('文档转换成功！', 'success');
+        return result;
+
+    } catch (error) {
+        console.error('转换错误:', error);
+        showStatus(`文档转换失败: ${error.message}`, 'error');
+        throw error;
+    }
+}
+
+function displayResults(result) {
+    const resultDiv = document.getElementById('result');
+
+    if (!result.success || !result.data || result.data.length === 0) {
+        resultDiv.innerHTML = '<p style="color: red;">没有生成有效的分割结果</p>';
+        return;
+    }
+
+    let html = `
+        <h2>分割结果</h2>
+        <p><strong>总片段数:</strong> ${result.total_fragments}</p>
+        <p><strong>片段最大长度:</strong> ${result.maxlength} 字符</p>
+        <hr>
+    `;
+
+    result.data.forEach((fragment, index) => {
+        // 计算片段长度（去除HTML标签后的纯文本长度）
+        const plainTextLength = fragment.replace(/<[^>]*>/g, '').length;
+        const htmlLength = fragment.length;
+
+        html += `
+            <div class="fragment">
+                <h3>片段 ${index + 1}</h3>
+                <div style="margin-bottom: 10px; color: #666; font-size: 14px;">
+                    <strong>纯文本长度:</strong> ${plainTextLength} 字符 | 
+                    <strong>HTML长度:</strong> ${htmlLength} 字符
+                </div>
+                <div class="fragment-content" id="editor-${index}" style="height: 200px; border: 1px solid #dee2e6; border-radius: 4px;"></div>
+            </div>
+        `;
+    });
+
+    resultDiv.innerHTML = html;
+
+    // 使用textarea显示HTML内容，防止浏览器解析HTML标签
+    setTimeout(() => {
+        result.data.forEach((fragment, index) => {
+            const editorElement = document.getElementById(`editor-${index}`);
+            if (!editorElement) {
+                console.error(`找不到编辑器容器: editor-${index}`);
+                return;
+            }
+
+            // 创建textarea元素
+            const textarea = document.createElement('textarea');
+            textarea.value = fragment;
+            textarea.readOnly = true;
+            textarea.style.cssText = 'width: 100%; height: 200px; font-family: monospace; font-size: 12px; background-color: #f8f9fa; border: 1px solid #dee2e6; border-radius: 4px; padding: 10px; resize: vertical; white-space: pre; overflow-wrap: normal; overflow-x: auto;';
+
+            // 清空容器并添加textarea
+            editorElement.innerHTML = '';
+            editorElement.appendChild(textarea);
+
+            console.log(`片段 ${index} 显示成功`);
+        });
+    }, 100);
+}
+
+async function convertWordToPlainText(fileUrl, maxlength) {
+    try {
+        showStatus('正在转换文档为纯文本...', 'info');
+
+        const response = await fetch(`${API_BASE_URL}/convert-plain`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                fileurl: fileUrl,
+                maxlength: parseInt(maxlength)
+            })
+        });
+
+        const result = await response.json();
+
+        if (!response.ok) {
+            throw new Error(result.error || '转换失败');
+        }
+
+        showStatus('文档转换为纯文本成功！', 'success');
+        return result;
+
+    } catch (error) {
+        console.error('转换错误:', error);
+        showStatus(`文档转换失败: ${error.message}`, 'error');
+        throw error;
+    }
+}
+
+function displayPlainResults(result) {
+    const resultDiv = document.getElementById('result');
+
+    if (!result.success || !result.data || result.data.length === 0) {
+        resultDiv.innerHTML = '<p style="color: red;">没有生成有效的分割结果</p>';
+        return;
+    }
+
+    let html = `
+        <h2>分割结果（纯文本）</h2>
+        <p><strong>总片段数:</strong> ${result.total_fragments}</p>
+        <p><strong>片段最大长度:</strong> ${result.maxlength} 字符</p>
+        <hr>
+    `;
+
+    result.data.forEach((fragment, index) => {
+        const textLength = fragment.length;
+
+        html += `
+            <div class="fragment">
+                <h3>片段 ${index + 1}</h3>
+                <div style="margin-bottom: 10px; color: #666; font-size: 14px;">
+                    <strong>纯文本长度:</strong> ${textLength} 字符
+                </div>
+                <div class="fragment-content" id="plain-editor-${index}" style="height: 200px; border: 1px solid #dee2e6; border-radius: 4px;"></div>
+            </div>
+        `;
+    });
+
+    resultDiv.innerHTML = html;
+
+    // 使用textarea显示纯文本内容
+    setTimeout(() => {
+        result.data.forEach((fragment, index) => {
+            const editorElement = document.getElementById(`plain-editor-${index}`);
+            if (!editorElement) {
+                console.error(`找不到编辑器容器: plain-editor-${index}`);
+                return;
+            }
+
+            // 创建textarea元素
+            const textarea = document.createElement('textarea');
+            textarea.value = fragment;
+            textarea.readOnly = true;
+            textarea.style.cssText = 'width: 100%; height: 200px; font-family: monospace; font-size: 12px; background-color: #f8f9fa; border: 1px solid #dee2e6; border-radius: 4px; padding: 10px; resize: vertical; white-space: pre; overflow-wrap: normal; overflow-x: auto;';
+
+            // 清空容器并添加textarea
+            editorElement.innerHTML = '';
+            editorElement.appendChild(textarea);
+
+            console.log(`纯文本片段 ${index} 显示成功`);
+        });
+    }, 100);
+}
+
+async function uploadAndProcessPlain() {
+    const fileInput = document.getElementById('fileInput');
+    const maxlengthInput = document.getElementById('maxlength');
+
+    // 验证输入
+    if (!fileInput.files || fileInput.files.length === 0) {
+        showStatus('请选择一个Word文档', 'error');
+        return;
+    }
+
+    const file = fileInput.files[0];
+    const maxlength = maxlengthInput.value;
+
+    if (!maxlength || maxlength < 1000) {
+        showStatus('片段长度必须大于1000字符', 'error');
+        return;
+    }
+
+    // 重置结果区域
+    document.getElementById('result').innerHTML = '';
+
+    try {
+        showLoading(true);
+        hideStatus();
+
+        // 1. 上传文件
+        const fileUrl = await uploadFile(file);
+
+        // 2. 调用纯文本转换接口
+        const result = await convertWordToPlainText(fileUrl, maxlength);
+
+        // 3. 显示结果
+        displayPlainResults(result);
+
+    } catch (error) {
+        console.error('处理过程出错:', error);
+        // 错误信息已经在各个步骤中显示
+    } finally {
+        showLoading(false);
+    }
+}
+
+async function uploadAndProcess() {
+    const fileInput = document.getElementById('fileInput');
+    const maxlengthInput = document.getElementById('maxlength');
+
+    // 验证输入
+    if (!fileInput.files || fileInput.files.length === 0) {
+        showStatus('请选择一个Word文档', 'error');
+        return;
+    }
+
+    const file = fileInput.files[0];
+    const maxlength = maxlengthInput.value;
+
+    if (!maxlength || maxlength < 1000) {
+        showStatus('片段长度必须大于1000字符', 'error');
+        return;
+    }
+
+    // 重置结果区域
+    document.getElementById('result').innerHTML = '';
+
+    try {
+        showLoading(true);
+        hideStatus();
+
+        // 1. 上传文件
+        const fileUrl = await uploadFile(file);
+
+        // 2. 调用转换接口
+        const result = await convertWordToHtml(fileUrl, maxlength);
+
+        // 3. 显示结果
+        displayResults(result);
+
+    } catch (error) {
+        console.error('处理过程出错:', error);
+        // 错误信息已经在各个步骤中显示
+    } finally {
+        showLoading(false);
+    }
+}
+
+// 页面加载完成后检查API服务状态
+document.addEventListener('DOMContentLoaded', async function() {
+    try {
+        const response = await fetch(API_BASE_URL + '/health');
+        if (response.ok) {
+            showStatus('API服务连接正常', 'success');
+            setTimeout(hideStatus, 3000);
+        } else {
+            showStatus('API服务连接异常', 'error');
+        }
+    } catch (error) {
+        showStatus('无法连接到API服务，请确保服务正在运行', 'error');
+    }
+});
@@ -0,0 +1,140 @@
+"""文档图片存储：从 word/media 中提取图片，按内容哈希去重保存，HTML中以URL引用"""
+import io
+import hashlib
+import threading
+
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+
+from upload_store import UploadStore
+
+# Pillow为可选依赖，导入较慢，首次生成缩略图时才导入（见 load_pil）
+_pil_image = None
+
+# 可以生成缩略图的格式（EMF/WMF等矢量格式原样提供）
+THUMBNAIL_FORMATS = {
+    '.png': 'PNG',
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.gif': 'GIF',
+    '.bmp': 'PNG',
+    '.tif': 'PNG',
+    '.tiff': 'PNG'
+}
+
+
+def load_pil():
+    """返回PIL.Image模块，未安装Pillow时返回None"""
+    global _pil_image
+    if _pil_image is None:
+        try:
+            from PIL import Image
+        except ImportError:  # 可选依赖，未安装时不生成缩略图
+            Image = False
+        _pil_image = Image
+    return _pil_image or None
+
+
+class ImageStore(UploadStore):
+    """内容寻址的图片存储
+
+    - 图片键为 <SHA-256><扩展名>，同一张图片（如出现在大量文档中的公司logo）只保存一份；
+      已存在时不重新写盘，只刷新过期时间
+    - 同一文档中的图片部件只读取和哈希一次，多个关系ID指向同一部件时共用结果
+    - 缩略图在首次请求时生成，以 <原图键>.w<宽度><扩展名> 保存，之后直接读取；
+      宽度只允许配置中的几档，避免任意尺寸撑满存储
+    """
+
+    def __init__(self, root, base_url='/images', thumbnail_widths=(), **kwargs):
+        super().__init__(root, **kwargs)
+        self.base_url = base_url.rstrip('/')
+        self.thumbnail_widths = tuple(sorted(thumbnail_widths))
+        self._thumbnail_lock = threading.Lock()
+
+    def url_for(self, key):
+        return f'{self.base_url}/{key}'
+
+    def add(self, blob, ext):
+        """保存图片内容，返回图片键"""
+        key = f'{hashlib.sha256(blob).hexdigest()}{ext.lower()}'
+        # 已保存过的图片不再写临时文件，只刷新过期时间
+        if self.refresh(key) is not None:
+            return key
+        meta, _ = self.put_content(io.BytesIO(blob), ext)
+        return meta['key']
+
+    def extract(self, doc, rel_ids=None):
+        """提取文档正文引用的图片，返回 关系ID -> 图片URL 的映射
+
+        rel_ids为需要的关系ID集合（如部分转换时选中元素引用的图片），默认提取全部。
+        """
+        images = {}
+        keys_by_part = {}
+        for rel_id, rel in doc.part.rels.items():
+            if rel.reltype != RT.IMAGE or rel.is_external:
+                continue
+            if rel_ids is not None and rel_id not in rel_ids:
+                continue
+            part = rel.target_part
+            key = keys_by_part.get(part.partname)
+            if key is None:
+                key = self.add(part.blob, part.partname.ext and f'.{part.partname.ext}')
+                keys_by_part[part.partname] = key
+            images[rel_id] = self.url_for(key)
+        return images
+
+    def thumbnail_width(self, requested):
+        """返回不小于请求宽度的最小可用档位，超出所有档位时返回None（使用原图）"""
+        for width in self.thumbnail_widths:
+            if width >= requested:
+                return width
+        return None
+
+    def thumbnail(self, key, width):
+        """返回原图按宽度缩小后的图片元数据，不能生成时返回None
+
+        原图不大于目标宽度、格式不支持或未安装Pillow时返回None，调用方应提供原图。
+        """
+        stem, dot, ext = key.rpartition('.')
+        ext = f'.{ext}' if dot else ''
+        image_format = THUMBNAIL_FORMATS.get(ext.lower())
+        Image = load_pil()
+        if Image is None or image_format is None:
+            return None
+
+        thumb_ext = ext if image_format != 'PNG' or ext.lower() == '.png' else '.png'
+        thumb_key = f'{stem}.w{width}{thumb_ext}'
+        meta = self.get(thumb_key)
+        if meta is not None:
+            return meta
+
+        # 同一缩略图只生成一次
+        with self._thumbnail_lock:
+            meta = self.get(thumb_key)
+            if meta is not None:
+                return meta
+            original = self.get(key)
+            if original is None:
+                return None
+            with Image.open(original['path']) as image:
+                if image.width <= width:
+                    return None
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+                if image_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+                    resized = resized.convert('RGB')
+                buffer = io.BytesIO()
+                resized.save(buffer, image_format)
+            buffer.seek(0)
+            return self.put(thumb_key, buffer)
+
+
+def image_store_from_config(image_config, retention_seconds=None, shard_depth=2):
+    """按 IMAGE_CONFIG 创建图片存储"""
+    return ImageStore(
+        image_config['image_dir'],
+        base_url=image_config['base_url'],
+        thumbnail_widths=image_config['thumbnail_widths'],
+        max_total_size=image_config['max_total_size'],
+        retention_seconds=retention_seconds,
+        shard_depth=shard_depth
+    )
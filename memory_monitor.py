@@ -0,0 +1,287 @@
+"""转换内存统计：每次转换的峰值RSS（可抽样用tracemalloc统计Python分配峰值），最近转换的汇总与异常文档日志"""
+import os
+import time
+import random
+import logging
+import itertools
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# cgroup v2 / v1 的内存上限文件
+_CGROUP_LIMIT_FILES = ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes')
+
+
+def current_rss():
+    """当前进程的常驻内存（字节），不支持时返回None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def peak_rss():
+    """进程启动以来的常驻内存峰值（字节），不支持时返回None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        import resource
+        # Linux以KB为单位，macOS以字节为单位
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def memory_limit():
+    """容器（cgroup）的内存上限（字节），没有限制或不支持时返回None"""
+    for path in _CGROUP_LIMIT_FILES:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # 未限制时v2为 "max"，v1为接近2^63的数
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+        return None
+    return None
+
+
+def document_counts(doc):
+    """文档中的段落数和表格数（包括表格内的段落和嵌套表格）"""
+    from docx.oxml.ns import qn
+    body = doc.element.body
+    return {
+        'paragraphs': sum(1 for _ in body.iter(qn('w:p'))),
+        'tables': sum(1 for _ in body.iter(qn('w:tbl')))
+    }
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class ConversionRecord:
+    """一次转换的内存记录"""
+
+    __slots__ = ('id', 'label', 'compressed_size', 'document_xml_size', 'paragraphs', 'tables',
+                 'started', 'duration', 'sample_rss', 'rss_start', 'peak_rss', 'traced_peak', 'error')
+
+    def __init__(self, record_id, label=None, compressed_size=None, document_xml_size=None, sample_rss=True):
+        self.id = record_id
+        self.label = label
+        self.compressed_size = compressed_size
+        self.document_xml_size = document_xml_size
+        self.paragraphs = None
+        self.tables = None
+        self.started = time.time()
+        self.duration = None
+        # 转换不在本进程中进行时（转换进程池），本进程的RSS与这次转换无关，不记录
+        self.sample_rss = sample_rss
+        self.rss_start = current_rss() if sample_rss else None
+        self.peak_rss = self.rss_start
+        self.traced_peak = None
+        self.error = None
+
+    @property
+    def peak_rss_delta(self):
+        """转换期间进程RSS峰值相对开始时的增长（并发转换时包含其他转换的增长）"""
+        if self.rss_start is None or self.peak_rss is None:
+            return None
+        return max(0, self.peak_rss - self.rss_start)
+
+    def to_dict(self):
+        record = {
+            'id': self.id,
+            'label': self.label,
+            'compressed_size': self.compressed_size,
+            'document_xml_size': self.document_xml_size,
+            'paragraphs': self.paragraphs,
+            'tables': self.tables,
+            'elapsed': round((self.duration if self.duration is not None else time.time() - self.started), 3),
+            'traced_peak': self.traced_peak,
+            'error': self.error
+        }
+        if self.sample_rss:
+            record['peak_rss'] = self.peak_rss
+            record['peak_rss_delta'] = self.peak_rss_delta
+        return record
+
+
+class MemoryMonitor:
+    """记录每次转换的内存占用
+
+    - 转换进行期间后台线程每隔 sample_interval 秒读取一次进程RSS，记录每个进行中转换的峰值；
+      同一进程中同时进行的转换共用RSS，单个转换的增长是近似值
+    - 按 tracemalloc_rate 的比例抽样，用tracemalloc统计转换期间的Python分配峰值（同一时间只跟踪一个转换，
+      跟踪期间转换明显变慢，且包含其他线程的分配）
+    - 保留最近 window 次转换的记录用于汇总；RSS增长超过 outlier_rss，或超过最近转换中位数的
+      outlier_factor 倍时记录警告日志
+    - 不在本进程中进行的转换（track 的 sample_rss 为False）只记录文档信息和耗时，
+      不采样RSS、不抽样tracemalloc，也不计入RSS增长的分位数、异常检测和 rss_per_xml_byte_p50
+    """
+
+    def __init__(self, window=200, sample_interval=0.05, tracemalloc_rate=0.0,
+                 outlier_rss=256 * 1024 * 1024, outlier_factor=4.0, min_outlier_samples=20):
+        self.sample_interval = sample_interval
+        self.tracemalloc_rate = tracemalloc_rate
+        self.outlier_rss = outlier_rss
+        self.outlier_factor = outlier_factor
+        self.min_outlier_samples = min_outlier_samples
+        self._recent = deque(maxlen=window)
+        self._in_flight = {}
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self._trace_lock = threading.Lock()
+        self._sampler = None
+        self.completed = 0
+        self.outliers = 0
+
+    @contextmanager
+    def track(self, label=None, compressed_size=None, document_xml_size=None, sample_rss=True):
+        """记录with块中的一次转换，返回 ConversionRecord；块内可用tag/tag_document补充文档信息
+
+        转换在其他进程中进行时（with块只等待结果）传入 sample_rss=False。
+        """
+        record = ConversionRecord(next(self._ids), label, compressed_size, document_xml_size, sample_rss)
+        traced = (sample_rss and self.tracemalloc_rate > 0 and random.random() < self.tracemalloc_rate and
+                  not tracemalloc.is_tracing() and self._trace_lock.acquire(blocking=False))
+        with self._condition:
+            self._in_flight[record.id] = record
+            self._ensure_sampler()
+            self._condition.notify()
+        previous = getattr(self._local, 'record', None)
+        self._local.record = record
+        if traced:
+            tracemalloc.start()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = type(e).__name__
+            raise
+        finally:
+            if traced:
+                record.traced_peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self._trace_lock.release()
+            self._local.record = previous
+            record.duration = time.time() - record.started
+            self._observe(record, current_rss())
+            with self._condition:
+                del self._in_flight[record.id]
+            self._finish(record)
+
+    def tag(self, **fields):
+        """为当前线程进行中的转换补充字段（paragraphs、tables等），不在track块内时忽略"""
+        record = getattr(self._local, 'record', None)
+        if record is not None:
+            for name, value in fields.items():
+                setattr(record, name, value)
+
+    def tag_document(self, doc):
+        """记录已解析文档的段落数和表格数"""
+        if getattr(self._local, 'record', None) is not None:
+            self.tag(**document_counts(doc))
+
+    # ---- RSS采样 ----
+
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample_loop, name='memory-sampler', daemon=True)
+            self._sampler.start()
+
+    def _sample_loop(self):
+        while True:
+            with self._condition:
+                while not self._in_flight:
+                    self._condition.wait()
+                records = list(self._in_flight.values())
+            rss = current_rss()
+            for record in records:
+                self._observe(record, rss)
+            time.sleep(self.sample_interval)
+
+    @staticmethod
+    def _observe(record, rss):
+        if record.sample_rss and rss is not None and (record.peak_rss is None or rss > record.peak_rss):
+            record.peak_rss = rss
+
+    # ---- 汇总 ----
+
+    def _finish(self, record):
+        with self._condition:
+            deltas = sorted(r.peak_rss_delta for r in self._recent if r.peak_rss_delta is not None)
+            self._recent.append(record)
+            self.completed += 1
+        delta = record.peak_rss_delta
+        if delta is None:
+            return
+        median = _percentile(deltas, 0.5) if len(deltas) >= self.min_outlier_samples else None
+        if delta > self.outlier_rss or (median and delta > median * self.outlier_factor):
+            self.outliers += 1
+            logging.warning(
+                f"转换内存异常: 文档 {record.label or '-'}，RSS增长 {delta / 1024 / 1024:.1f} MB"
+                f"（最近中位数 {(median or 0) / 1024 / 1024:.1f} MB），压缩大小 {record.compressed_size} 字节，"
+                f"document.xml {record.document_xml_size} 字节，段落 {record.paragraphs}，表格 {record.tables}，"
+                f"耗时 {record.duration:.2f} 秒" +
+                (f"，Python分配峰值 {record.traced_peak / 1024 / 1024:.1f} MB" if record.traced_peak else '')
+            )
+
+    def stats(self):
+        """当前进程内存、进行中的转换和最近转换的汇总"""
+        with self._condition:
+            in_flight = [record.to_dict() for record in self._in_flight.values()]
+            recent = list(self._recent)
+
+        deltas = sorted(r.peak_rss_delta for r in recent if r.peak_rss_delta is not None)
+        traced = sorted(r.traced_peak for r in recent if r.traced_peak is not None)
+        durations = sorted(r.duration for r in recent)
+        # 每字节 document.xml 对应的RSS增长，可据此设置 ADMISSION_CONFIG['xml_factor']
+        ratios = sorted(r.peak_rss_delta / r.document_xml_size for r in recent
+                        if r.peak_rss_delta and r.document_xml_size)
+        largest = max(recent, key=lambda r: r.peak_rss_delta or 0, default=None)
+
+        rss = current_rss()
+        limit = memory_limit()
+        return {
+            'rss': rss,
+            'peak_rss': peak_rss(),
+            'memory_limit': limit,
+            'memory_usage_ratio': round(rss / limit, 4) if rss is not None and limit else None,
+            'in_flight': in_flight,
+            'completed': self.completed,
+            'outliers': self.outliers,
+            'recent': {
+                'count': len(recent),
+                'errors': sum(1 for r in recent if r.error),
+                'duration_p50': round(_percentile(durations, 0.5), 3) if durations else None,
+                'duration_p95': round(_percentile(durations, 0.95), 3) if durations else None,
+                'peak_rss_delta_p50': _percentile(deltas, 0.5),
+                'peak_rss_delta_p95': _percentile(deltas, 0.95),
+                'peak_rss_delta_max': deltas[-1] if deltas else None,
+                'rss_samples': len(deltas),
+                'traced_samples': len(traced),
+                'traced_peak_p50': _percentile(traced, 0.5),
+                'traced_peak_max': traced[-1] if traced else None,
+                'rss_per_xml_byte_p50': round(_percentile(ratios, 0.5), 2) if ratios else None,
+                'largest': largest.to_dict() if largest is not None else None
+            }
+        }
+
+    def usage_ratio(self):
+        """当前RSS占容器内存上限的比例，没有上限时返回None"""
+        rss = current_rss()
+        limit = memory_limit()
+        return rss / limit if rss is not None and limit else None
@@ -0,0 +1,86 @@
+"""解析前的文档包检查：只读取zip中央目录，在解析任何XML之前拒绝无效、过大或疑似zip炸弹的文档"""
+import io
+import os
+import zipfile
+from urllib.parse import urlsplit
+
+# 旧版Word（.doc）使用的OLE复合文档文件头
+OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+ZIP_MAGIC = b'PK\x03\x04'
+
+# docx必需的部件
+REQUIRED_PARTS = ('[Content_Types].xml', 'word/document.xml')
+
+LEGACY_DOC_MESSAGE = '不支持旧版Word格式（.doc），请另存为.docx后重试'
+
+
+class DocumentRejected(ValueError):
+    """文档未通过解析前检查（格式不支持、结构无效或超出大小限制）"""
+
+
+def check_url_extension(url):
+    """URL路径以 .doc 结尾时在下载前拒绝"""
+    if os.path.splitext(urlsplit(url).path)[1].lower() == '.doc':
+        raise DocumentRejected(LEGACY_DOC_MESSAGE)
+
+
+def _read_header(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:8])
+    with open(source, 'rb') as f:
+        return f.read(8)
+
+
+def inspect_package(source, limits):
+    """检查docx文档包，source为本地文件路径或字节数据，通过时返回包信息，否则抛出DocumentRejected
+
+    只读取文件头和zip中央目录，不解压任何部件。zipfile读取部件时解压结果不会超过中央目录中
+    记录的大小（超出即校验失败），因此按记录的大小检查即可限制解析时的内存。
+
+    返回: {'compressed_size', 'uncompressed_size', 'document_xml_size', 'entries'}
+    """
+    header = _read_header(source)
+    if header.startswith(OLE_MAGIC):
+        raise DocumentRejected(LEGACY_DOC_MESSAGE)
+    if not header.startswith(ZIP_MAGIC):
+        raise DocumentRejected('不是有效的Word文档（.docx）')
+
+    try:
+        with zipfile.ZipFile(io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source) as archive:
+            infos = archive.infolist()
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, OSError) as e:
+        raise DocumentRejected(f'Word文档已损坏: {e}')
+
+    if len(infos) > limits['max_entries']:
+        raise DocumentRejected(f'文档包含的部件过多（{len(infos)}个，上限{limits["max_entries"]}）')
+
+    parts = {info.filename: info for info in infos}
+    missing = [name for name in REQUIRED_PARTS if name not in parts]
+    if missing:
+        raise DocumentRejected(f'不是有效的Word文档，缺少部件: {", ".join(missing)}')
+
+    total = 0
+    for info in infos:
+        total += info.file_size
+        if info.file_size > limits['max_part_size']:
+            raise DocumentRejected(
+                f'文档部件 {info.filename} 解压后过大（{info.file_size}字节，上限{limits["max_part_size"]}）')
+        # 很小的部件压缩比高也正常，只检查超过一定大小的部件
+        if (info.file_size > limits['ratio_min_size'] and
+                info.file_size > info.compress_size * limits['max_compression_ratio']):
+            raise DocumentRejected(f'文档部件 {info.filename} 的压缩比异常，疑似zip炸弹')
+    if total > limits['max_uncompressed_size']:
+        raise DocumentRejected(
+            f'文档解压后总大小过大（{total}字节，上限{limits["max_uncompressed_size"]}）')
+
+    document_xml = parts['word/document.xml']
+    if document_xml.file_size > limits['max_document_xml_size']:
+        raise DocumentRejected(
+            f'文档正文过大（document.xml {document_xml.file_size}字节，上限{limits["max_document_xml_size"]}）')
+
+    return {
+        'compressed_size': len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source),
+        'uncompressed_size': total,
+        'document_xml_size': document_xml.file_size,
+        'entries': len(infos)
+    }
@@ -0,0 +1,134 @@
+"""单个大文档的并行渲染：将顶层元素按顺序分块，在进程池中渲染后按原顺序拼接"""
+import os
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from lxml import etree
+
+from config import PARALLEL_CONFIG
+from deadline import ConversionTimeout
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# 工作进程内缓存的渲染用文档（按样式表内容复用）
+_worker_doc = None
+_worker_styles_xml = None
+_worker_resolver = None
+
+
+def get_executor():
+    """返回共享的进程池（首次使用时创建）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = PARALLEL_CONFIG['workers'] or os.cpu_count() or 1
+            # 使用spawn启动工作进程，避免在多线程的Web进程中fork
+            _executor = ProcessPoolExecutor(max_workers=workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(shutdown_executor)
+        return _executor
+
+
+def shutdown_executor():
+    """关闭进程池"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _worker_document(styles_xml):
+    """工作进程中用于渲染的文档（默认模板 + 原文档的样式表）及其样式解析器"""
+    global _worker_doc, _worker_styles_xml, _worker_resolver
+    from docx import Document
+    from docx.oxml import parse_xml
+    from style_resolver import StyleResolver
+
+    if _worker_doc is None:
+        _worker_doc = Document()
+    if styles_xml != _worker_styles_xml:
+        _worker_doc.part._styles_part._element = parse_xml(styles_xml)
+        _worker_styles_xml = styles_xml
+        _worker_resolver = StyleResolver.for_document(_worker_doc)
+    return _worker_doc, _worker_resolver
+
+
+def _render_chunk(styles_xml, chunk, output_format='html', images=None):
+    """在工作进程中渲染一组元素，chunk为 [(类型, XML字节), ...]，返回输出块列表（空段落为None）"""
+    from docx.oxml import parse_xml
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+    from word_to_html_converter import render_element
+
+    doc, resolver = _worker_document(styles_xml)
+    parent = doc._body
+    results = []
+    for element_type, xml in chunk:
+        element = parse_xml(xml)
+        content = Paragraph(element, parent) if element_type == 'paragraph' else Table(element, parent)
+        results.append(render_element({'type': element_type, 'content': content}, output_format, resolver,
+                                      images))
+    return results
+
+
+def partition(items, chunk_count):
+    """按XML字节数将元素列表划分为不超过chunk_count个连续分块"""
+    total = sum(len(xml) for _, xml in items)
+    target = max(1, total // chunk_count)
+    chunks = []
+    current = []
+    current_size = 0
+    for item in items:
+        current.append(item)
+        current_size += len(item[1])
+        if current_size >= target and len(chunks) < chunk_count - 1:
+            chunks.append(current)
+            current = []
+            current_size = 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def should_render_parallel(elements):
+    """元素数量达到阈值时才使用并行渲染，小文档串行渲染以避免进程间传输开销"""
+    return PARALLEL_CONFIG['enabled'] and len(elements) >= PARALLEL_CONFIG['min_blocks']
+
+
+def render_blocks_parallel(doc, elements=None, output_format='html', images=None, deadline=None):
+    """并行渲染文档的顶层元素，返回与 render_blocks 相同顺序的非空输出块列表
+
+    传给工作进程的是各元素的XML、样式表XML和图片映射，而不是python-docx对象。
+    超过deadline时取消未开始的分块并抛出 ConversionTimeout（已在运行的分块在工作进程中完成后丢弃）。
+    """
+    from word_to_html_converter import get_document_elements_in_order, render_blocks
+
+    if elements is None:
+        elements = get_document_elements_in_order(doc)
+
+    if not should_render_parallel(elements):
+        return list(render_blocks(doc, output_format, images, elements, deadline))
+
+    styles_xml = etree.tostring(doc.styles.element)
+    items = [(element['type'], etree.tostring(element['content']._element)) for element in elements]
+
+    executor = get_executor()
+    chunk_count = executor._max_workers * PARALLEL_CONFIG['chunks_per_worker']
+    chunks = partition(items, chunk_count)
+    print(f"并行渲染: {len(items)} 个元素，分为 {len(chunks)} 块")
+
+    futures = [executor.submit(_render_chunk, styles_xml, chunk, output_format, images) for chunk in chunks]
+    blocks = []
+    try:
+        for future in futures:
+            result = future.result(timeout=deadline.remaining() if deadline is not None else None)
+            blocks.extend(block for block in result if block is not None)
+    except FutureTimeout:
+        for future in futures:
+            future.cancel()
+        raise ConversionTimeout(f'转换超时（{deadline.timeout}秒）')
+    return blocks
@@ -0,0 +1,269 @@
+"""预先转换：在后台以低优先级转换已知的一批文档并写入结果缓存，之后的请求直接命中缓存
+
+服务端见 app.py 的 /prefetch 接口；本文件也可作为命令行工具，向运行中的服务提交预先转换任务:
+    python prefetch.py urls.txt [--server http://localhost:5000] [--maxlength 5000] [--format html] [--outline] [--wait]
+
+urls.txt 每行一个URL（空行和#开头的行忽略）。
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+
+
+class PrefetchQueueFull(Exception):
+    """待转换的文档数达到上限"""
+
+
+class PrefetchJob:
+    """一次提交的预先转换任务"""
+
+    __slots__ = ('id', 'variants', 'total', 'completed', 'failed', 'cancelled',
+                 'created', 'started', 'finished', 'errors')
+
+    def __init__(self, urls, variants, max_errors=20):
+        self.id = uuid.uuid4().hex[:16]
+        self.variants = variants
+        self.total = len(urls)
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # 只保留最近的错误
+        self.errors = deque(maxlen=max_errors)
+
+    @property
+    def done(self):
+        return self.completed + self.failed
+
+    def status(self):
+        if self.cancelled:
+            state = 'cancelled'
+        elif self.finished is not None:
+            state = 'finished'
+        elif self.started is not None:
+            state = 'running'
+        else:
+            state = 'queued'
+        elapsed = (self.finished or time.time()) - self.started if self.started else 0
+        return {
+            'job_id': self.id,
+            'status': state,
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'pending': self.total - self.done,
+            'progress': round(self.done / self.total, 4) if self.total else 1.0,
+            'variants': self.variants,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'elapsed': round(elapsed, 2),
+            'errors': [{'url': url, 'error': error} for url, error in self.errors]
+        }
+
+
+class Prefetcher:
+    """后台预先转换队列
+
+    - 单个后台线程按提交顺序逐个处理文档，每个文档依次转换所有变体（convert(url, variant)）
+    - 开始处理文档的速率不超过每秒 rate 个
+    - is_busy() 为True时（交互请求在排队或占用了大部分转换名额）暂停，每隔 busy_wait 秒重新检查；
+      转换时遇到 retry_exceptions（如准入控制拒绝）时把文档放回队尾，稍后重试；同一文档尝试 max_attempts 次
+      仍未成功时记为失败
+    - 后台线程的nice值调高 nice（只在Linux上有效），CPU繁忙时优先调度处理请求的线程
+    """
+
+    def __init__(self, convert, rate=2.0, is_busy=None, busy_wait=0.5, retry_exceptions=(),
+                 max_attempts=5, max_pending=100000, max_jobs=50, nice=10):
+        self.convert = convert
+        self.rate = rate
+        self.is_busy = is_busy or (lambda: False)
+        self.busy_wait = busy_wait
+        self.retry_exceptions = retry_exceptions
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self.nice = nice
+        self._condition = threading.Condition()
+        self._pending = deque()
+        self._jobs = {}
+        self._thread = None
+        self._next_start = 0.0
+        self.paused = 0
+        self.retried = 0
+
+    def submit(self, urls, variants):
+        """提交一批URL，返回 PrefetchJob；待转换的文档数超过 max_pending 时抛出 PrefetchQueueFull"""
+        with self._condition:
+            if len(self._pending) + len(urls) > self.max_pending:
+                raise PrefetchQueueFull(f'预先转换队列已满（最多 {self.max_pending} 个待转换文档）')
+            job = PrefetchJob(urls, variants)
+            self._jobs[job.id] = job
+            self._evict_jobs()
+            # 待转换的文档: (任务, URL, 已尝试次数)
+            self._pending.extend((job, url, 0) for url in urls)
+            if job.total == 0:
+                job.started = job.finished = time.time()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return job
+
+    def get(self, job_id):
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """取消任务中尚未开始的文档，返回任务，不存在时返回None"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished is None:
+                job.cancelled = True
+                job.finished = time.time()
+                self._pending = deque(item for item in self._pending if item[0] is not job)
+            return job
+
+    def jobs(self):
+        with self._condition:
+            return [job.status() for job in self._jobs.values()]
+
+    def stats(self):
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'jobs': len(self._jobs),
+                'rate': self.rate,
+                'paused': self.paused,
+                'retried': self.retried
+            }
+
+    def _evict_jobs(self):
+        """只保留最近的 max_jobs 个任务，优先淘汰已结束的"""
+        while len(self._jobs) > self.max_jobs:
+            finished = [job for job in self._jobs.values() if job.finished is not None]
+            if not finished:
+                break
+            del self._jobs[min(finished, key=lambda job: job.created).id]
+
+    # ---- 后台线程 ----
+
+    def _run(self):
+        if self.nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.nice)
+            except (AttributeError, OSError):
+                pass
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                job, url, attempts = self._pending.popleft()
+                if job.started is None:
+                    job.started = time.time()
+
+            self._wait_turn()
+            if job.cancelled:
+                continue
+            try:
+                for variant in job.variants:
+                    self.convert(url, variant)
+            except self.retry_exceptions as e:
+                attempts += 1
+                if attempts < self.max_attempts:
+                    with self._condition:
+                        self.retried += 1
+                        if not job.cancelled:
+                            self._pending.append((job, url, attempts))
+                    time.sleep(self.busy_wait)
+                    continue
+                logging.warning(f"预先转换失败（已尝试 {attempts} 次）: {url}: {str(e)}")
+                with self._condition:
+                    job.failed += 1
+                    job.errors.append((url, f'已尝试 {attempts} 次: {str(e)}'))
+            except Exception as e:
+                logging.warning(f"预先转换失败: {url}: {str(e)}")
+                with self._condition:
+                    job.failed += 1
+                    job.errors.append((url, str(e)))
+            else:
+                with self._condition:
+                    job.completed += 1
+
+            with self._condition:
+                if job.done >= job.total and job.finished is None:
+                    job.finished = time.time()
+
+    def _wait_turn(self):
+        """等待速率限制和交互请求让出转换名额"""
+        delay = self._next_start - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        while self.is_busy():
+            self.paused += 1
+            time.sleep(self.busy_wait)
+        self._next_start = time.monotonic() + (1.0 / self.rate if self.rate else 0)
+
+
+def read_url_list(path):
+    """读取URL列表文件（每行一个URL，忽略空行和#开头的行）"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def main():
+    import argparse
+    import requests
+
+    parser = argparse.ArgumentParser(description='向运行中的服务提交预先转换任务')
+    parser.add_argument('url_file', help='URL列表文件，每行一个URL')
+    parser.add_argument('--server', default='http://localhost:5000', help='服务地址')
+    parser.add_argument('--maxlength', type=int, action='append',
+                        help='片段最大长度，可重复指定以预先转换多个变体（默认使用服务的默认值）')
+    parser.add_argument('--format', action='append', choices=('html', 'markdown', 'json'),
+                        help='输出格式，可重复指定（默认html）')
+    parser.add_argument('--plain', action='store_true', help='同时预先转换 /convert-plain 的结果')
+    parser.add_argument('--outline', action='store_true', help='同时预先生成 /outline 的结果')
+    parser.add_argument('--wait', action='store_true', help='等待任务完成并显示进度')
+    args = parser.parse_args()
+
+    urls = read_url_list(args.url_file)
+    variants = []
+    for maxlength in args.maxlength or [None]:
+        for output_format in args.format or ['html']:
+            variant = {'format': output_format}
+            if maxlength:
+                variant['maxlength'] = maxlength
+            variants.append(variant)
+        if args.plain:
+            variants.append({'endpoint': 'convert-plain', **({'maxlength': maxlength} if maxlength else {})})
+    if args.outline:
+        variants.append({'endpoint': 'outline'})
+
+    server = args.server.rstrip('/')
+    response = requests.post(f'{server}/prefetch', json={'urls': urls, 'variants': variants}, timeout=30)
+    result = response.json()
+    if not result.get('success'):
+        raise SystemExit(f"提交失败: {result.get('error')}")
+    job_id = result['job_id']
+    print(f"已提交任务 {job_id}：{result['total']} 个文档，{len(variants)} 个变体")
+
+    while args.wait:
+        status = requests.get(f'{server}/prefetch/{job_id}', timeout=30).json()
+        print(f"\r进度 {status['completed'] + status['failed']}/{status['total']}，"
+              f"失败 {status['failed']}，已用 {status['elapsed']} 秒", end='', flush=True)
+        if status['status'] in ('finished', 'cancelled'):
+            print()
+            for error in status['errors']:
+                print(f"  失败: {error['url']}: {error['error']}")
+            break
+        time.sleep(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""转换结果的响应编码：内容格式协商（JSON / MessagePack / 长度前缀二进制）与压缩协商"""
+import json
+import zlib
+import gzip
+import struct
+
+try:
+    import msgpack
+except ImportError:  # 可选依赖
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+FRAMES_MIMETYPE = 'application/vnd.word2html.frames'
+
+# 长度前缀二进制格式的魔数和版本
+FRAMES_MAGIC = b'W2HF'
+FRAMES_VERSION = 1
+
+
+def available_formats():
+    """返回服务端支持的响应格式（按优先级排列）"""
+    formats = [JSON_MIMETYPE, FRAMES_MIMETYPE]
+    if msgpack is not None:
+        formats.append(MSGPACK_MIMETYPE)
+    return formats
+
+
+def available_encodings():
+    """返回服务端支持的压缩编码（按优先级排列）"""
+    encodings = ['gzip', 'deflate']
+    if zstandard is not None:
+        encodings.insert(0, 'zstd')
+    return encodings
+
+
+def negotiate_format(accept_mimetypes):
+    """根据 Accept 请求头选择响应格式，未明确要求时使用JSON"""
+    best = accept_mimetypes.best_match(available_formats(), default=JSON_MIMETYPE)
+    # 客户端只写了 */* 时 best_match 返回第一个候选，即JSON
+    return best or JSON_MIMETYPE
+
+
+def negotiate_encoding(accept_encodings):
+    """根据 Accept-Encoding 请求头选择压缩编码，不压缩时返回None"""
+    best = None
+    best_quality = 0
+    for encoding in available_encodings():
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encode_json(payload):
+    """UTF-8 JSON，不转义非ASCII字符，不带多余空白"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode_frames(payload, data_key='data'):
+    """长度前缀二进制格式
+
+    布局（整数均为大端无符号32位）：
+        魔数 b'W2HF' | 版本(1字节) | 头部长度 | 头部JSON(UTF-8，不含data) |
+        片段数量 | (片段长度 | 片段UTF-8字节) * 片段数量
+    客户端按长度直接切分字节，无需解析或反转义大段字符串。
+    """
+    header = dict(payload)
+    items = header.pop(data_key, None) or []
+    header_bytes = encode_json(header)
+
+    parts = [FRAMES_MAGIC, bytes([FRAMES_VERSION]),
+             struct.pack('>I', len(header_bytes)), header_bytes,
+             struct.pack('>I', len(items))]
+    for item in items:
+        if not isinstance(item, (bytes, str)):
+            item = json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+        data = item.encode('utf-8') if isinstance(item, str) else item
+        parts.append(struct.pack('>I', len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def decode_frames(body):
+    """解析长度前缀二进制格式，返回 (头部字典, 片段字符串列表)"""
+    if body[:4] != FRAMES_MAGIC:
+        raise ValueError('不是有效的片段二进制数据')
+    offset = 5
+    (header_length,) = struct.unpack_from('>I', body, offset)
+    offset += 4
+    header = json.loads(body[offset:offset + header_length].decode('utf-8'))
+    offset += header_length
+    (count,) = struct.unpack_from('>I', body, offset)
+    offset += 4
+    items = []
+    for _ in range(count):
+        (length,) = struct.unpack_from('>I', body, offset)
+        offset += 4
+        items.append(body[offset:offset + length].decode('utf-8'))
+        offset += length
+    return header, items
+
+
+def encode_payload(payload, mimetype):
+    """按指定格式编码响应数据"""
+    if mimetype == MSGPACK_MIMETYPE:
+        return msgpack.packb(payload, use_bin_type=True)
+    if mimetype == FRAMES_MIMETYPE:
+        return encode_frames(payload)
+    return encode_json(payload)
+
+
+def compress(body, encoding, level=None):
+    """按指定编码压缩响应体"""
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level or 3).compress(body)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=level or 6, mtime=0)
+    if encoding == 'deflate':
+        # HTTP 的 deflate 指 zlib 格式
+        return zlib.compress(body, level or 6)
+    return body
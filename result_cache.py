@@ -0,0 +1,257 @@
+"""转换结果缓存：多进程共享的SQLite（WAL模式）存储 + 进程内LRU前置缓存"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+from version_store import LRUCache
+
+# 访问时间的最小更新间隔（秒）：命中时不必每次都写数据库
+TOUCH_INTERVAL = 60
+
+
+def encode_value(value):
+    """结果字典 -> 压缩的JSON字节（元组会变为列表）"""
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 1)
+
+
+def decode_value(data):
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+class SQLiteCache:
+    """嵌入式的多进程共享缓存
+
+    - 单个SQLite数据库文件，WAL模式下多个工作进程可以同时读、串行写
+    - 每个条目有过期时间（TTL），过期条目读取时视为不存在，expire() 时删除
+    - 总大小超过 max_size 时按最后访问时间淘汰（LRU）；总大小由触发器在同一事务中增量维护在
+      单行的 totals 表中，写入时不需要扫描整个表求和
+    - 每个线程使用独立的连接
+    """
+
+    def __init__(self, path, max_size, ttl=None, max_entry_size=None):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_entry_size = max_entry_size or max_size // 8
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at)')
+            # 多个进程可能同时初始化，建表和计算已有条目的总大小在同一个写事务中完成
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), '
+                             'size INTEGER NOT NULL)')
+                conn.execute('INSERT OR IGNORE INTO totals (id, size) '
+                             'SELECT 0, COALESCE(SUM(size), 0) FROM entries')
+                conn.execute('CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN '
+                             'UPDATE totals SET size = size + NEW.size WHERE id = 0; END')
+                conn.execute('CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN '
+                             'UPDATE totals SET size = size - OLD.size WHERE id = 0; END')
+                conn.execute('CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN '
+                             'UPDATE totals SET size = size - OLD.size + NEW.size WHERE id = 0; END')
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """返回缓存的字节，不存在或已过期时返回None"""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute('SELECT value, expires_at, accessed_at FROM entries WHERE key = ?',
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        if expires_at is not None and expires_at <= now:
+            return None
+        if now - accessed_at > TOUCH_INTERVAL:
+            conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return value
+
+    def set(self, key, value):
+        """写入字节值，超过单条上限时不缓存；写入后按总大小淘汰"""
+        if len(value) > self.max_entry_size:
+            return False
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        conn = self._connection()
+        # 不使用 INSERT OR REPLACE：REPLACE删除旧行时不触发DELETE触发器，总大小会多算
+        conn.execute('INSERT INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?) '
+                     'ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, '
+                     'expires_at = excluded.expires_at, accessed_at = excluded.accessed_at',
+                     (key, value, len(value), expires_at, now))
+        self._evict_over_quota(conn)
+        return True
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def _evict_over_quota(self, conn):
+        total = self._total_size(conn)
+        while total > self.max_size:
+            rows = conn.execute('SELECT key, size FROM entries ORDER BY accessed_at LIMIT 64').fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                total -= size
+                if total <= self.max_size:
+                    break
+
+    @staticmethod
+    def _total_size(conn):
+        return conn.execute('SELECT size FROM totals WHERE id = 0').fetchone()[0]
+
+    def expire(self, now=None):
+        """删除已过期的条目，返回删除的条目数"""
+        now = now or time.time()
+        cursor = self._connection().execute(
+            'DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,))
+        return cursor.rowcount
+
+    def stats(self):
+        conn = self._connection()
+        entries = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'entries': entries,
+            'size': self._total_size(conn),
+            'max_size': self.max_size
+        }
+
+
+class MemoryCache:
+    """只在进程内的缓存后端（单进程部署或测试），接口与SQLiteCache相同"""
+
+    def __init__(self, max_size, ttl=None, max_entry_size=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_entry_size = max_entry_size or max_size // 8
+        self._cache = LRUCache(float('inf'), max_size, lambda entry: len(entry[0]))
+
+    def get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self._cache.delete(key)
+            return None
+        return value
+
+    def set(self, key, value):
+        if len(value) > self.max_entry_size:
+            return False
+        self._cache.set(key, (value, time.time() + self.ttl if self.ttl else None))
+        return True
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def expire(self, now=None):
+        # 过期条目在读取时删除，其余由LRU按容量淘汰
+        return 0
+
+    def stats(self):
+        stats = self._cache.stats()
+        return {
+            'backend': 'memory',
+            'entries': stats['entries'],
+            'size': stats['weight'],
+            'max_size': self.max_size
+        }
+
+
+BACKENDS = {
+    'sqlite': lambda config, ttl: SQLiteCache(config['path'], config['max_size'], ttl, config.get('max_entry_size')),
+    'memory': lambda config, ttl: MemoryCache(config['max_size'], ttl, config.get('max_entry_size'))
+}
+
+
+class ResultCache:
+    """两级结果缓存：进程内LRU（保存已解码的对象）-> 共享后端（保存压缩的JSON）
+
+    任一工作进程写入的结果，其他进程都能从共享后端读到，读到后放入自己的前置缓存。
+    缓存的值可能被多个请求同时使用，调用方不应修改。
+    """
+
+    def __init__(self, backend, memory_entries=256, memory_max_size=None, ttl=None):
+        self.backend = backend
+        self.ttl = ttl
+        # 前置缓存条目: (值, 编码后大小, 过期时间)
+        self._front = LRUCache(memory_entries, memory_max_size, lambda entry: entry[1])
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._front.get(key)
+        if entry is not None:
+            value, _, expires_at = entry
+            if expires_at is None or expires_at > time.time():
+                with self._lock:
+                    self.hits += 1
+                return value
+            self._front.delete(key)
+
+        data = self.backend.get(key)
+        if data is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        value = decode_value(data)
+        self._front.set(key, (value, len(data), time.time() + self.ttl if self.ttl else None))
+        with self._lock:
+            self.shared_hits += 1
+        return value
+
+    def set(self, key, value):
+        data = encode_value(value)
+        self._front.set(key, (value, len(data), time.time() + self.ttl if self.ttl else None))
+        self.backend.set(key, data)
+
+    def expire(self):
+        return self.backend.expire()
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'memory_entries': len(self._front)
+            }
+        stats.update(self.backend.stats())
+        return stats
+
+
+def create_result_cache(config, ttl=None):
+    """按配置创建结果缓存，未启用时返回None"""
+    if not config['enabled']:
+        return None
+    backend = BACKENDS[config['backend']](config, ttl)
+    return ResultCache(backend, config['memory_entries'], config['memory_max_size'], ttl)
@@ -0,0 +1,240 @@
+"""块/行内事件流的序列化器：HTML、Markdown、JSON AST
+
+渲染核心（word_to_html_converter.element_events）为每个顶层元素生成事件序列：
+- ('paragraph_start', 段落属性)  ('paragraph_end',)
+- ('run', 文本, 样式字典)
+- ('image', 图片URL, 属性字典)  属性含 alt，以及可能的 width / height（像素）
+- ('table_start',) ('row_start',) ('cell_start',) ('cell_end',) ('row_end',) ('table_end',)
+表格单元格中的段落同样以 paragraph_start / paragraph_end 包围。
+每个序列化器把一个元素的事件序列转换为一个块（字符串），块之间用 separator 连接。
+"""
+import re
+import json
+
+
+def escape_html(text):
+    """转义HTML特殊字符"""
+    return (text.replace('&', '&amp;')
+               .replace('<', '&lt;')
+               .replace('>', '&gt;')
+               .replace('"', '&quot;')
+               .replace("'", '&#39;'))
+
+
+def heading_level(paragraph_attrs):
+    """根据段落样式类名（如 heading-2、title）返回标题级别，非标题返回0"""
+    style_class = paragraph_attrs.get('class', '')
+    if style_class == 'title':
+        return 1
+    match = re.fullmatch(r'heading-([1-6])', style_class)
+    return int(match.group(1)) if match else 0
+
+
+class HtmlSerializer:
+    """HTML输出（与原有转换结果完全一致）"""
+
+    name = 'html'
+    separator = '\n'
+    # HTML片段可以在块内部按标签边界继续分割
+    splittable_blocks = True
+
+    def serialize(self, events):
+        parts = []
+        in_cell = False
+        for event in events:
+            kind = event[0]
+            if kind == 'paragraph_start':
+                # 表格单元格中的段落不输出<p>标签，直接拼接文本
+                if not in_cell:
+                    html_paragraph = '<p'
+                    for attr, value in event[1].items():
+                        html_paragraph += f' {attr}="{value}"'
+                    parts.append(html_paragraph + '>')
+            elif kind == 'paragraph_end':
+                if not in_cell:
+                    parts.append('</p>')
+            elif kind == 'run':
+                text, run_styles = event[1], event[2]
+                if run_styles:
+                    # 如果有样式，添加span标签
+                    style_str = ''
+                    for attr, value in run_styles.items():
+                        style_str += f'{attr}: {value}; '
+                    parts.append(f'<span style="{style_str.strip()}">{escape_html(text)}</span>')
+                else:
+                    parts.append(escape_html(text))
+            elif kind == 'image':
+                html_image = f'<img src="{escape_html(event[1])}" alt="{escape_html(event[2].get("alt", ""))}"'
+                for attr in ('width', 'height'):
+                    if event[2].get(attr):
+                        html_image += f' {attr}="{event[2][attr]}"'
+                parts.append(html_image + '>')
+            elif kind == 'table_start':
+                parts.append('<table border="1" style="border-collapse: collapse;">')
+            elif kind == 'table_end':
+                parts.append('</table>')
+            elif kind == 'row_start':
+                parts.append('<tr>')
+            elif kind == 'row_end':
+                parts.append('</tr>')
+            elif kind == 'cell_start':
+                parts.append('<td style="border: 1px solid #ddd; padding: 8px;">')
+                in_cell = True
+            elif kind == 'cell_end':
+                parts.append('</td>')
+                in_cell = False
+        return ''.join(parts)
+
+
+class MarkdownSerializer:
+    """紧凑的Markdown输出：标题、列表、粗体/斜体和管道表格，不保留字体颜色等样式"""
+
+    name = 'markdown'
+    separator = '\n\n'
+    splittable_blocks = True
+
+    _escape_pattern = re.compile(r'([\\`*_\[\]|])')
+
+    def _inline(self, text, run_styles):
+        text = self._escape_pattern.sub(r'\\\1', text)
+        core = text.strip()
+        if not core:
+            return text
+        marker = ''
+        if run_styles.get('font-weight') == 'bold':
+            marker += '**'
+        if run_styles.get('font-style') == 'italic':
+            marker += '*'
+        if not marker:
+            return text
+        # 强调标记必须紧贴文字，首尾空白放在标记外
+        leading = text[:len(text) - len(text.lstrip())]
+        trailing = text[len(text.rstrip()):]
+        return f'{leading}{marker}{core}{marker[::-1]}{trailing}'
+
+    def serialize(self, events):
+        lines = []
+        paragraph = None
+        paragraph_prefix = ''
+        row = None
+        cell = None
+        row_count = 0
+        for event in events:
+            kind = event[0]
+            if kind == 'paragraph_start':
+                paragraph = []
+                level = heading_level(event[1])
+                style_class = event[1].get('class', '')
+                if level:
+                    paragraph_prefix = '#' * level + ' '
+                elif style_class.startswith('list-bullet'):
+                    paragraph_prefix = '- '
+                elif style_class.startswith('list-number'):
+                    paragraph_prefix = '1. '
+                else:
+                    paragraph_prefix = ''
+            elif kind == 'run':
+                paragraph.append(self._inline(event[1], event[2]))
+            elif kind == 'image':
+                alt = self._escape_pattern.sub(r'\\\1', event[2].get('alt', ''))
+                paragraph.append(f'![{alt}]({event[1]})')
+            elif kind == 'paragraph_end':
+                text = ''.join(paragraph).strip()
+                if cell is not None:
+                    cell.append(text)
+                else:
+                    lines.append(paragraph_prefix + text)
+                paragraph = None
+            elif kind == 'row_start':
+                row = []
+            elif kind == 'cell_start':
+                cell = []
+            elif kind == 'cell_end':
+                row.append(' '.join(cell).replace('\n', ' '))
+                cell = None
+            elif kind == 'row_end':
+                lines.append('| ' + ' | '.join(row) + ' |')
+                row_count += 1
+                if row_count == 1:
+                    # 第一行作为表头
+                    lines.append('|' + ' --- |' * len(row))
+                row = None
+            elif kind == 'table_start':
+                row_count = 0
+        return '\n'.join(lines)
+
+
+class JsonAstSerializer:
+    """JSON AST输出：段落（含样式和行内文本）与表格（行/单元格/段落）的结构化数据
+
+    块序列化为紧凑JSON字符串以便统一分割和缓存，build_block 返回对应的Python对象。
+    """
+
+    name = 'json'
+    separator = '\n'
+    # JSON块不能从中间切开，超长块单独成为一个片段
+    splittable_blocks = False
+
+    def build_block(self, events):
+        block = None
+        stack = []
+        for event in events:
+            kind = event[0]
+            if kind == 'paragraph_start':
+                paragraph = {'type': 'paragraph', 'runs': []}
+                attrs = event[1]
+                if attrs.get('class'):
+                    paragraph['style'] = attrs['class']
+                if attrs.get('align'):
+                    paragraph['align'] = attrs['align']
+                level = heading_level(attrs)
+                if level:
+                    paragraph['heading'] = level
+                if stack:
+                    stack[-1]['paragraphs'].append(paragraph)
+                else:
+                    block = paragraph
+                stack.append(paragraph)
+            elif kind == 'run':
+                run = {'text': event[1]}
+                if event[2]:
+                    run['style'] = dict(event[2])
+                stack[-1]['runs'].append(run)
+            elif kind == 'image':
+                image = {'image': event[1]}
+                image.update(event[2])
+                stack[-1]['runs'].append(image)
+            elif kind == 'paragraph_end':
+                stack.pop()
+            elif kind == 'table_start':
+                block = {'type': 'table', 'rows': []}
+                stack.append(block)
+            elif kind == 'row_start':
+                row = {'cells': []}
+                stack[-1]['rows'].append(row)
+                stack.append(row)
+            elif kind == 'cell_start':
+                cell = {'paragraphs': []}
+                stack[-1]['cells'].append(cell)
+                stack.append(cell)
+            elif kind in ('cell_end', 'row_end', 'table_end'):
+                stack.pop()
+        return block
+
+    def serialize(self, events):
+        return json.dumps(self.build_block(events), ensure_ascii=False, separators=(',', ':'))
+
+
+SERIALIZERS = {
+    'html': HtmlSerializer(),
+    'markdown': MarkdownSerializer(),
+    'json': JsonAstSerializer()
+}
+
+
+def get_serializer(output_format):
+    """返回指定格式的序列化器，不支持的格式抛出ValueError"""
+    try:
+        return SERIALIZERS[output_format]
+    except KeyError:
+        raise ValueError(f'不支持的输出格式: {output_format}')
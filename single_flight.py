@@ -0,0 +1,77 @@
+"""请求合并（single-flight）：同一键的并发调用只执行一次，其余调用等待并共享结果"""
+import threading
+
+
+class SingleFlightTimeout(TimeoutError):
+    """等待进行中的同键调用超时"""
+
+
+class _Call:
+    """一次进行中的调用"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """进行中调用的登记表
+
+    - 第一个调用某个键的线程执行函数，期间到达的同键调用不再执行，而是等待其结果
+    - 函数抛出异常时，所有等待者收到同一个异常
+    - 等待者可以设置超时，超时抛出 SingleFlightTimeout（执行中的调用不受影响）
+    - 调用完成后立即移出登记表，不缓存结果；之后的调用会重新执行
+    - 共享的结果对象由多个调用方同时持有，调用方不应修改它
+    """
+
+    def __init__(self, name=''):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, timeout=None, **kwargs):
+        """执行或等待同键的调用，返回 (结果, 是否为共享的结果)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                call.done.set()
+            return call.result, False
+
+        if not call.done.wait(timeout):
+            raise SingleFlightTimeout(f'等待进行中的{self.name}超时（{timeout}秒）')
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'waiting': sum(call.waiters for call in self._calls.values()),
+                'executed': self.executed,
+                'coalesced': self.coalesced
+            }
@@ -0,0 +1,196 @@
+"""有效样式解析：按文档预先计算每个样式的有效格式并缓存，再叠加run的直接格式"""
+from docx.oxml.ns import qn
+from docx.styles import BabelFish
+
+# 布尔型（开关）属性：XML元素名 -> 属性名
+TOGGLE_PROPERTIES = {
+    'w:b': 'bold',
+    'w:i': 'italic'
+}
+
+FALSE_VALUES = ('0', 'false', 'off', 'none')
+
+
+def parse_run_properties(rpr):
+    """解析 <w:rPr> 元素中与输出相关的格式，返回只包含显式设置项的字典
+
+    - bold / italic / underline: 布尔值
+    - font: 字体名（ascii > hAnsi > eastAsia，主题字体不解析）
+    - size: 字号（pt）
+    - color: 六位十六进制颜色（auto不输出）
+    """
+    props = {}
+    if rpr is None:
+        return props
+
+    for tag, name in TOGGLE_PROPERTIES.items():
+        element = rpr.find(qn(tag))
+        if element is not None:
+            props[name] = element.get(qn('w:val'), 'true').lower() not in FALSE_VALUES
+
+    underline = rpr.find(qn('w:u'))
+    if underline is not None:
+        props['underline'] = underline.get(qn('w:val'), 'single').lower() not in FALSE_VALUES
+
+    fonts = rpr.find(qn('w:rFonts'))
+    if fonts is not None:
+        for attr in ('w:ascii', 'w:hAnsi', 'w:eastAsia'):
+            font = fonts.get(qn(attr))
+            if font:
+                props['font'] = font
+                break
+
+    size = rpr.find(qn('w:sz'))
+    if size is not None and size.get(qn('w:val')):
+        # w:sz 以半磅（half-points）为单位
+        props['size'] = int(size.get(qn('w:val'))) / 2
+
+    color = rpr.find(qn('w:color'))
+    if color is not None:
+        value = color.get(qn('w:val'))
+        if value and value.lower() != 'auto':
+            props['color'] = value.lower()
+
+    return props
+
+
+def properties_to_css(props):
+    """将格式字典转换为与 get_run_style 相同的CSS属性字典"""
+    styles = {}
+    if props.get('bold'):
+        styles['font-weight'] = 'bold'
+    if props.get('italic'):
+        styles['font-style'] = 'italic'
+    if props.get('underline'):
+        styles['text-decoration'] = 'underline'
+    if props.get('font'):
+        styles['font-family'] = props['font']
+    if props.get('size'):
+        styles['font-size'] = f"{props['size']}pt"
+    if props.get('color'):
+        styles['color'] = f"#{props['color']}"
+    return styles
+
+
+class StyleResolver:
+    """每个文档一个的样式解析器
+
+    - 解析 styles.xml 一次：文档默认格式（docDefaults）和所有样式的 basedOn 继承链
+    - 每个样式的有效格式只计算一次并缓存；(段落样式, 字符样式) 组合的结果也缓存
+    - 每个run只需读取自身的直接格式并叠加在缓存结果上，单个run的开销与样式层级无关
+
+    输出时只保留与文档正文默认格式（docDefaults + 默认段落样式）不同的属性，
+    普通正文不会为每个run重复输出字体和字号。
+    """
+
+    def __init__(self, styles_element):
+        self._styles = {}
+        self._default_paragraph_style = None
+        self._default_character_style = None
+        for style in styles_element.iterfind(qn('w:style')):
+            style_id = style.get(qn('w:styleId'))
+            if not style_id:
+                continue
+            self._styles[style_id] = style
+            if style.get(qn('w:default')) in ('1', 'true', 'on'):
+                style_type = style.get(qn('w:type'))
+                if style_type == 'paragraph':
+                    self._default_paragraph_style = style_id
+                elif style_type == 'character':
+                    self._default_character_style = style_id
+
+        defaults = styles_element.find(qn('w:docDefaults'))
+        rpr = None
+        if defaults is not None:
+            rpr = defaults.find(f"{qn('w:rPrDefault')}/{qn('w:rPr')}")
+        self._document_defaults = parse_run_properties(rpr)
+
+        self._style_cache = {}
+        self._combined_cache = {}
+        self._name_cache = {}
+        self._body_defaults = self.combined_properties(None, None)
+
+    @classmethod
+    def for_document(cls, doc):
+        return cls(doc.styles.element)
+
+    def style_properties(self, style_id, _seen=None):
+        """返回样式沿 basedOn 链合并后的格式（不含文档默认格式），结果缓存"""
+        if style_id is None:
+            return {}
+        cached = self._style_cache.get(style_id)
+        if cached is not None:
+            return cached
+
+        style = self._styles.get(style_id)
+        if style is None:
+            return {}
+
+        seen = _seen or set()
+        seen.add(style_id)
+        props = {}
+        based_on = style.find(qn('w:basedOn'))
+        if based_on is not None:
+            parent_id = based_on.get(qn('w:val'))
+            # 防止循环继承
+            if parent_id and parent_id not in seen:
+                props.update(self.style_properties(parent_id, seen))
+        props.update(parse_run_properties(style.find(qn('w:rPr'))))
+
+        self._style_cache[style_id] = props
+        return props
+
+    def combined_properties(self, paragraph_style_id, character_style_id):
+        """文档默认格式 + 段落样式 + 字符样式 的有效格式，按组合缓存"""
+        key = (paragraph_style_id, character_style_id)
+        cached = self._combined_cache.get(key)
+        if cached is not None:
+            return cached
+
+        props = dict(self._document_defaults)
+        props.update(self.style_properties(paragraph_style_id or self._default_paragraph_style))
+        props.update(self.style_properties(character_style_id or self._default_character_style))
+        self._combined_cache[key] = props
+        return props
+
+    def paragraph_style_name(self, style_id):
+        """段落样式的显示名（与 paragraph.style.name 一致），未定义的样式使用默认段落样式"""
+        try:
+            return self._name_cache[style_id]
+        except KeyError:
+            pass
+
+        style = self._styles.get(style_id)
+        if style is None or style.get(qn('w:type')) != 'paragraph':
+            style = self._styles.get(self._default_paragraph_style)
+        name = None
+        if style is not None:
+            name_element = style.find(qn('w:name'))
+            if name_element is not None and name_element.get(qn('w:val')) is not None:
+                name = BabelFish.internal2ui(name_element.get(qn('w:val')))
+        self._name_cache[style_id] = name
+        return name
+
+    @staticmethod
+    def paragraph_style_id(paragraph):
+        ppr = paragraph._p.pPr
+        if ppr is not None and ppr.pStyle is not None:
+            return ppr.pStyle.val
+        return None
+
+    def run_style(self, run, paragraph_style_id=None):
+        """返回run的有效格式（CSS属性字典），只包含与正文默认格式不同的属性"""
+        rpr = run._r.rPr
+        character_style_id = None
+        if rpr is not None and rpr.rStyle is not None:
+            character_style_id = rpr.rStyle.val
+
+        props = self.combined_properties(paragraph_style_id, character_style_id)
+        direct = parse_run_properties(rpr)
+        if direct:
+            props = dict(props)
+            props.update(direct)
+
+        body = self._body_defaults
+        differing = {name: value for name, value in props.items() if body.get(name) != value}
+        return properties_to_css(differing)
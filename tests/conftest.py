@@ -0,0 +1,93 @@
+"""测试公共设置：在临时工作目录中运行（上传、缓存文件不写入项目目录），提供测试文档和本地文件服务器"""
+import io
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# 配置中的存储目录都是相对路径，导入app之前切换到临时工作目录
+_WORKDIR = tempfile.mkdtemp(prefix='word2html-test-')
+os.chdir(_WORKDIR)
+atexit.register(shutil.rmtree, _WORKDIR, True)
+
+
+def make_docx(sections=3, paragraphs=3, table_every=0, text='测试段落内容'):
+    """生成测试用docx，返回字节内容；每节为一个标题和若干段落，table_every>0 时每隔几节插入一个表格"""
+    from docx import Document
+    doc = Document()
+    for index in range(sections):
+        doc.add_heading(f'第{index + 1}章', level=1)
+        for number in range(paragraphs):
+            paragraph = doc.add_paragraph(f'{text} {index}-{number} ')
+            paragraph.add_run('加粗').bold = True
+        if table_every and index % table_every == table_every - 1:
+            table = doc.add_table(rows=2, cols=2)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = '单元格'
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='session')
+def sample_docx():
+    return make_docx()
+
+
+@pytest.fixture(scope='session')
+def large_docx():
+    return make_docx(sections=60, paragraphs=5, table_every=10)
+
+
+class DocumentServer:
+    """在本地端口上提供目录中文件的HTTP服务器"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        handler = functools.partial(_QuietHandler, directory=directory)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def add(self, name, content):
+        """放入文件，返回其URL"""
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(content)
+        return self.url(name)
+
+    def url(self, name):
+        return f'http://127.0.0.1:{self.port}/{name}'
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='session')
+def doc_server(tmp_path_factory):
+    server = DocumentServer(str(tmp_path_factory.mktemp('docs')))
+    yield server
+    server.httpd.shutdown()
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    app.warmup.wait(60)
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
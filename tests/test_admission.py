@@ -0,0 +1,81 @@
+import time
+import threading
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, estimate_memory_cost
+
+
+def _wait_until(predicate):
+    for _ in range(500):
+        if predicate():
+            return
+        time.sleep(0.01)
+    raise AssertionError('条件未满足')
+
+
+def test_estimate_memory_cost():
+    config = {'base_cost': 100, 'compressed_factor': 2, 'xml_factor': 10}
+    assert estimate_memory_cost(50, 1000, config) == 100 + 100 + 10000
+
+
+def test_oversized_document_runs_alone():
+    controller = AdmissionController(max_concurrent=4, memory_budget=100)
+    with controller.admit(1000):
+        assert controller.stats()['active'] == 1
+    assert controller.stats()['reserved_memory'] == 0
+
+
+def test_memory_budget_queues_then_rejects():
+    controller = AdmissionController(max_concurrent=4, memory_budget=100, queue_timeout=0.05, retry_after=7)
+    controller.acquire(80)
+    with pytest.raises(AdmissionRejected) as info:
+        controller.acquire(30)
+    assert info.value.retry_after == 7
+    controller.acquire(20)
+    assert controller.stats()['active'] == 2
+    assert controller.stats()['rejected'] == 1
+
+
+def test_full_queue_rejects_immediately():
+    controller = AdmissionController(max_concurrent=1, memory_budget=100, max_queue=0)
+    controller.acquire(1)
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected):
+        controller.acquire(1)
+    assert time.monotonic() - started < 1
+
+
+def test_queued_requests_start_in_arrival_order():
+    controller = AdmissionController(max_concurrent=1, memory_budget=100, queue_timeout=5)
+    controller.acquire(10)
+    order = []
+
+    def run(name):
+        with controller.admit(10):
+            order.append(name)
+
+    threads = []
+    for name in ('first', 'second', 'third'):
+        thread = threading.Thread(target=run, args=(name,))
+        thread.start()
+        threads.append(thread)
+        _wait_until(lambda: controller.stats()['queued'] == len(threads))
+    controller.release(10)
+    for thread in threads:
+        thread.join(5)
+    assert order == ['first', 'second', 'third']
+    assert controller.stats()['active'] == 0
+
+
+def test_busy_server_returns_503(client, app_module, doc_server, sample_docx, monkeypatch):
+    controller = AdmissionController(max_concurrent=1, memory_budget=1, max_queue=0, retry_after=3)
+    monkeypatch.setattr(app_module, 'admission', controller)
+    controller.acquire(1)
+    try:
+        fileurl = doc_server.add('busy.docx', sample_docx)
+        response = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 123})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '3'
+    finally:
+        controller.release(1)
@@ -0,0 +1,62 @@
+from word_to_html_converter import (content_hash, convert_document, iter_anchored_offsets, load_word_document,
+                                    split_blocks_anchored)
+
+
+def _blocks(count=300, edited=None):
+    blocks = [f'<p>段落 {index} {"内容" * (index % 7 + 1)}</p>' for index in range(count)]
+    if edited is not None:
+        blocks[edited] = '<p>修改后的段落</p>'
+    return blocks
+
+
+def test_anchored_fragments_end_on_block_boundaries():
+    blocks = _blocks()
+    html = '\n'.join(blocks)
+    offsets = split_blocks_anchored(blocks, 400)
+    assert offsets[0][0] == 0 and offsets[-1][1] == len(html)
+    boundaries = {0, len(html)}
+    position = 0
+    for block in blocks:
+        position += len(block)
+        boundaries.add(position)
+        position += 1
+    for start, end in offsets:
+        assert end - start <= 400
+        assert end in boundaries
+        assert html[start - 1:start] in ('', '\n')
+
+
+def test_iterator_and_precomputed_hashes_give_same_offsets():
+    blocks = _blocks()
+    expected = split_blocks_anchored(blocks, 400)
+    assert list(iter_anchored_offsets(iter(blocks), 400)) == expected
+    assert split_blocks_anchored(blocks, 400, [content_hash(block) for block in blocks]) == expected
+
+
+def test_edit_only_changes_containing_fragments():
+    def fragment_hashes(blocks):
+        html = '\n'.join(blocks)
+        return [content_hash(html[start:end]) for start, end in split_blocks_anchored(blocks, 400)]
+
+    before = fragment_hashes(_blocks())
+    after = fragment_hashes(_blocks(edited=150))
+    # 只有包含被修改块的片段（以及可能因此移动的下一个锚点前的片段）改变
+    assert len(set(before) - set(after)) <= 2
+    assert before[:5] == after[:5]
+    assert before[-5:] == after[-5:]
+
+
+def test_oversized_block_is_split():
+    blocks = ['<p>短</p>', '<table>' + '<tr><td>单元格</td></tr>' * 100 + '</table>', '<p>短</p>']
+    offsets = split_blocks_anchored(blocks, 300)
+    assert all(end - start <= 300 for start, end in offsets)
+    assert offsets[-1][1] == len('\n'.join(blocks))
+
+
+def test_convert_document_hashes(large_docx):
+    doc = load_word_document(large_docx)
+    result = convert_document(doc, 3000, split='anchored', hashes=True)
+    html = result['html']
+    assert result['fragment_hashes'] == [content_hash(html[start:end]) for start, end in result['offsets']]
+    assert len(result['block_hashes']) == html.count('\n') + 1
+    assert convert_document(load_word_document(large_docx), 3000, split='anchored', hashes=True) == result
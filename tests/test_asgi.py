@@ -0,0 +1,131 @@
+import json
+import asyncio
+import hashlib
+
+import pytest
+from werkzeug.exceptions import ClientDisconnected
+
+from asgi import RECEIVE_QUEUE_SIZE, ASGIFrontend, ReceiveReader
+
+
+def call_asgi(asgi_app, method, path, chunks=(b'',), headers=(), query_string=b''):
+    """在进程内调用ASGI应用，请求体按chunks分成多个消息发送，返回 (状态码, 响应头, 响应体, 已发送的消息数)"""
+    async def run():
+        pending = [{'type': 'http.request', 'body': chunk, 'more_body': index < len(chunks) - 1}
+                   for index, chunk in enumerate(chunks)]
+        sent = []
+        done = asyncio.Event()
+
+        async def receive():
+            if pending:
+                sent.append(pending[0])
+                return pending.pop(0)
+            # 请求体已发送完，直到响应结束才断开
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                done.set()
+
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query_string,
+            'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            'http_version': '1.1',
+            'scheme': 'http',
+            'server': ('testserver', 80)
+        }
+        await asgi_app(scope, receive, send)
+        start = messages[0]
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return start['status'], dict(start['headers']), body, len(sent)
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def asgi_app(app_module):
+    from asgi import app
+    return app
+
+
+def test_stream_upload_without_content_length(asgi_app, sample_docx):
+    chunks = [sample_docx[start:start + 1000] for start in range(0, len(sample_docx), 1000)]
+    status, _, body, _ = call_asgi(asgi_app, 'POST', '/upload/stream', chunks,
+                                   headers=[('transfer-encoding', 'chunked')], query_string=b'filename=a.docx')
+    assert status == 200
+    assert json.loads(body)['content_hash'] == hashlib.sha256(sample_docx).hexdigest()
+
+
+def test_stream_upload_over_limit_stops_reading(asgi_app, app_module, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'MAX_CONTENT_LENGTH', 10000)
+    chunks = [b'x' * 1000] * 1000
+    status, _, _, received = call_asgi(asgi_app, 'POST', '/upload/stream', chunks,
+                                       query_string=b'filename=big.docx')
+    assert status == 413
+    # 超过上限后不再接收其余的请求体
+    assert received < 50
+
+
+def test_download_route_reads_json_body(asgi_app, doc_server, sample_docx):
+    fileurl = doc_server.add('asgi.docx', sample_docx)
+    body = json.dumps({'fileurl': fileurl}).encode('utf-8')
+    status, _, response, _ = call_asgi(asgi_app, 'POST', '/outline', [body[:10], body[10:]],
+                                       headers=[('content-type', 'application/json'),
+                                                ('content-length', str(len(body)))])
+    assert status == 200
+    assert json.loads(response)['heading_count'] == 3
+
+
+def test_receive_reader_applies_backpressure():
+    async def run():
+        received = []
+
+        async def receive():
+            received.append(1)
+            return {'type': 'http.request', 'body': b'abc', 'more_body': len(received) < 100}
+
+        loop = asyncio.get_running_loop()
+        reader = ReceiveReader(receive, loop)
+        pump = asyncio.ensure_future(reader.pump())
+        await asyncio.sleep(0.05)
+        # 没有读取时最多排队 RECEIVE_QUEUE_SIZE 个消息
+        assert len(received) <= RECEIVE_QUEUE_SIZE + 1
+        data = await loop.run_in_executor(None, reader.read)
+        await pump
+        return data
+
+    assert asyncio.run(run()) == b'abc' * 100
+
+
+def test_receive_reader_disconnect():
+    async def run():
+        messages = [{'type': 'http.request', 'body': b'abc', 'more_body': True}, {'type': 'http.disconnect'}]
+
+        async def receive():
+            return messages.pop(0)
+
+        loop = asyncio.get_running_loop()
+        reader = ReceiveReader(receive, loop)
+        pump = asyncio.ensure_future(reader.pump())
+        first = await loop.run_in_executor(None, reader.read, 3)
+        with pytest.raises(ClientDisconnected):
+            await loop.run_in_executor(None, reader.read, 3)
+        await pump
+        return first
+
+    assert asyncio.run(run()) == b'abc'
+
+
+def test_duplicate_headers_are_joined():
+    scope = {'method': 'GET', 'path': '/', 'headers': [
+        (b'cookie', b'a=1'), (b'cookie', b'b=2'), (b'accept', b'text/html'), (b'accept', b'application/json')]}
+    environ = ASGIFrontend._environ(scope, None, None)
+    assert environ['HTTP_COOKIE'] == 'a=1; b=2'
+    assert environ['HTTP_ACCEPT'] == 'text/html,application/json'
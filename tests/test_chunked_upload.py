@@ -0,0 +1,132 @@
+import io
+import hashlib
+import threading
+
+import pytest
+
+from chunked_upload import ChunkedUploadManager, LimitedReader, OffsetMismatch, UploadTooLarge
+from config import UPLOAD_CONFIG
+
+
+def test_limited_reader_raises_past_limit():
+    reader = LimitedReader(io.BytesIO(b'x' * 10), 8)
+    assert reader.read(5) == b'xxxxx'
+    with pytest.raises(UploadTooLarge):
+        reader.read(5)
+
+
+def test_limited_reader_counts_already_read():
+    reader = LimitedReader(io.BytesIO(b'abc'), 5, already_read=3)
+    with pytest.raises(UploadTooLarge):
+        reader.read(3)
+
+
+def test_resume_after_offset_mismatch(tmp_path):
+    manager = ChunkedUploadManager(str(tmp_path), max_size=100)
+    upload_id = manager.create('a.docx', total_size=6)['upload_id']
+    info = manager.append(upload_id, 0, io.BytesIO(b'abc'))
+    assert info['offset'] == 3 and info['complete'] is False
+
+    with pytest.raises(OffsetMismatch) as excinfo:
+        manager.append(upload_id, 0, io.BytesIO(b'abc'))
+    assert excinfo.value.expected == 3
+
+    info = manager.append(upload_id, 3, io.BytesIO(b'def'))
+    assert info['complete'] is True
+    path, content_hash, _ = manager.finish(upload_id)
+    assert content_hash == hashlib.sha256(b'abcdef').hexdigest()
+    with open(path, 'rb') as f:
+        assert f.read() == b'abcdef'
+
+
+def test_oversized_chunk_is_discarded(tmp_path):
+    manager = ChunkedUploadManager(str(tmp_path), max_size=100)
+    upload_id = manager.create('a.docx', total_size=4)['upload_id']
+    manager.append(upload_id, 0, io.BytesIO(b'ab'))
+    with pytest.raises(UploadTooLarge):
+        manager.append(upload_id, 2, io.BytesIO(b'cdef'))
+    # 不完整的分块被丢弃，偏移量保持在上一次确认的位置
+    assert manager.status(upload_id)['offset'] == 2
+
+
+def test_chunked_upload_routes(client, sample_docx):
+    created = client.post('/upload/chunked', json={'filename': 'a.docx', 'total_size': len(sample_docx)}).get_json()
+    upload_id = created['upload_id']
+    half = len(sample_docx) // 2
+
+    response = client.put(f'/upload/chunked/{upload_id}?offset=0', data=sample_docx[:half])
+    assert response.get_json()['offset'] == half
+
+    conflict = client.put(f'/upload/chunked/{upload_id}?offset=0', data=sample_docx[:half])
+    assert conflict.status_code == 409
+    assert conflict.get_json()['offset'] == half
+
+    done = client.put(f'/upload/chunked/{upload_id}?offset={half}', data=sample_docx[half:])
+    assert done.status_code == 200
+    assert done.get_json()['content_hash'] == hashlib.sha256(sample_docx).hexdigest()
+    assert client.get(f'/upload/chunked/{upload_id}').status_code == 404
+
+
+def test_stream_upload(client, sample_docx):
+    response = client.post('/upload/stream?filename=a.docx', data=sample_docx)
+    assert response.status_code == 200
+    assert response.get_json()['content_hash'] == hashlib.sha256(sample_docx).hexdigest()
+
+
+@pytest.mark.parametrize('method, path', [
+    ('post', '/upload/stream?filename=big.docx'),
+    ('put', '/upload/chunked/{upload_id}?offset=0'),
+])
+def test_body_over_max_content_length_returns_413(client, method, path):
+    upload_id = client.post('/upload/chunked', json={'filename': 'big.docx'}).get_json()['upload_id']
+    body = b'x' * (UPLOAD_CONFIG['max_content_length'] + 1024 * 1024)
+    response = getattr(client, method)(path.format(upload_id=upload_id), data=body)
+    assert response.status_code == 413
+    assert response.get_json()['success'] is False
+
+
+def test_concurrent_chunks_at_same_offset(tmp_path):
+    manager = ChunkedUploadManager(str(tmp_path))
+    upload_id = manager.create('a.docx', total_size=8)['upload_id']
+    reading = threading.Event()
+    release = threading.Event()
+
+    class SlowStream:
+        """读出一部分后等待，模拟仍在接收中的分块"""
+
+        def __init__(self, data):
+            self.parts = [data[:2], data[2:]]
+
+        def read(self, size=-1):
+            if len(self.parts) == 1:
+                reading.set()
+                release.wait(5)
+            return self.parts.pop(0) if self.parts else b''
+
+    results = {}
+
+    def first():
+        results['first'] = manager.append(upload_id, 0, SlowStream(b'abcdefgh'))
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert reading.wait(5)
+
+    def second():
+        try:
+            manager.append(upload_id, 0, io.BytesIO(b'XXXXXXXX'))
+        except OffsetMismatch as e:
+            results['second'] = e.expected
+
+    other = threading.Thread(target=second)
+    other.start()
+    release.set()
+    thread.join(5)
+    other.join(5)
+    # 第二个分块等第一个写完后才检查偏移量，不会覆盖已写入的数据
+    assert results == {'first': results['first'], 'second': 8}
+    path, content_hash, _ = manager.finish(upload_id)
+    with open(path, 'rb') as f:
+        assert f.read() == b'abcdefgh'
+    assert content_hash == hashlib.sha256(b'abcdefgh').hexdigest()
+    assert manager._session_locks == {}
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+import conversion_pool
+from config import ASYNC_CONFIG
+from conversion_pool import convert_in_pool
+from deadline import ConversionTimeout, Deadline
+from word_to_html_converter import convert_document, load_word_document
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setitem(ASYNC_CONFIG, 'cpu_workers', 1)
+    conversion_pool.shutdown_executor()
+    yield
+    conversion_pool.shutdown_executor()
+
+
+def test_pool_result_matches_in_process_conversion(pool, large_docx):
+    result = convert_in_pool(large_docx, 2000, split='anchored', hashes=True, deadline=Deadline(60))
+    expected = convert_document(load_word_document(large_docx), 2000, split='anchored', hashes=True)
+    assert result == expected
+
+
+def test_pool_wait_stops_at_deadline(pool, large_docx):
+    # 新建的进程池启动工作进程就超过了截止时间
+    with pytest.raises(ConversionTimeout):
+        convert_in_pool(large_docx, 2000, deadline=Deadline(0.001))
+
+
+def test_expired_deadline_is_not_submitted(pool, large_docx, monkeypatch):
+    monkeypatch.setattr(conversion_pool, 'get_executor', lambda: pytest.fail('不应提交到进程池'))
+    deadline = Deadline()
+    deadline.cancel()
+    with pytest.raises(ConversionTimeout):
+        convert_in_pool(large_docx, 2000, deadline=deadline)
+
+
+def test_deadline_round_trips_as_wall_clock_time():
+    deadline = Deadline(30)
+    time.sleep(0.05)
+    worker_deadline = Deadline.at(deadline.wall_expires_at(), deadline.timeout)
+    assert abs(worker_deadline.remaining() - deadline.remaining()) < 0.05
+    assert worker_deadline.remaining() < 29.96
+    assert Deadline().wall_expires_at() is None
+
+
+def test_worker_skips_task_expired_in_queue(large_docx, monkeypatch):
+    import word_to_html_converter
+    monkeypatch.setattr(word_to_html_converter, 'load_word_document', lambda *args: pytest.fail('不应开始转换'))
+    with pytest.raises(ConversionTimeout, match='3秒'):
+        conversion_pool._convert_content(large_docx, 2000, expires_at=time.time() - 1, timeout=3)
+
+
+def test_worker_stops_at_request_deadline(large_docx, monkeypatch):
+    seen = {}
+
+    def convert_document(doc, max_length, image_store=None, deadline=None, **options):
+        seen['remaining'] = deadline.remaining()
+        return {}
+
+    import word_to_html_converter
+    monkeypatch.setattr(word_to_html_converter, 'convert_document', convert_document)
+    conversion_pool._convert_content(large_docx, 2000, expires_at=time.time() + 0.5, timeout=30)
+    # 工作进程按请求的截止时刻计时，而不是从开始运行时重新计时
+    assert 0 < seen['remaining'] <= 0.5
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from deadline import ConversionTimeout, Deadline
+from word_to_html_converter import (convert_document, convert_lazily, iter_document_elements, load_word_document,
+                                    split_html_offsets)
+
+
+def _cancelled():
+    deadline = Deadline()
+    deadline.cancel()
+    return deadline
+
+
+def test_unlimited_deadline():
+    deadline = Deadline(None)
+    assert deadline.remaining() is None
+    assert not deadline.expired()
+    deadline.check()
+    deadline.cancel()
+    assert deadline.expired()
+    with pytest.raises(ConversionTimeout, match='已取消'):
+        deadline.check()
+
+
+def test_deadline_expires():
+    deadline = Deadline(0.01)
+    assert 0 < deadline.remaining() <= 0.01
+    time.sleep(0.02)
+    assert deadline.expired()
+    assert deadline.remaining() == 0
+    with pytest.raises(ConversionTimeout, match='超时'):
+        deadline.check()
+
+
+def test_split_checks_deadline():
+    with pytest.raises(ConversionTimeout):
+        split_html_offsets('<p>内容</p>' * 1000, 100, deadline=_cancelled())
+
+
+def test_conversion_stops_at_deadline(large_docx):
+    doc = load_word_document(large_docx)
+    with pytest.raises(ConversionTimeout):
+        convert_document(doc, 2000, deadline=_cancelled())
+    with pytest.raises(ConversionTimeout):
+        convert_document(doc, 2000, max_fragments=2, deadline=_cancelled())
+
+
+class _ExpiresAfter(Deadline):
+    """检查指定次数后超时"""
+
+    def __init__(self, checks):
+        super().__init__()
+        self.checks = checks
+
+    def check(self):
+        self.checks -= 1
+        if self.checks < 0:
+            raise ConversionTimeout('转换超时')
+
+
+def test_partial_conversion_returns_fragments_before_deadline(large_docx):
+    doc = load_word_document(large_docx)
+    full = convert_document(doc, 1000)
+    deadline = _ExpiresAfter(150)
+    result = convert_lazily(doc, iter_document_elements(doc, deadline), None, 1000, deadline=deadline, partial=True)
+    assert result['timed_out'] is True and result['truncated'] is True
+    assert 0 < len(result['offsets']) < len(full['offsets'])
+    assert result['offsets'] == full['offsets'][:len(result['offsets'])]
+
+
+def test_convert_timeout_returns_504(client, app_module, doc_server, sample_docx, monkeypatch):
+    monkeypatch.setattr(app_module, 'conversion_deadline', lambda timeout=None: _cancelled())
+    fileurl = doc_server.add('timeout.docx', sample_docx)
+    response = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 5555})
+    assert response.status_code == 504
+    assert response.get_json()['success'] is False
@@ -0,0 +1,28 @@
+import gzip
+
+from frontend import FrontendAssets
+
+
+def test_index_references_hashed_assets():
+    assets = FrontendAssets()
+    html = assets.index['body'].decode('utf-8')
+    for name in assets.assets:
+        assert f'/assets/{name}' in html
+    assert 'href="app.css"' not in html
+    assert gzip.decompress(assets.index['gzip']) == assets.index['body']
+
+
+def test_hashed_asset_is_immutable_and_precompressed(app_module, client):
+    name = next(iter(app_module.frontend_assets.assets))
+    response = client.get(f'/assets/{name}', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert client.get('/assets/app.unknown.js').status_code == 404
+
+
+def test_index_revalidates_with_etag(client):
+    response = client.get('/')
+    assert 'no-cache' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,110 @@
+import io
+import os
+import zlib
+import struct
+import hashlib
+
+from docx import Document
+
+from image_store import ImageStore
+from word_to_html_converter import convert_document, load_word_document
+
+
+def make_png(width=2, height=2, color=(255, 0, 0)):
+    """生成纯色PNG（不依赖Pillow）"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = b''.join(b'\x00' + bytes(color) * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+def _document_with_images(*images):
+    doc = Document()
+    doc.add_paragraph('带图片的文档')
+    for image in images:
+        doc.add_picture(io.BytesIO(image))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def test_images_are_stored_once_by_content_hash(tmp_path):
+    store = ImageStore(str(tmp_path))
+    red, blue = make_png(), make_png(color=(0, 0, 255))
+    first = store.extract(load_word_document(_document_with_images(red, blue, red)))
+    assert sorted(set(first.values())) == sorted(f'/images/{hashlib.sha256(image).hexdigest()}.png'
+                                                 for image in (red, blue))
+
+    second = store.extract(load_word_document(_document_with_images(red)))
+    assert set(second.values()) <= set(first.values())
+    assert store.stats()['file_count'] == 2
+
+
+def test_extract_only_requested_relationships(tmp_path):
+    store = ImageStore(str(tmp_path))
+    doc = load_word_document(_document_with_images(make_png(), make_png(color=(0, 255, 0))))
+    rel_id = next(iter(store.extract(doc)))
+    assert list(store.extract(doc, {rel_id})) == [rel_id]
+
+
+def test_thumbnail_width_rounds_up_to_configured_tier(tmp_path):
+    store = ImageStore(str(tmp_path), thumbnail_widths=(512, 128, 256))
+    assert store.thumbnail_width(100) == 128
+    assert store.thumbnail_width(256) == 256
+    assert store.thumbnail_width(2000) is None
+
+
+def test_converted_html_references_image_url(client, doc_server):
+    image = make_png()
+    fileurl = doc_server.add('images.docx', _document_with_images(image))
+    html = client.post('/convert', json={'fileurl': fileurl}).get_json()['data'][0]
+    url = f'/images/{hashlib.sha256(image).hexdigest()}.png'
+    assert f'<img src="{url}"' in html
+    assert 'base64' not in html
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == image
+    assert 'immutable' in response.headers['Cache-Control']
+    # 原图不大于缩略图宽度（或未安装Pillow）时返回原图
+    assert client.get(url + '?w=128').data == image
+
+    no_images = client.post('/convert', json={'fileurl': fileurl, 'images': False}).get_json()['data'][0]
+    assert '<img' not in no_images
+
+
+def test_convert_document_without_image_store_omits_images():
+    doc = load_word_document(_document_with_images(make_png()))
+    assert '<img' not in convert_document(doc, 10000)['html']
+
+
+def test_images_written_by_another_process_are_discovered(tmp_path):
+    reader = ImageStore(str(tmp_path))
+    writer = ImageStore(str(tmp_path))
+    key = writer.add(make_png(), '.png')
+    meta = reader.get(key)
+    assert meta is not None and meta['size'] == len(make_png())
+
+
+def test_discover_only_accepts_content_keys(tmp_path):
+    store = ImageStore(str(tmp_path))
+    for name in ('.uploads.log', 'notes.txt', '..', 'A' * 64 + '.png'):
+        path = store.path_for(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if name != '..':
+            with open(path, 'wb') as f:
+                f.write(b'data')
+        assert store.get(name) is None
+
+    # 与内容键同名的目录不是图片
+    directory_key = hashlib.sha256(b'dir').hexdigest() + '.png'
+    os.makedirs(store.path_for(directory_key))
+    assert store.get(directory_key) is None
+    assert store.stats()['file_count'] == 0
+
+
+def test_image_route_rejects_non_content_names(client):
+    assert client.get('/images/.uploads.log').status_code == 404
+    assert client.get('/images/' + '0' * 64 + '.png').status_code == 404
@@ -0,0 +1,51 @@
+import pytest
+
+from word_to_html_converter import (convert_document, document_to_html_array, iter_html_offsets,
+                                    load_word_document, split_html_offsets)
+
+
+def test_lazy_offsets_match_full_split():
+    blocks = [f'<p>段落 {index} {"内容" * (index % 13)}</p>' for index in range(500)]
+    for max_length in (50, 300, 2000):
+        assert list(iter_html_offsets(iter(blocks), max_length)) == split_html_offsets('\n'.join(blocks), max_length)
+
+
+@pytest.mark.parametrize('split', ['default', 'anchored'])
+def test_max_fragments_returns_prefix(large_docx, split):
+    doc = load_word_document(large_docx)
+    full = convert_document(doc, 2000, split=split, hashes=True)
+    preview = convert_document(doc, 2000, split=split, hashes=True, max_fragments=3)
+    assert preview['offsets'] == full['offsets'][:3]
+    assert preview['fragment_hashes'] == full['fragment_hashes'][:3]
+    assert preview['truncated'] is True
+    assert len(preview['html']) < len(full['html'])
+
+    everything = convert_document(doc, 2000, split=split, max_fragments=len(full['offsets']))
+    assert everything['truncated'] is False
+    assert everything['html'] == full['html']
+
+
+def test_fragment_range(large_docx):
+    doc = load_word_document(large_docx)
+    full = convert_document(doc, 2000)
+    middle = convert_document(doc, 2000, fragment_range=(2, 4))
+    assert middle['offsets'] == full['offsets'][2:5]
+    assert middle['fragment_range'] == [2, 4]
+    assert middle['total_fragments'] is None
+
+
+def test_document_to_html_array_prefix(large_docx):
+    doc = load_word_document(large_docx)
+    assert document_to_html_array(doc, 2000, max_fragments=2) == document_to_html_array(doc, 2000)[:2]
+
+
+def test_preview_routes(client, doc_server, large_docx):
+    fileurl = doc_server.add('preview.docx', large_docx)
+    full = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 2000}).get_json()
+    preview = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 2000, 'preview': True}).get_json()
+    assert preview['data'] == full['data'][:1]
+    assert preview['truncated'] is True
+
+    plain = client.post('/convert-plain', json={'fileurl': fileurl, 'maxlength': 2000, 'max_fragments': 2}).get_json()
+    assert plain['total_fragments'] == 2 and plain['truncated'] is True
+    assert client.post('/convert', json={'fileurl': fileurl, 'max_fragments': 0}).status_code == 400
@@ -0,0 +1,51 @@
+import os
+import sys
+import argparse
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import load_test  # noqa: E402
+from load_test import ENDPOINTS, build_corpus, parse_weights, percentile, summarize  # noqa: E402
+
+
+def test_parse_weights():
+    assert parse_weights('convert=3, outline', ENDPOINTS) == {'convert': 3.0, 'outline': 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_weights('unknown=1', ENDPOINTS)
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1.0) == 100
+    assert percentile([], 0.5) == 0.0
+
+
+def test_summarize_groups_by_endpoint_and_size():
+    results = [('convert', 'small', 200, 0.1), ('convert', 'large', 200, 0.3),
+               ('outline', 'small', 503, 0.2), ('outline', 'small', 200, 0.4)]
+    report = summarize(results, elapsed=2.0)
+    assert report['overall']['requests'] == 4
+    assert report['overall']['throughput'] == 1.5
+    assert report['overall']['error_rate'] == 0.25
+    assert report['status'] == {'200': 3, '503': 1}
+    assert report['by_endpoint']['outline']['p50_ms'] == 200.0
+    assert report['by_size']['small']['requests'] == 3
+
+
+def test_corpus_is_deterministic(tmp_path, monkeypatch):
+    from docx import Document
+
+    monkeypatch.setattr(load_test, 'DOCUMENT_SIZES', {'small': 2, 'medium': 4})
+    corpora = []
+    for name in ('a', 'b'):
+        (tmp_path / name).mkdir()
+        corpora.append(build_corpus(str(tmp_path / name), variants=2, seed=7))
+    assert corpora[0] == corpora[1] == {'small': ['small-0.docx', 'small-1.docx'],
+                                        'medium': ['medium-0.docx', 'medium-1.docx']}
+    for name in corpora[0]['medium']:
+        first, second = ([p.text for p in Document(str(tmp_path / directory / name)).paragraphs]
+                         for directory in ('a', 'b'))
+        assert first == second
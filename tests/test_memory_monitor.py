@@ -0,0 +1,85 @@
+import pytest
+
+import memory_monitor
+from memory_monitor import MemoryMonitor
+
+
+@pytest.fixture
+def fake_rss(monkeypatch):
+    """可控的进程RSS"""
+    rss = {'value': 100 * 1024 * 1024}
+    monkeypatch.setattr(memory_monitor, 'current_rss', lambda: rss['value'])
+    return rss
+
+
+def _convert(monitor, rss, growth, sample_rss=True, document_xml_size=1000):
+    with monitor.track('doc', 500, document_xml_size, sample_rss=sample_rss) as record:
+        rss['value'] += growth
+        monitor._observe(record, rss['value'])
+        rss['value'] -= growth
+    return record
+
+
+def test_records_rss_growth(fake_rss):
+    monitor = MemoryMonitor(sample_interval=10)
+    record = _convert(monitor, fake_rss, 4096)
+    assert record.peak_rss_delta == 4096
+    recent = monitor.stats()['recent']
+    assert recent['peak_rss_delta_p50'] == 4096
+    assert recent['rss_per_xml_byte_p50'] == 4.1
+    assert recent['rss_samples'] == 1
+
+
+def test_outlier_over_absolute_limit(fake_rss):
+    monitor = MemoryMonitor(sample_interval=10, outlier_rss=1000)
+    _convert(monitor, fake_rss, 500)
+    _convert(monitor, fake_rss, 2000)
+    assert monitor.outliers == 1
+
+
+def test_pool_conversions_are_excluded_from_rss_stats(fake_rss):
+    monitor = MemoryMonitor(sample_interval=10, outlier_rss=1000, min_outlier_samples=1)
+    _convert(monitor, fake_rss, 100)
+    # Web进程的RSS在转换进程池转换期间的变化与该转换无关
+    pooled = _convert(monitor, fake_rss, 10 ** 9, sample_rss=False)
+    assert pooled.peak_rss_delta is None
+    assert 'peak_rss' not in pooled.to_dict() and 'peak_rss_delta' not in pooled.to_dict()
+    assert monitor.outliers == 0
+
+    recent = monitor.stats()['recent']
+    assert recent['count'] == 2
+    assert recent['rss_samples'] == 1
+    assert recent['peak_rss_delta_max'] == 100
+    assert recent['rss_per_xml_byte_p50'] == 0.1
+    assert recent['largest']['peak_rss_delta'] == 100
+
+
+def test_tag_document_counts(sample_docx):
+    from word_to_html_converter import load_word_document
+    monitor = MemoryMonitor(sample_interval=10)
+    with monitor.track('doc') as record:
+        monitor.tag_document(load_word_document(sample_docx))
+    assert (record.paragraphs, record.tables) == (12, 0)
+    assert record.error is None
+
+
+def test_errors_are_recorded():
+    monitor = MemoryMonitor(sample_interval=10)
+    with pytest.raises(ValueError):
+        with monitor.track('bad'):
+            raise ValueError('失败')
+    assert monitor.stats()['recent']['errors'] == 1
+
+
+def test_pool_mode_conversion_skips_rss(client, app_module, doc_server, sample_docx, monkeypatch):
+    monitor = MemoryMonitor(sample_interval=10)
+    monkeypatch.setattr(app_module, 'memory_monitor', monitor)
+    monkeypatch.setattr(app_module, 'use_conversion_pool', True)
+    monkeypatch.setattr(app_module, 'convert_in_pool',
+                        lambda content, maxlength, deadline=None, skip_inspection=False, **options:
+                        app_module.convert_document(app_module.load_word_document(content), maxlength, **options))
+    fileurl = doc_server.add('pooled.docx', sample_docx)
+    assert client.post('/convert', json={'fileurl': fileurl, 'maxlength': 2468}).status_code == 200
+    stats = monitor.stats()['recent']
+    assert stats['count'] == 1 and stats['rss_samples'] == 0
+    assert 'peak_rss' not in stats['largest']
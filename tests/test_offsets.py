@@ -0,0 +1,72 @@
+from word_to_html_converter import add_offset_overlap, split_html_content, split_html_offsets
+
+
+def _html(paragraphs=200):
+    return '\n'.join(f'<p style="margin: 0">段落 {index} 的内容</p>' for index in range(paragraphs))
+
+
+def test_offsets_match_fragments():
+    html = _html()
+    offsets = split_html_offsets(html, 500)
+    assert [html[start:end] for start, end in offsets] == split_html_content(html, 500)
+    # 片段首尾相接，覆盖全部内容
+    assert offsets[0][0] == 0 and offsets[-1][1] == len(html)
+    assert all(previous[1] == current[0] for previous, current in zip(offsets, offsets[1:]))
+
+
+def test_overlap_extends_to_block_boundary():
+    html = _html()
+    offsets = split_html_offsets(html, 500)
+    windows = add_offset_overlap(html, offsets, 100)
+    assert windows[0] == offsets[0]
+    for (start, end), (window_start, window_end) in zip(offsets[1:], windows[1:]):
+        assert window_end == end
+        assert start - 100 <= window_start <= start
+        if window_start < start:
+            assert html[window_start - 1] == '\n'
+
+
+def test_zero_overlap_keeps_offsets():
+    html = _html()
+    offsets = split_html_offsets(html, 500)
+    assert add_offset_overlap(html, offsets, 0) == offsets
+
+
+def test_convert_offsets_mode(client, doc_server, large_docx):
+    fileurl = doc_server.add('offsets.docx', large_docx)
+    fragments = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 3000}).get_json()['data']
+    data = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 3000, 'mode': 'offsets'}).get_json()
+    assert data['success'] is True
+    assert [data['html'][start:end] for start, end in data['offsets']] == fragments
+
+    overlapped = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 3000, 'mode': 'offsets',
+                                               'overlap': 300}).get_json()
+    assert overlapped['total_fragments'] == data['total_fragments']
+    assert [end for _, end in overlapped['offsets']] == [end for _, end in data['offsets']]
+
+    response = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 3000, 'overlap': 3000})
+    assert response.status_code == 400
+
+
+def test_markdown_overlap_aligns_to_blank_line():
+    markdown = '段落一\n\n| 甲 | 乙 |\n| --- | --- |\n| 1 | 2 |\n\n段落二'
+    start = markdown.index('段落二')
+    offsets = [(0, start), (start, len(markdown))]
+    windows = add_offset_overlap(markdown, offsets, start, '\n\n', False)
+    assert markdown[windows[1][0]:].startswith('| 甲')
+    # 窗口范围内只有表格内部的单个换行时不延伸，不从表格中间开始
+    assert add_offset_overlap(markdown, offsets, 12, '\n\n', False) == offsets
+
+
+def test_markdown_overlap_windows_start_on_blocks():
+    from tests.conftest import make_docx
+    from word_to_html_converter import convert_document, load_word_document
+
+    doc = load_word_document(make_docx(sections=20, paragraphs=4, table_every=2))
+    result = convert_document(doc, 300, overlap=150, output_format='markdown')
+    content = result['html']
+    extended = [start for (start, _), (plain, _) in zip(result['offsets'], convert_document(
+        doc, 300, output_format='markdown')['offsets']) if start < plain]
+    assert extended
+    for start, _ in result['offsets'][1:]:
+        assert content[start - 2:start] == '\n\n' and content[start] != '\n'
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+from docx import Document
+
+from word_to_html_converter import (SelectionError, convert_document, document_outline, load_word_document,
+                                    resolve_selection)
+
+
+def _nested_document():
+    doc = Document()
+    doc.add_paragraph('前言')
+    doc.add_heading('概述', level=1)
+    doc.add_paragraph('概述内容')
+    doc.add_heading('背景', level=2)
+    doc.add_paragraph('背景内容')
+    doc.add_heading('方案', level=1)
+    doc.add_paragraph('方案内容')
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return load_word_document(buffer.getvalue())
+
+
+def test_outline_nests_headings_with_block_ranges():
+    outline = document_outline(_nested_document())
+    assert outline['heading_count'] == 3
+    assert outline['total_blocks'] == 7
+    overview, plan = outline['headings']
+    assert (overview['title'], overview['start_block'], overview['end_block']) == ('概述', 1, 5)
+    assert [(child['id'], child['start_block'], child['end_block']) for child in overview['children']] == [(1, 3, 5)]
+    assert (plan['id'], plan['start_block'], plan['end_block']) == (2, 5, 7)
+
+
+def test_resolve_selection_merges_ranges():
+    outline = document_outline(_nested_document())
+    assert resolve_selection(7, outline, sections=[' 背景 ', 0]) == [(1, 5)]
+    assert resolve_selection(7, outline, sections=[1], block_range=(5, 7)) == [(3, 7)]
+    with pytest.raises(SelectionError):
+        resolve_selection(7, outline, sections=['不存在'])
+    with pytest.raises(SelectionError):
+        resolve_selection(7, block_range=(3, 8))
+
+
+def test_partial_conversion_renders_only_selected_sections():
+    result = convert_document(_nested_document(), 10000, sections=['背景', '方案'])
+    assert result['selection'] == [(3, 7)]
+    assert '背景内容' in result['html'] and '方案内容' in result['html']
+    assert '概述内容' not in result['html'] and '前言' not in result['html']
+
+
+def test_outline_route_and_section_conversion(client, doc_server, sample_docx):
+    fileurl = doc_server.add('outline.docx', sample_docx)
+    outline = client.post('/outline', json={'fileurl': fileurl}).get_json()
+    assert outline['success'] is True
+    assert [heading['title'] for heading in outline['headings']] == ['第1章', '第2章', '第3章']
+
+    second = outline['headings'][1]
+    data = client.post('/convert', json={'fileurl': fileurl, 'sections': [second['id']]}).get_json()
+    assert data['selection'] == [[second['start_block'], second['end_block']]]
+    assert '第2章' in data['data'][0] and '第1章' not in data['data'][0]
+
+    response = client.post('/convert', json={'fileurl': fileurl, 'sections': ['不存在']})
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+import json
+
+from word_to_html_converter import (convert_document, iter_packed_offsets, load_word_document,
+                                    split_blocks_anchored, word_to_html_with_styles)
+
+
+def test_html_format_matches_html_renderer(sample_docx):
+    doc = load_word_document(sample_docx)
+    assert convert_document(doc, 10 ** 6)['html'] == word_to_html_with_styles(doc)
+
+
+def test_markdown_and_json_blocks(sample_docx):
+    doc = load_word_document(sample_docx)
+    markdown = convert_document(doc, 10 ** 6, output_format='markdown')['html']
+    assert '**加粗**' in markdown
+    assert markdown.split('\n\n')[0].startswith('#')
+
+    result = convert_document(doc, 10 ** 6, output_format='json')
+    blocks = [block for fragment in result['fragment_blocks'] for block in fragment]
+    assert blocks == [json.loads(line) for line in result['html'].split('\n')]
+    assert blocks[0]['heading'] == 1
+
+
+def test_packed_offsets_fill_fragments_on_block_boundaries():
+    blocks = [f'段落{index}' * (index % 5 + 1) for index in range(200)]
+    text = '\n\n'.join(blocks)
+    block_ends = {}
+    position = 0
+    for block in blocks:
+        block_ends[position] = position + len(block)
+        position += len(block) + 2
+
+    offsets = list(iter_packed_offsets(blocks, 100, '\n\n'))
+    assert offsets[0][0] == 0 and offsets[-1][1] == len(text)
+    for (start, end), (next_start, _) in zip(offsets, offsets[1:]):
+        assert end - start <= 100
+        assert next_start == end + 2
+        # 下一个块放不下才断开
+        assert block_ends[next_start] - start > 100
+
+
+def test_non_html_formats_use_packed_split_by_default(large_docx):
+    doc = load_word_document(large_docx)
+    for output_format in ('markdown', 'json'):
+        default = convert_document(doc, 1500, output_format=output_format)
+        anchored = convert_document(doc, 1500, output_format=output_format, split='anchored')
+        separator = '\n\n' if output_format == 'markdown' else '\n'
+        blocks = default['html'].split(separator)
+        assert default['offsets'] == list(iter_packed_offsets(blocks, 1500, separator))
+        assert anchored['offsets'] == split_blocks_anchored(blocks, 1500, separator=separator)
+        # 贪心打包得到的片段不多于锚定分割
+        assert len(default['offsets']) <= len(anchored['offsets'])
+
+
+def test_lazy_conversion_uses_same_split(large_docx):
+    doc = load_word_document(large_docx)
+    for output_format in ('markdown', 'json'):
+        for split in ('default', 'anchored'):
+            full = convert_document(doc, 1500, output_format=output_format, split=split)
+            preview = convert_document(doc, 1500, output_format=output_format, split=split, max_fragments=3)
+            assert preview['offsets'] == full['offsets'][:3]
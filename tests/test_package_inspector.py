@@ -0,0 +1,97 @@
+import io
+import zipfile
+
+import pytest
+
+import word_to_html_converter
+from config import PACKAGE_CONFIG
+from package_inspector import DocumentRejected, check_url_extension, inspect_package
+
+
+def _zip(parts, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _package(document_xml=b'<w:document/>', **extra):
+    return _zip(dict({'[Content_Types].xml': b'<Types/>', 'word/document.xml': document_xml}, **extra))
+
+
+def _limits(**overrides):
+    return dict(PACKAGE_CONFIG, **overrides)
+
+
+def test_accepts_docx_from_bytes_and_path(sample_docx, tmp_path):
+    info = inspect_package(sample_docx, PACKAGE_CONFIG)
+    assert info['compressed_size'] == len(sample_docx)
+    assert 0 < info['document_xml_size'] < info['uncompressed_size']
+    path = tmp_path / 'a.docx'
+    path.write_bytes(sample_docx)
+    assert inspect_package(str(path), PACKAGE_CONFIG) == info
+
+
+@pytest.mark.parametrize('content, message', [
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\x00' * 100, '旧版Word'),
+    (b'not a zip file', '不是有效的Word文档'),
+    (b'PK\x03\x04' + b'\x00' * 100, '已损坏'),
+    (_zip({'word/document.xml': b'<w:document/>'}), '缺少部件'),
+])
+def test_rejects_invalid_packages(content, message):
+    with pytest.raises(DocumentRejected, match=message):
+        inspect_package(content, PACKAGE_CONFIG)
+
+
+def test_rejects_packages_over_limits():
+    with pytest.raises(DocumentRejected, match='部件过多'):
+        inspect_package(_package(**{'a': b'', 'b': b''}), _limits(max_entries=3))
+    with pytest.raises(DocumentRejected, match='文档正文过大'):
+        inspect_package(_package(b'x' * 2000), _limits(max_document_xml_size=1000))
+    with pytest.raises(DocumentRejected, match='解压后过大'):
+        inspect_package(_package(**{'word/media/a.png': b'x' * 2000}), _limits(max_part_size=1000))
+    with pytest.raises(DocumentRejected, match='总大小过大'):
+        inspect_package(_package(b'x' * 600, **{'b': b'y' * 600}), _limits(max_uncompressed_size=1000))
+
+
+def test_rejects_zip_bomb_ratio():
+    bomb = _package(**{'word/media/bomb.bin': b'\x00' * (2 * 1024 * 1024)})
+    with pytest.raises(DocumentRejected, match='压缩比异常'):
+        inspect_package(bomb, PACKAGE_CONFIG)
+    # 不超过 ratio_min_size 的部件不检查压缩比
+    inspect_package(bomb, _limits(ratio_min_size=4 * 1024 * 1024))
+
+
+def test_rejects_doc_url_before_download():
+    with pytest.raises(DocumentRejected):
+        check_url_extension('https://example.com/files/报告.DOC?sig=1')
+    check_url_extension('https://example.com/files/报告.docx')
+
+
+def test_load_word_document_inspects_unless_skipped(sample_docx):
+    with pytest.raises(DocumentRejected):
+        word_to_html_converter.load_word_document(b'not a zip file')
+    assert word_to_html_converter.load_word_document(sample_docx, skip_inspection=True).paragraphs
+
+
+def test_conversion_inspects_package_once(client, app_module, doc_server, sample_docx, monkeypatch):
+    calls = []
+
+    def counting_inspect(source, limits):
+        calls.append(len(source))
+        return inspect_package(source, limits)
+
+    monkeypatch.setattr(app_module, 'inspect_package', counting_inspect)
+    monkeypatch.setattr(word_to_html_converter, 'inspect_package', counting_inspect)
+    fileurl = doc_server.add('inspected-once.docx', sample_docx)
+    response = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 4321})
+    assert response.status_code == 200
+    assert calls == [len(sample_docx)]
+
+
+def test_rejected_document_returns_400(client, doc_server):
+    fileurl = doc_server.add('legacy.docx', b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\x00' * 100)
+    response = client.post('/convert', json={'fileurl': fileurl})
+    assert response.status_code == 400
+    assert '旧版Word' in response.get_json()['error']
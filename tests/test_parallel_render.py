@@ -0,0 +1,30 @@
+import pytest
+
+import parallel_render
+from config import PARALLEL_CONFIG
+from parallel_render import partition, render_blocks_parallel
+from word_to_html_converter import get_document_elements_in_order, load_word_document, render_blocks
+
+
+def test_partition_keeps_order_and_chunk_count():
+    items = [('paragraph', b'x' * size) for size in (5, 1, 1, 1, 8, 2, 2, 3)]
+    chunks = partition(items, 3)
+    assert len(chunks) <= 3
+    assert [item for chunk in chunks for item in chunk] == items
+
+
+@pytest.fixture
+def parallel_pool(monkeypatch):
+    monkeypatch.setitem(PARALLEL_CONFIG, 'min_blocks', 1)
+    monkeypatch.setitem(PARALLEL_CONFIG, 'workers', 2)
+    parallel_render.shutdown_executor()
+    yield
+    parallel_render.shutdown_executor()
+
+
+@pytest.mark.parametrize('output_format', ['html', 'markdown', 'json'])
+def test_parallel_render_matches_serial(parallel_pool, large_docx, output_format):
+    doc = load_word_document(large_docx)
+    elements = get_document_elements_in_order(doc)
+    serial = list(render_blocks(doc, output_format, None, elements))
+    assert render_blocks_parallel(doc, elements, output_format) == serial
@@ -0,0 +1,60 @@
+import time
+import threading
+
+from prefetch import Prefetcher
+
+
+class Rejected(Exception):
+    """模拟准入控制拒绝"""
+
+
+def wait_finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.finished is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job.status()
+
+
+def test_prefetch_converts_every_variant():
+    converted = []
+    prefetcher = Prefetcher(lambda url, variant: converted.append((url, variant['maxlength'])), rate=0, nice=0)
+    status = wait_finished(prefetcher.submit(['a', 'b'], [{'maxlength': 100}, {'maxlength': 200}]))
+    assert status['status'] == 'finished' and status['completed'] == 2
+    assert converted == [('a', 100), ('a', 200), ('b', 100), ('b', 200)]
+
+
+def test_retried_document_goes_to_tail_and_gives_up():
+    calls = []
+    lock = threading.Lock()
+
+    def convert(url, variant):
+        with lock:
+            calls.append(url)
+        if url == 'busy':
+            raise Rejected('服务繁忙')
+
+    prefetcher = Prefetcher(convert, rate=0, busy_wait=0, retry_exceptions=(Rejected,), max_attempts=3, nice=0)
+    status = wait_finished(prefetcher.submit(['busy', 'a', 'b'], [{}]))
+    # 重试的文档放回队尾，不阻塞后面的文档
+    assert calls == ['busy', 'a', 'b', 'busy', 'busy']
+    assert status['status'] == 'finished'
+    assert (status['completed'], status['failed'], status['pending']) == (2, 1, 0)
+    assert status['errors'][0]['url'] == 'busy' and '3' in status['errors'][0]['error']
+    assert prefetcher.stats()['retried'] == 2
+
+
+def test_cancel_drops_pending_documents():
+    started = threading.Event()
+    release = threading.Event()
+
+    def convert(url, variant):
+        started.set()
+        release.wait(5)
+
+    prefetcher = Prefetcher(convert, rate=0, nice=0)
+    job = prefetcher.submit(['a', 'b', 'c'], [{}])
+    assert started.wait(5)
+    prefetcher.cancel(job.id)
+    release.set()
+    assert job.status()['status'] == 'cancelled'
+    assert prefetcher.stats()['pending'] == 0
@@ -0,0 +1,56 @@
+import gzip
+import zlib
+
+from werkzeug.datastructures import Accept, MIMEAccept
+
+from response_codec import (FRAMES_MIMETYPE, JSON_MIMETYPE, compress, decode_frames, encode_frames,
+                            encode_json, negotiate_encoding, negotiate_format)
+
+
+def test_frames_round_trip():
+    payload = {'success': True, 'data': ['<p>中文</p>', '', '<p>b</p>'], 'total_fragments': 3}
+    header, items = decode_frames(encode_frames(payload))
+    assert header == {'success': True, 'total_fragments': 3}
+    assert items == payload['data']
+
+
+def test_frames_encode_non_string_items_as_json():
+    _, items = decode_frames(encode_frames({'data': [{'type': 'p', 'text': '块'}]}))
+    assert items == ['{"type":"p","text":"块"}']
+
+
+def test_json_keeps_non_ascii():
+    assert encode_json({'a': '中文'}) == '{"a":"中文"}'.encode('utf-8')
+
+
+def test_negotiate_format():
+    assert negotiate_format(MIMEAccept([('*/*', 1)])) == JSON_MIMETYPE
+    assert negotiate_format(MIMEAccept([])) == JSON_MIMETYPE
+    assert negotiate_format(MIMEAccept([(FRAMES_MIMETYPE, 1), (JSON_MIMETYPE, 0.5)])) == FRAMES_MIMETYPE
+
+
+def test_negotiate_encoding_prefers_quality():
+    assert negotiate_encoding(Accept([])) is None
+    assert negotiate_encoding(Accept([('deflate', 1), ('gzip', 0.5)])) == 'deflate'
+    assert negotiate_encoding(Accept([('gzip', 0)])) is None
+
+
+def test_compress_round_trip():
+    body = '片段'.encode('utf-8') * 100
+    assert gzip.decompress(compress(body, 'gzip')) == body
+    assert zlib.decompress(compress(body, 'deflate')) == body
+    assert compress(body, 'identity') is body
+
+
+def test_convert_negotiates_frames_and_gzip(client, doc_server, large_docx):
+    fileurl = doc_server.add('codec.docx', large_docx)
+    response = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 2000},
+                           headers={'Accept': FRAMES_MIMETYPE, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    header, items = decode_frames(gzip.decompress(response.data))
+    assert header['success'] is True
+    assert header['total_fragments'] == len(items) > 1
+
+    plain = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 2000}).get_json()
+    assert plain['data'] == items
@@ -0,0 +1,84 @@
+import os
+import time
+
+from result_cache import MemoryCache, ResultCache, SQLiteCache
+
+
+def test_sqlite_evicts_least_recently_written_over_quota(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), max_size=1000, max_entry_size=400)
+    for key in 'abcd':
+        assert cache.set(key, os.urandom(300)) is True
+        time.sleep(0.01)
+    assert cache.get('a') is None
+    assert all(cache.get(key) is not None for key in 'bcd')
+    assert cache.stats()['size'] == 900
+
+
+def test_sqlite_rejects_oversized_entry(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), max_size=1000, max_entry_size=400)
+    assert cache.set('big', b'x' * 401) is False
+    assert cache.get('big') is None
+
+
+def test_sqlite_expired_entries(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), max_size=1000, ttl=60)
+    cache.set('a', b'value')
+    assert cache.get('a') == b'value'
+    assert cache.expire(now=time.time() + 61) == 1
+    assert cache.get('a') is None
+
+
+def test_results_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    writer = ResultCache(SQLiteCache(path, 10 ** 6))
+    reader = ResultCache(SQLiteCache(path, 10 ** 6))
+    writer.set('k', {'html': '<p>中文</p>', 'offsets': [(0, 9)]})
+
+    # 元组经JSON编码后变为列表
+    assert reader.get('k') == {'html': '<p>中文</p>', 'offsets': [[0, 9]]}
+    assert reader.get('k') is reader.get('k')
+    stats = reader.stats()
+    assert (stats['shared_hits'], stats['hits'], stats['misses']) == (1, 2, 0)
+    assert reader.get('missing') is None
+
+
+def test_memory_backend_quota():
+    cache = ResultCache(MemoryCache(1000, max_entry_size=400), memory_entries=0)
+    for key in 'abcd':
+        cache.set(key, {'data': key * 300})
+    assert cache.backend.stats()['size'] <= 1000
+    assert cache.get('d') == {'data': 'd' * 300}
+
+
+def test_convert_result_served_from_cache(client, app_module, doc_server, sample_docx):
+    fileurl = doc_server.add('cached.docx', sample_docx)
+    first = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 777}).get_json()
+    hits = app_module.result_cache.stats()['hits']
+    second = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 777}).get_json()
+    assert second == first
+    assert app_module.result_cache.stats()['hits'] == hits + 1
+
+
+def test_sqlite_total_size_tracked_incrementally(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SQLiteCache(path, max_size=10000, ttl=60)
+    cache.set('a', b'x' * 100)
+    cache.set('a', b'x' * 40)  # 覆盖写入
+    cache.set('b', b'x' * 200)
+    cache.delete('b')
+    cache.set('c', b'x' * 10)
+    assert cache.stats()['size'] == 50
+    cache.expire(now=time.time() + 61)
+    assert cache.stats()['size'] == 0
+
+    # 其他进程打开同一数据库时沿用已有的总大小
+    cache.set('d', b'x' * 30)
+    assert SQLiteCache(path, max_size=10000).stats()['size'] == 30
+
+    # 写入时不再对整个表求和
+    statements = []
+    conn = cache._connection()
+    conn.set_trace_callback(statements.append)
+    cache.set('e', b'x' * 30)
+    conn.set_trace_callback(None)
+    assert not any('SUM(' in statement for statement in statements)
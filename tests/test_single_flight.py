@@ -0,0 +1,109 @@
+import time
+import threading
+
+import pytest
+
+from single_flight import SingleFlight, SingleFlightTimeout
+
+
+def _start_leader(flight, key, release, result='结果'):
+    """启动一个阻塞在release上的调用，返回线程和其返回值列表"""
+    started = threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def run():
+        try:
+            results.append(flight.do(key, slow))
+        except Exception as e:
+            results.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    started.wait(5)
+    return thread, results
+
+
+def _wait_in_background(flight, key, count, **kwargs):
+    results = []
+
+    def run():
+        try:
+            results.append(flight.do(key, lambda: pytest.fail('等待者不应执行函数'), **kwargs))
+        except Exception as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def _wait_for_waiters(flight, count):
+    for _ in range(500):
+        if flight.stats()['waiting'] == count:
+            return
+        time.sleep(0.01)
+    raise AssertionError('等待者未到达')
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('测试')
+    release = threading.Event()
+    leader, leader_results = _start_leader(flight, 'k', release)
+    waiters, results = _wait_in_background(flight, 'k', 4)
+    _wait_for_waiters(flight, 4)
+    release.set()
+    for thread in [leader] + waiters:
+        thread.join(5)
+
+    assert leader_results == [('结果', False)]
+    assert results == [('结果', True)] * 4
+    assert flight.stats() == {'in_flight': 0, 'waiting': 0, 'executed': 1, 'coalesced': 4}
+    # 完成后不缓存，再次调用重新执行
+    assert flight.do('k', lambda: '新结果') == ('新结果', False)
+
+
+def test_error_is_shared_with_waiters():
+    flight = SingleFlight()
+    release = threading.Event()
+    error = ValueError('失败')
+    leader, leader_results = _start_leader(flight, 'k', release, result=error)
+    waiters, results = _wait_in_background(flight, 'k', 2)
+    _wait_for_waiters(flight, 2)
+    release.set()
+    for thread in [leader] + waiters:
+        thread.join(5)
+    assert leader_results == [error]
+    assert results == [error, error]
+
+
+def test_waiter_timeout_does_not_affect_leader():
+    flight = SingleFlight('转换')
+    release = threading.Event()
+    leader, leader_results = _start_leader(flight, 'k', release)
+    with pytest.raises(SingleFlightTimeout):
+        flight.do('k', lambda: None, timeout=0.05)
+    release.set()
+    leader.join(5)
+    assert leader_results == [('结果', False)]
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('b', lambda: 2) == (2, False)
+
+
+def test_outline_route_returns_headings(client, doc_server, sample_docx):
+    # /outline 的视图函数曾与 document_outline 同名，调用时递归进入视图返回500
+    fileurl = doc_server.add('coalesced-outline.docx', sample_docx)
+    response = client.post('/outline', json={'fileurl': fileurl})
+    assert response.status_code == 200
+    assert response.get_json()['heading_count'] == 3
@@ -0,0 +1,59 @@
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+from docx.shared import Pt, RGBColor
+
+from style_resolver import StyleResolver
+from word_to_html_converter import get_paragraph_style
+
+
+def _styled_document():
+    doc = Document()
+    base = doc.styles.add_style('Base Emphasis', WD_STYLE_TYPE.CHARACTER)
+    base.font.bold = True
+    base.font.size = Pt(14)
+    child = doc.styles.add_style('Child Emphasis', WD_STYLE_TYPE.CHARACTER)
+    child.base_style = base
+    child.font.color.rgb = RGBColor(0xAA, 0x00, 0x00)
+    child.font.size = Pt(16)
+    return doc
+
+
+def test_character_style_inherits_based_on_chain():
+    doc = _styled_document()
+    paragraph = doc.add_paragraph()
+    run = paragraph.add_run('文本', style='Child Emphasis')
+    resolver = StyleResolver.for_document(doc)
+    assert resolver.run_style(run) == {'font-weight': 'bold', 'font-size': '16.0pt', 'color': '#aa0000'}
+
+
+def test_direct_formatting_overrides_style():
+    doc = _styled_document()
+    run = doc.add_paragraph().add_run('文本', style='Child Emphasis')
+    run.bold = False
+    run.italic = True
+    assert StyleResolver.for_document(doc).run_style(run) == {
+        'font-style': 'italic', 'font-size': '16.0pt', 'color': '#aa0000'}
+
+
+def test_plain_run_has_no_style():
+    doc = Document()
+    run = doc.add_paragraph().add_run('正文')
+    assert StyleResolver.for_document(doc).run_style(run) == {}
+
+
+def test_based_on_cycle_is_ignored():
+    doc = _styled_document()
+    base = doc.styles['Base Emphasis'].element
+    based_on = base.makeelement(qn('w:basedOn'), {qn('w:val'): doc.styles['Child Emphasis'].style_id})
+    base.insert(0, based_on)
+    run = doc.add_paragraph().add_run('文本', style='Base Emphasis')
+    assert StyleResolver.for_document(doc).run_style(run)['font-weight'] == 'bold'
+
+
+def test_paragraph_style_name_matches_python_docx():
+    doc = Document()
+    paragraphs = [doc.add_heading('标题', 1), doc.add_paragraph('正文'), doc.add_paragraph('引用', style='Quote')]
+    resolver = StyleResolver.for_document(doc)
+    for paragraph in paragraphs:
+        assert get_paragraph_style(paragraph, resolver) == get_paragraph_style(paragraph)
@@ -0,0 +1,75 @@
+import io
+import hashlib
+
+from upload_store import UploadStore
+
+
+def test_put_content_deduplicates_by_hash(tmp_path):
+    store = UploadStore(str(tmp_path))
+    first, duplicate = store.put_content(io.BytesIO(b'same'), '.DOCX')
+    assert duplicate is False
+    assert first['key'] == hashlib.sha256(b'same').hexdigest() + '.docx'
+    second, duplicate = store.put_content(io.BytesIO(b'same'), '.docx')
+    assert duplicate is True
+    assert second['key'] == first['key']
+    assert store.stats()['file_count'] == 1
+    # 重复写入的临时文件已删除
+    assert [p.name for p in tmp_path.iterdir() if p.is_file()] == []
+
+
+def test_upload_ids_survive_restart(tmp_path):
+    store = UploadStore(str(tmp_path))
+    meta, _ = store.put_content(io.BytesIO(b'content'), '.docx')
+    first = store.register_upload(meta['key'], 'a\tb.docx')
+    second = store.register_upload(meta['key'], 'c.docx')
+    assert first != second
+    assert store.resolve_upload(first) == (meta['key'], 'a b.docx')
+
+    reloaded = UploadStore(str(tmp_path))
+    assert reloaded.resolve_upload(second) == (meta['key'], 'c.docx')
+    assert reloaded.resolve_upload('unknown') is None
+
+
+def test_upload_id_dropped_when_content_removed(tmp_path):
+    store = UploadStore(str(tmp_path))
+    meta, _ = store.put_content(io.BytesIO(b'content'), '.docx')
+    upload_id = store.register_upload(meta['key'], 'a.docx')
+    store.remove(meta['key'])
+    assert store.resolve_upload(upload_id) is None
+
+
+def test_upload_route_serves_file_by_upload_id(client, sample_docx):
+    response = client.post('/upload', data={'file': (io.BytesIO(sample_docx), '报告.docx')})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['content_hash'] == hashlib.sha256(sample_docx).hexdigest()
+    assert data['fileUrl'].endswith(f"/{data['upload_id']}.docx")
+
+    again = client.post('/upload', data={'file': (io.BytesIO(sample_docx), '副本.docx')}).get_json()
+    assert again['deduplicated'] is True
+    assert again['upload_id'] != data['upload_id']
+
+    download = client.get(f"/uploads/{data['upload_id']}.docx")
+    assert download.status_code == 200
+    assert download.data == sample_docx
+    assert client.get('/uploads/nothing.docx').status_code == 404
+
+
+def test_uploads_written_by_another_process_are_resolved(tmp_path):
+    reader = UploadStore(str(tmp_path))
+    writer = UploadStore(str(tmp_path))
+    meta, _ = writer.put_content(io.BytesIO(b'other worker'), '.docx')
+    upload_id = writer.register_upload(meta['key'], 'other.docx')
+
+    assert reader.get(meta['key'])['hash'] == hashlib.sha256(b'other worker').hexdigest()
+    assert reader.resolve_upload(upload_id) == (meta['key'], 'other.docx')
+
+    # 另一个进程启动时压缩（替换）了日志，之后追加的条目仍能读到
+    restarted = UploadStore(str(tmp_path))
+    later = restarted.register_upload(meta['key'], 'later.docx')
+    assert reader.resolve_upload(later) == (meta['key'], 'later.docx')
+
+    writer.remove(meta['key'])
+    reader.remove(meta['key'])
+    assert reader.resolve_upload(upload_id) is None
+    assert reader.get(meta['key']) is None
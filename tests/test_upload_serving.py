@@ -0,0 +1,33 @@
+import io
+import hashlib
+
+
+def _upload(client, content):
+    return client.post('/upload', data={'file': (io.BytesIO(content), 'a.docx')}).get_json()
+
+
+def test_strong_etag_and_conditional_get(client, sample_docx):
+    url = f"/uploads/{_upload(client, sample_docx)['upload_id']}.docx"
+    response = client.get(url)
+    etag = hashlib.sha256(sample_docx).hexdigest()
+    assert response.headers['ETag'] == f'"{etag}"'
+    assert 'immutable' in response.headers['Cache-Control']
+
+    cached = client.get(url, headers={'If-None-Match': f'"{etag}"'})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+
+def test_range_request(client, sample_docx):
+    url = f"/uploads/{_upload(client, sample_docx)['upload_id']}.docx"
+    response = client.get(url, headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == sample_docx[10:20]
+    assert response.headers['Content-Range'] == f'bytes 10-19/{len(sample_docx)}'
+
+
+def test_if_range_with_stale_etag_returns_full_body(client, sample_docx):
+    url = f"/uploads/{_upload(client, sample_docx)['upload_id']}.docx"
+    response = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert response.status_code == 200
+    assert response.data == sample_docx
@@ -0,0 +1,118 @@
+import io
+import os
+import time
+import hashlib
+import threading
+
+from upload_store import UploadStore
+
+
+def test_put_and_get(tmp_path):
+    store = UploadStore(str(tmp_path))
+    meta = store.put('a.docx', io.BytesIO(b'hello'))
+    assert meta['size'] == 5
+    assert os.path.dirname(meta['path']) == store.shard_dir('a.docx')
+    assert store.get('a.docx')['hash'] == meta['hash']
+    assert store.get('missing') is None
+
+
+def test_quota_evicts_least_recently_used(tmp_path):
+    store = UploadStore(str(tmp_path), max_total_size=10)
+    store.put('a', io.BytesIO(b'1234'))
+    store.put('b', io.BytesIO(b'1234'))
+    store.get('a')  # a最近访问过，b成为最久未访问的文件
+    store.put('c', io.BytesIO(b'1234'))
+    assert store.get('a') is not None
+    assert store.get('b') is None
+    assert store.get('c') is not None
+    assert store.stats()['total_size'] == 8
+
+
+def test_quota_keeps_new_file_larger_than_quota(tmp_path):
+    store = UploadStore(str(tmp_path), max_total_size=4)
+    store.put('a', io.BytesIO(b'12'))
+    store.put('big', io.BytesIO(b'123456'))
+    assert store.get('a') is None
+    assert store.get('big') is not None
+
+
+def test_expire_pops_only_due_entries(tmp_path):
+    store = UploadStore(str(tmp_path), retention_seconds=100)
+    meta = store.put('a', io.BytesIO(b'x'))
+    assert store.expire(now=meta['mtime'] + 50) == (0, 0)
+    assert store.next_expiry() == meta['mtime'] + 100
+    assert store.expire(now=meta['mtime'] + 101) == (1, 1)
+    assert store.get('a') is None
+    assert not os.path.exists(meta['path'])
+
+
+def test_expire_ignores_stale_heap_entry_after_overwrite(tmp_path):
+    store = UploadStore(str(tmp_path), retention_seconds=100)
+    old = store.put('a', io.BytesIO(b'x'))
+    os.utime(store.path_for('a'), (old['mtime'] + 60, old['mtime'] + 60))
+    store.load_index()
+    # 重新加载后旧的到期时间已不在堆中；按新修改时间计算
+    assert store.expire(now=old['mtime'] + 101) == (0, 0)
+    assert store.expire(now=old['mtime'] + 161) == (1, 1)
+
+
+def test_load_index_migrates_flat_files_into_shards(tmp_path):
+    (tmp_path / 'legacy.docx').write_bytes(b'old')
+    (tmp_path / '.tmp-leftover').write_bytes(b'partial')
+    store = UploadStore(str(tmp_path))
+    meta = store.get('legacy.docx')
+    assert meta['path'] == store.path_for('legacy.docx')
+    assert os.path.exists(meta['path'])
+    assert not (tmp_path / 'legacy.docx').exists()
+    assert not (tmp_path / '.tmp-leftover').exists()
+
+
+def test_wait_for_change(tmp_path):
+    store = UploadStore(str(tmp_path))
+    store.wait_for_change(0)
+    start = time.time()
+    assert store.wait_for_change(0.05) is False
+    assert time.time() - start >= 0.04
+    store.put('a', io.BytesIO(b'x'))
+    assert store.wait_for_change(0) is True
+
+
+def test_lazy_hash_does_not_hold_lock(tmp_path, monkeypatch):
+    (tmp_path / 'legacy.docx').write_bytes(b'legacy')
+    store = UploadStore(str(tmp_path))
+    hashing = threading.Event()
+    release = threading.Event()
+    original = UploadStore._hash_file
+
+    def slow_hash(path):
+        hashing.set()
+        release.wait(5)
+        return original(path)
+
+    monkeypatch.setattr(UploadStore, '_hash_file', staticmethod(slow_hash))
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(store.get('legacy.docx')))
+    thread.start()
+    assert hashing.wait(5)
+    # 哈希计算期间其他操作不被阻塞
+    acquired = store._lock.acquire(timeout=1)
+    assert acquired
+    store._lock.release()
+    assert store.put('other.docx', io.BytesIO(b'other'))['size'] == 5
+    release.set()
+    thread.join(5)
+    assert result['hash'] == hashlib.sha256(b'legacy').hexdigest()
+    assert store._index['legacy.docx']['hash'] == result['hash']
+
+
+def test_expiry_heap_does_not_accumulate_stale_entries(tmp_path):
+    store = UploadStore(str(tmp_path), retention_seconds=3600)
+    meta, _ = store.put_content(io.BytesIO(b'popular'), '.docx')
+    store.put_content(io.BytesIO(b'other'), '.docx')
+    for _ in range(100):
+        store.put_content(io.BytesIO(b'popular'), '.docx')
+    assert len(store._expiry_heap) <= 2 * store.stats()['file_count']
+    # 重建后仍按最新的修改时间过期
+    assert store.expire(now=time.time() + 1800) == (0, 0)
+    assert store.expire(now=os.stat(meta['path']).st_mtime + 3601)[0] == 2
+    assert store.stats()['file_count'] == 0
@@ -0,0 +1,46 @@
+from tests.conftest import make_docx
+from version_store import LRUCache, VersionStore
+from word_to_html_converter import convert_document, load_word_document
+
+
+def test_lru_cache_limits_entries_and_weight():
+    cache = LRUCache(3, max_weight=10, weigher=len)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'xxxx')
+    cache.get('a')
+    cache.set('c', 'xxxx')
+    # 总权重超过10，淘汰最久未使用的b
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    cache.set('big', 'x' * 11)
+    assert 'big' not in cache
+    assert cache.stats()['weight'] == 8
+
+
+def test_incremental_conversion_reuses_unchanged_blocks():
+    original = load_word_document(make_docx(sections=10))
+    first = convert_document(original, 2000, hashes=True, track_sources=True)
+    store = VersionStore()
+    store.save('v1', first['source_hashes'], first['block_html'], first['fragment_hashes'])
+
+    edited = load_word_document(make_docx(sections=10, text='修改后的段落'))
+    second = convert_document(edited, 2000, hashes=True, track_sources=True,
+                              previous_blocks=VersionStore.reusable_blocks(store.get('v1')))
+    # 标题块未变，直接复用；段落块重新渲染
+    assert second['reused_blocks'] == 10
+    assert second['rendered_blocks'] == len(second['source_hashes']) - 10
+    assert second['html'] == convert_document(edited, 2000)['html']
+
+
+def test_convert_reports_changed_fragments(client, doc_server):
+    fileurl = doc_server.add('versioned.docx', make_docx(sections=30))
+    first = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 2000, 'split': 'anchored',
+                                          'incremental': True}).get_json()
+    assert first['previous_version_found'] is False
+    assert first['reused_blocks'] == 0 and first['rendered_blocks'] > 0
+
+    again = client.post('/convert', json={'fileurl': fileurl, 'maxlength': 2000, 'split': 'anchored',
+                                          'previous_version': first['version_id']}).get_json()
+    assert again['version_id'] == first['version_id']
+    assert again['previous_version_found'] is True
+    assert again['rendered_blocks'] == 0
+    assert again['changed_fragments'] == []
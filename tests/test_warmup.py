@@ -0,0 +1,42 @@
+import sys
+
+import warmup
+from warmup import PRELOAD_MODULES, WarmUp, build_sample_docx, warm_up
+from word_to_html_converter import document_outline, load_word_document
+
+
+def test_sample_document_is_valid():
+    doc = load_word_document(build_sample_docx())
+    assert document_outline(doc)['heading_count'] == 1
+    assert len(doc.tables) == 1
+
+
+def test_warm_up_preloads_modules():
+    assert warm_up() > 0
+    assert all(name in sys.modules for name in PRELOAD_MODULES)
+
+
+def test_ready_after_warm_up():
+    state = WarmUp()
+    assert not state.ready
+    assert state.status() == {'ready': False, 'warmup_time': None}
+    state.run()
+    assert state.ready
+    assert state.status()['warmup_time'] >= 0
+
+
+def test_failed_warm_up_stays_not_ready(monkeypatch):
+    monkeypatch.setattr(warmup, 'PRELOAD_MODULES', ('module_that_does_not_exist',))
+    state = WarmUp()
+    state.run()
+    assert state.wait(0)
+    assert not state.ready
+    assert 'module_that_does_not_exist' in state.status()['error']
+
+
+def test_ready_route(client, app_module, monkeypatch):
+    assert client.get('/ready').status_code == 200
+    monkeypatch.setattr(app_module, 'warmup', WarmUp())
+    response = client.get('/ready')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'starting'
@@ -0,0 +1,469 @@
+"""上传文件存储：元数据索引、分片目录、容量配额（LRU淘汰）和基于最小堆的过期清理"""
+import os
+import re
+import time
+import heapq
+import hashlib
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from stat import S_ISREG
+
+# 写入时的读取块大小
+CHUNK_SIZE = 64 * 1024
+
+# 临时文件前缀，索引加载时会跳过并清除
+TEMP_PREFIX = '.tmp-'
+
+# 内容键：<SHA-256十六进制><扩展名>，图片缩略图为 <SHA-256十六进制>.w<宽度><扩展名>
+CONTENT_KEY_PATTERN = re.compile(r'[0-9a-f]{64}(?:\.w[0-9]+)?(?:\.[0-9a-z]+)?')
+
+# 上传ID映射日志文件名（每行: 上传ID\t内容键\t原始文件名）
+UPLOAD_LOG_NAME = '.uploads.log'
+
+
+class UploadStore:
+    """上传文件存储
+
+    - 元数据索引：每个文件记录大小、修改时间、内容哈希和最后访问时间，
+      索引只在启动时通过一次 os.scandir 建立，之后随写入/删除增量维护
+    - 分片目录：文件按键名哈希分布到 <root>/ab/cd/ 子目录，避免单目录文件过多
+    - 容量配额：写入后总大小超过配额时按最后访问时间（LRU）淘汰旧文件
+    - 过期清理：按 修改时间+保留时长 放入最小堆，只弹出已到期的条目，无需全目录扫描
+      （被刷新或删除的文件留下的旧条目多于有效条目时重建堆）
+    - 内容寻址：上传内容按SHA-256存储为 <哈希><扩展名>，相同内容只保存一份，
+      每次上传分配独立的上传ID映射到内容键，互不覆盖
+    - 多进程共用目录：索引中没有的内容键按需在磁盘上发现（discover），未知的上传ID重新读取映射日志
+    """
+
+    def __init__(self, root, max_total_size=None, retention_seconds=None, shard_depth=2):
+        self.root = root
+        self.max_total_size = max_total_size
+        self.retention_seconds = retention_seconds
+        self.shard_depth = shard_depth
+
+        self._lock = threading.RLock()
+        self._changed = threading.Event()
+        # key -> 元数据；顺序即LRU顺序（最近访问的在末尾）
+        self._index = OrderedDict()
+        # (过期时间, key, 修改时间)；修改时间用于识别被覆盖后遗留的旧堆条目
+        self._expiry_heap = []
+        self._total_size = 0
+        # 上传ID -> (内容键, 原始文件名)
+        self._uploads = {}
+        # 已读取的上传ID映射日志位置 (inode, 偏移)，用于读取其他进程追加的条目
+        self._upload_log_position = (None, 0)
+
+        os.makedirs(self.root, exist_ok=True)
+        self.load_index()
+        self._load_uploads()
+
+    # ---- 路径 ----
+
+    def shard_dir(self, key):
+        """返回键对应的分片目录"""
+        digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+        parts = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, *parts)
+
+    def path_for(self, key):
+        """返回键对应的存储路径（不检查是否存在）"""
+        return os.path.join(self.shard_dir(key), key)
+
+    # ---- 索引 ----
+
+    def load_index(self):
+        """扫描存储目录建立索引（仅启动时执行一次）
+
+        根目录下的历史平铺文件会被迁移到对应的分片目录中。
+        """
+        with self._lock:
+            self._index.clear()
+            self._expiry_heap = []
+            self._total_size = 0
+
+            entries = []
+            self._scan(self.root, 0, entries)
+            for meta in entries:
+                target = self.path_for(meta['key'])
+                if meta['path'] != target:
+                    # 不在正确分片中的文件（如旧版本的平铺文件），迁移过去
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(meta['path'], target)
+                    meta['path'] = target
+            # 按最后访问时间排序，恢复LRU顺序
+            entries.sort(key=lambda meta: meta['last_access'])
+            for meta in entries:
+                self._add(meta)
+
+    def _scan(self, directory, depth, entries):
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    if entry.name.startswith(TEMP_PREFIX):
+                        # 上次写入中断遗留的临时文件
+                        try:
+                            os.remove(entry.path)
+                        except OSError:
+                            pass
+                    continue
+
+                if entry.is_dir(follow_symlinks=False):
+                    if depth < self.shard_depth:
+                        self._scan(entry.path, depth + 1, entries)
+                    continue
+
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+
+                stat = entry.stat()
+                entries.append({
+                    'key': entry.name,
+                    'path': entry.path,
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    # 哈希在需要时才计算，避免启动时读取全部文件
+                    'hash': None,
+                    'last_access': max(stat.st_atime, stat.st_mtime)
+                })
+
+    def _add(self, meta):
+        """将元数据加入索引和过期堆（调用方持有锁）"""
+        old = self._index.pop(meta['key'], None)
+        if old:
+            self._total_size -= old['size']
+        self._index[meta['key']] = meta
+        self._total_size += meta['size']
+        if self.retention_seconds is not None and (old is None or old['mtime'] != meta['mtime']):
+            heapq.heappush(self._expiry_heap,
+                           (meta['mtime'] + self.retention_seconds, meta['key'], meta['mtime']))
+            # 重复上传等刷新会留下旧堆条目，旧条目多于有效条目时重建堆
+            if len(self._expiry_heap) > 2 * len(self._index):
+                self._rebuild_expiry_heap()
+        self._changed.set()
+
+    def _rebuild_expiry_heap(self):
+        """按索引重建过期堆，丢弃所有旧条目（调用方持有锁）"""
+        self._expiry_heap = [(meta['mtime'] + self.retention_seconds, key, meta['mtime'])
+                             for key, meta in self._index.items()]
+        heapq.heapify(self._expiry_heap)
+
+    def _discard(self, key):
+        """从索引和磁盘删除文件（调用方持有锁），返回释放的字节数"""
+        meta = self._index.pop(key, None)
+        if not meta:
+            return 0
+        self._total_size -= meta['size']
+        try:
+            os.remove(meta['path'])
+        except FileNotFoundError:
+            pass
+        return meta['size']
+
+    # ---- 读写 ----
+
+    def _write_temp(self, stream, directory):
+        """将流写入临时文件，边写边计算SHA-256，返回 (临时路径, 哈希, 大小)"""
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, f'{TEMP_PREFIX}{uuid.uuid4().hex}')
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            self._remove_quietly(temp_path)
+            raise
+        return temp_path, hasher.hexdigest(), size
+
+    def _commit(self, key, target, content_hash, size):
+        """登记新写入的文件并按配额淘汰（调用方持有锁），返回元数据"""
+        meta = {
+            'key': key,
+            'path': target,
+            'size': size,
+            'mtime': os.stat(target).st_mtime,
+            'hash': content_hash,
+            'last_access': time.time()
+        }
+        self._add(meta)
+        self._evict_over_quota(protect=key)
+        return meta
+
+    def put(self, key, stream):
+        """将文件流以指定键写入存储，返回元数据
+
+        写入先落到同分片目录下的临时文件，完成后原子替换，
+        然后按配额淘汰最久未访问的文件。
+        """
+        target = self.path_for(key)
+        temp_path, content_hash, size = self._write_temp(stream, os.path.dirname(target))
+        try:
+            os.replace(temp_path, target)
+        except BaseException:
+            self._remove_quietly(temp_path)
+            raise
+        with self._lock:
+            return dict(self._commit(key, target, content_hash, size))
+
+    def put_content(self, stream, ext=''):
+        """按内容哈希写入存储，返回 (元数据, 是否为重复内容)
+
+        内容键为 <SHA-256><扩展名>；已存在相同内容时丢弃本次写入，只刷新其
+        修改时间（重新计算过期时间），不额外占用磁盘。
+        """
+        temp_path, content_hash, size = self._write_temp(stream, self.root)
+        return self.adopt_file(temp_path, ext, content_hash)
+
+    def adopt_file(self, path, ext='', content_hash=None):
+        """将存储目录内已写好的文件按内容哈希移入存储，返回 (元数据, 是否为重复内容)
+
+        文件会被移动（或在重复时删除），调用方不应再使用该路径。
+        """
+        if content_hash is None:
+            content_hash = self._hash_file(path)
+        size = os.path.getsize(path)
+        key = f'{content_hash}{ext.lower()}'
+        target = self.path_for(key)
+        try:
+            with self._lock:
+                meta = self._refresh(key)
+                if meta is not None:
+                    return meta, True
+
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(path, target)
+                return dict(self._commit(key, target, content_hash, size)), False
+        finally:
+            self._remove_quietly(path)
+
+    def _refresh(self, key):
+        """已存在的文件刷新修改时间（重新计算过期时间），返回元数据；不存在时返回None（调用方持有锁）"""
+        meta = self._index.get(key)
+        if meta is None or not os.path.exists(meta['path']):
+            return None
+        os.utime(meta['path'])
+        self._index.move_to_end(key)
+        return dict(self._commit(key, meta['path'], meta['hash'], meta['size']))
+
+    def refresh(self, key):
+        """刷新已存在文件的过期时间并返回元数据，不存在时返回None"""
+        with self._lock:
+            return self._refresh(key)
+
+    @staticmethod
+    def _remove_quietly(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def discover(self, key):
+        """将其他进程写入存储目录的文件加入索引并返回元数据，文件不存在时返回None
+
+        索引只在本进程内维护，多个进程共用同一目录时，其他进程新写入的文件需要这样按需发现。
+        key来自请求（如 /images/<name>），只接受内容键（见 CONTENT_KEY_PATTERN）对应的普通文件。
+        """
+        if not CONTENT_KEY_PATTERN.fullmatch(key):
+            return None
+        path = self.path_for(key)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not S_ISREG(stat.st_mode):
+            return None
+        with self._lock:
+            if key not in self._index:
+                self._add({
+                    'key': key,
+                    'path': path,
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'hash': None,
+                    'last_access': time.time()
+                })
+                self._evict_over_quota(protect=key)
+        return self._lookup(key)
+
+    def get(self, key, touch=True):
+        """返回键对应的元数据，不存在时返回None；touch为True时更新最后访问时间
+
+        索引中没有时在磁盘上查找（其他进程写入的文件，如转换进程池中的工作进程提取的图片）。
+        """
+        meta = self._lookup(key, touch)
+        if meta is None:
+            meta = self.discover(key)
+        return meta
+
+    def _lookup(self, key, touch=True):
+        """只在索引中查找，参数见get"""
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                return None
+            if touch:
+                meta['last_access'] = time.time()
+                self._index.move_to_end(key)
+            if meta['hash'] is not None:
+                return dict(meta)
+            result = dict(meta)
+
+        # 大文件的哈希计算较慢，不持有锁，避免阻塞其他写入、清理和读取
+        try:
+            result['hash'] = self._hash_file(result['path'])
+        except FileNotFoundError:
+            # 计算期间文件已被删除
+            return None
+        with self._lock:
+            # 计算期间条目可能已被替换，只更新同一个条目
+            if self._index.get(key) is meta:
+                meta['hash'] = result['hash']
+        return result
+
+    def remove(self, key):
+        """删除文件，返回释放的字节数"""
+        with self._lock:
+            return self._discard(key)
+
+    @staticmethod
+    def _hash_file(path):
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    # ---- 上传ID映射 ----
+
+    def _upload_log_path(self):
+        return os.path.join(self.root, UPLOAD_LOG_NAME)
+
+    def _load_uploads(self):
+        """读取上传ID映射日志，丢弃内容已不存在的条目并压缩日志"""
+        path = self._upload_log_path()
+        if not os.path.exists(path):
+            return
+        with self._lock:
+            self._read_upload_log()
+            self._uploads = {upload_id: entry for upload_id, entry in self._uploads.items()
+                             if entry[0] in self._index}
+            temp_path = f'{path}.compact'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for upload_id, (key, filename) in self._uploads.items():
+                    f.write(f'{upload_id}\t{key}\t{filename}\n')
+            os.replace(temp_path, path)
+            self._upload_log_position = (os.stat(path).st_ino, os.path.getsize(path))
+
+    def _read_upload_log(self):
+        """读取映射日志中上次读取之后追加的条目（调用方持有锁）
+
+        日志被其他进程启动时压缩（替换为新文件）后从头重新读取；末尾不完整的行留到下次读取。
+        """
+        try:
+            with open(self._upload_log_path(), 'rb') as f:
+                inode, offset = self._upload_log_position
+                if os.fstat(f.fileno()).st_ino != inode or os.fstat(f.fileno()).st_size < offset:
+                    offset = 0
+                f.seek(offset)
+                data = f.read()
+                inode = os.fstat(f.fileno()).st_ino
+        except FileNotFoundError:
+            return
+        complete = data.rfind(b'\n') + 1
+        for line in data[:complete].decode('utf-8').splitlines():
+            parts = line.split('\t')
+            if len(parts) == 3:
+                self._uploads[parts[0]] = (parts[1], parts[2])
+        self._upload_log_position = (inode, offset + complete)
+
+    def register_upload(self, key, filename):
+        """为已存储的内容分配上传ID，返回上传ID"""
+        upload_id = uuid.uuid4().hex
+        # 文件名中的制表符和换行会破坏日志格式
+        filename = filename.replace('\t', ' ').replace('\n', ' ').replace('\r', ' ')
+        with self._lock:
+            self._uploads[upload_id] = (key, filename)
+            with open(self._upload_log_path(), 'a', encoding='utf-8') as f:
+                f.write(f'{upload_id}\t{key}\t{filename}\n')
+        return upload_id
+
+    def resolve_upload(self, upload_id):
+        """根据上传ID返回 (内容键, 原始文件名)，不存在或内容已被清理时返回None
+
+        本进程中没有的上传ID可能由其他进程分配，重新读取映射日志后再查找。
+        """
+        with self._lock:
+            entry = self._uploads.get(upload_id)
+            if entry is None:
+                self._read_upload_log()
+                entry = self._uploads.get(upload_id)
+            if entry is None:
+                return None
+            if entry[0] in self._index:
+                return entry
+        if self.discover(entry[0]) is not None:
+            return entry
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+        return None
+
+    # ---- 淘汰与过期 ----
+
+    def _evict_over_quota(self, protect=None):
+        """总大小超过配额时按LRU顺序淘汰（调用方持有锁）"""
+        if self.max_total_size is None:
+            return
+        for key in list(self._index):
+            if self._total_size <= self.max_total_size:
+                break
+            if key == protect:
+                continue
+            freed = self._discard(key)
+            logging.info(f"上传目录超出配额，已淘汰文件: {key} (大小: {freed} bytes)")
+
+    def expire(self, now=None):
+        """删除所有已过期的文件，返回 (删除数量, 释放字节数)"""
+        if now is None:
+            now = time.time()
+        deleted_count = 0
+        total_size = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, key, mtime = heapq.heappop(self._expiry_heap)
+                meta = self._index.get(key)
+                # 已被删除或已被新内容覆盖的旧堆条目直接丢弃
+                if meta is None or meta['mtime'] != mtime:
+                    continue
+                freed = self._discard(key)
+                deleted_count += 1
+                total_size += freed
+        return deleted_count, total_size
+
+    def next_expiry(self):
+        """返回最早的过期时间，没有文件时返回None"""
+        with self._lock:
+            return self._expiry_heap[0][0] if self._expiry_heap else None
+
+    def wait_for_change(self, timeout):
+        """等待索引发生变化或超时，返回是否发生了变化"""
+        changed = self._changed.wait(timeout)
+        self._changed.clear()
+        return changed
+
+    def stats(self):
+        """返回存储统计信息"""
+        with self._lock:
+            return {
+                'file_count': len(self._index),
+                'upload_count': len(self._uploads),
+                'total_size': self._total_size,
+                'max_total_size': self.max_total_size
+            }
@@ -0,0 +1,104 @@
+"""文档版本记录：保存每个版本的块源哈希和块HTML，用于增量重新转换"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """线程安全的LRU缓存，同时限制条目数和总权重（如字符数）"""
+
+    def __init__(self, max_entries, max_weight=None, weigher=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigher = weigher or (lambda value: 1)
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self._weight = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        weight = self.weigher(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+            if self.max_weight is not None and weight > self.max_weight:
+                # 单个条目超过总容量，不缓存
+                return
+            self._data[key] = (value, weight)
+            self._weight += weight
+            while self._data and (len(self._data) > self.max_entries or
+                                  (self.max_weight is not None and self._weight > self.max_weight)):
+                _, (_, evicted_weight) = self._data.popitem(last=False)
+                self._weight -= evicted_weight
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._weight -= entry[1]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'weight': self._weight,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def _version_weight(record):
+    return sum(len(html) for html in record['block_html'] if html) + 64 * len(record['source_hashes'])
+
+
+class VersionStore:
+    """按版本ID保存文档每个块的源哈希和渲染结果
+
+    版本记录:
+    - source_hashes: 各顶层元素（按文档顺序）的XML源哈希
+    - block_html: 对应的HTML（空段落为None）
+    - fragment_hashes: 该版本各片段的内容哈希
+    """
+
+    def __init__(self, max_versions=1000, max_chars=None):
+        self._cache = LRUCache(max_versions, max_chars, _version_weight)
+
+    def get(self, version_id):
+        """返回版本记录，不存在（或已被淘汰）时返回None"""
+        return self._cache.get(version_id)
+
+    def save(self, version_id, source_hashes, block_html, fragment_hashes):
+        self._cache.set(version_id, {
+            'source_hashes': source_hashes,
+            'block_html': block_html,
+            'fragment_hashes': fragment_hashes
+        })
+
+    @staticmethod
+    def reusable_blocks(record):
+        """返回 源哈希 -> HTML 的映射，供重新转换时复用"""
+        if not record:
+            return {}
+        return dict(zip(record['source_hashes'], record['block_html']))
+
+    def stats(self):
+        return self._cache.stats()
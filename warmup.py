@@ -0,0 +1,136 @@
+"""启动预热：导入转换用到的模块并解析、转换一个内置的小文档，使第一个真实请求不必承担冷启动开销"""
+import io
+import time
+import importlib
+import logging
+import threading
+import zipfile
+
+# 处理请求时才导入的模块（下载文档时导入requests），预热时提前导入
+PRELOAD_MODULES = ('requests',)
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+# 内置的最小 .docx 部件（标题、带格式的段落、表格），覆盖解析、样式解析和各输出格式的代码路径
+SAMPLE_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '<Override PartName="/word/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/>'
+        '</Relationships>'
+    ),
+    'word/_rels/document.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'word/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:styles xmlns:w="{W_NS}">'
+        '<w:docDefaults><w:rPrDefault><w:rPr><w:sz w:val="21"/></w:rPr></w:rPrDefault></w:docDefaults>'
+        '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+        '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+        '<w:basedOn w:val="Normal"/><w:rPr><w:b/><w:sz w:val="32"/></w:rPr></w:style>'
+        '</w:styles>'
+    ),
+    'word/document.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W_NS}"><w:body>'
+        '<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>预热</w:t></w:r></w:p>'
+        '<w:p><w:r><w:rPr><w:b/><w:color w:val="FF0000"/></w:rPr><w:t>Word</w:t></w:r>'
+        '<w:r><w:t xml:space="preserve"> 转换 &lt;预热&gt;</w:t></w:r></w:p>'
+        '<w:tbl><w:tr><w:tc><w:p><w:r><w:t>A</w:t></w:r></w:p></w:tc>'
+        '<w:tc><w:p><w:r><w:t>B</w:t></w:r></w:p></w:tc></w:tr></w:tbl>'
+        '<w:sectPr/>'
+        '</w:body></w:document>'
+    )
+}
+
+
+def build_sample_docx():
+    """由内置的XML字符串生成一个最小的 .docx，返回字节数据"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in SAMPLE_PARTS.items():
+            archive.writestr(name, xml.encode('utf-8'))
+    return buffer.getvalue()
+
+
+def warm_up():
+    """导入延迟加载的模块，并用内置文档走一遍 解析 -> 大纲 -> 各格式转换，返回耗时（秒）"""
+    start = time.perf_counter()
+
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    from image_store import load_pil
+    from word_to_html_converter import load_word_document, convert_document, document_outline
+
+    load_pil()
+    doc = load_word_document(build_sample_docx())
+    document_outline(doc)
+    for output_format in ('html', 'markdown', 'json'):
+        convert_document(doc, 1000, output_format=output_format, hashes=True)
+    convert_document(doc, 1000, max_fragments=1)
+
+    return time.perf_counter() - start
+
+
+class WarmUp:
+    """在后台线程中执行预热，并记录就绪状态
+
+    预热成功后 ready 为True；预热失败时保持未就绪并记录错误（转换很可能也无法工作）。
+    """
+
+    def __init__(self):
+        self._done = threading.Event()
+        self.elapsed = None
+        self.error = None
+
+    def start(self):
+        threading.Thread(target=self.run, name='warmup', daemon=True).start()
+
+    def run(self):
+        try:
+            self.elapsed = warm_up()
+            logging.info(f"预热完成，耗时 {self.elapsed:.3f} 秒")
+        except Exception as e:
+            self.error = str(e)
+            logging.error(f"预热失败: {str(e)}")
+        finally:
+            self._done.set()
+
+    def skip(self):
+        """不预热，直接标记为就绪"""
+        self._done.set()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def status(self):
+        status = {
+            'ready': self.ready,
+            'warmup_time': round(self.elapsed, 3) if self.elapsed is not None else None
+        }
+        if self.error is not None:
+            status['error'] = self.error
+        return status
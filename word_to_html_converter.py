@@ -1,128 +1,182 @@
 import os
-import requests
 from docx import Document
+from lxml import etree
 import re
-from bs4 import BeautifulSoup
 import tempfile
 import io
+import json
+import bisect
+import hashlib
+import itertools
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from serializers import get_serializer, heading_level
+from style_resolver import StyleResolver
+from package_inspector import inspect_package, check_url_extension
+from deadline import Deadline, ConversionTimeout
+from config import PACKAGE_CONFIG, API_CONFIG
 
 # 配置分割长度变量
 MAX_FRAGMENT_LENGTH = 10000
 
-def download_word_from_url(url):
-    """从URL下载Word文件"""
+# 惰性分割时，在片段最大长度之外至少再准备的字符数（分割点附近的标签/标题检查最多向后查看约200个字符）
+SPLIT_LOOKAHEAD = 2000
+
+class SelectionError(ValueError):
+    """部分转换的选择参数无效（如章节不存在、块范围越界）"""
+
+def download_word_from_url(url, timeout=None):
+    """从URL下载Word文件，URL为旧版 .doc 文件时不下载，直接抛出DocumentRejected
+    
+    timeout为连接和读取的超时秒数，默认为 API_CONFIG['timeout']。
+    """
+    check_url_extension(url)
+    # 只在下载时才导入requests（导入较慢），缩短服务启动时间
+    import requests
     try:
-        response = requests.get(url)
+        response = requests.get(url, timeout=timeout or API_CONFIG['timeout'])
         response.raise_for_status()
         return response.content
     except Exception as e:
         raise Exception(f"下载Word文件失败: {e}")
 
-def word_to_html_with_styles(doc):
+def word_to_html_with_styles(doc, deadline=None):
     """将Word文档转换为HTML，保留所有样式（不包含HTML头部和body标签）"""
-    html_content = []
+    return '\n'.join(render_blocks(doc, deadline=deadline))
+
+def render_blocks(doc, output_format='html', images=None, elements=None, deadline=None):
+    """按文档顺序逐个生成顶层元素（段落、表格）的输出块，空段落不输出
+    
+    images为 关系ID -> 图片URL 的映射（见 ImageStore.extract），不提供时不输出图片。
+    elements为要渲染的顶层元素（部分转换时），默认为文档全部元素。
+    deadline为 Deadline，每渲染一个元素检查一次，超时抛出 ConversionTimeout。
+    """
+    serializer = get_serializer(output_format)
+    resolver = StyleResolver.for_document(doc)
     
     # 获取文档中的所有元素（段落和表格）并保持原有顺序
-    document_elements = get_document_elements_in_order(doc)
+    document_elements = elements if elements is not None else get_document_elements_in_order(doc)
     
     # 按顺序处理每个元素
     for element in document_elements:
-        if element['type'] == 'paragraph':
-            paragraph = element['content']
-            if paragraph.text.strip():
-                # 获取段落样式
-                style_attrs = get_paragraph_style(paragraph)
-                
-                # 处理段落中的文本样式
-                html_paragraph = '<p'
-                for attr, value in style_attrs.items():
-                    html_paragraph += f' {attr}="{value}"'
-                html_paragraph += '>'
-                
-                # 处理段落中的run样式
-                for run in paragraph.runs:
-                    if run.text.strip():
-                        run_styles = get_run_style(run)
-                        if run_styles:
-                            # 如果有样式，添加span标签
-                            style_str = ''
-                            for attr, value in run_styles.items():
-                                style_str += f'{attr}: {value}; '
-                            html_paragraph += f'<span style="{style_str.strip()}">{escape_html(run.text)}</span>'
-                        else:
-                            html_paragraph += escape_html(run.text)
-                
-                html_paragraph += '</p>'
-                html_content.append(html_paragraph)
-        
-        elif element['type'] == 'table':
-            table = element['content']
-            html_table = '<table border="1" style="border-collapse: collapse;">'
-            for row in table.rows:
-                html_table += '<tr>'
-                for cell in row.cells:
-                    html_table += '<td style="border: 1px solid #ddd; padding: 8px;">'
-                    for paragraph in cell.paragraphs:
-                        if paragraph.text.strip():
-                            # 处理表格单元格中的文本样式
-                            cell_text = ''
-                            for run in paragraph.runs:
-                                if run.text.strip():
-                                    run_styles = get_run_style(run)
-                                    if run_styles:
-                                        style_str = ''
-                                        for attr, value in run_styles.items():
-                                            style_str += f'{attr}: {value}; '
-                                        cell_text += f'<span style="{style_str.strip()}">{escape_html(run.text)}</span>'
-                                    else:
-                                        cell_text += escape_html(run.text)
-                            html_table += cell_text
-                    html_table += '</td>'
-                html_table += '</tr>'
-            html_table += '</table>'
-            html_content.append(html_table)
-    
-    return '\n'.join(html_content)
+        if deadline is not None:
+            deadline.check()
+        block = render_element(element, serializer, resolver, images)
+        if block is not None:
+            yield block
+
+def render_element(element, serializer=None, resolver=None, images=None):
+    """将单个顶层元素序列化为一个块（默认HTML），空段落返回None
+    
+    resolver为文档的StyleResolver时输出包含样式继承的有效格式，否则只输出run的直接格式。
+    """
+    if serializer is None or isinstance(serializer, str):
+        serializer = get_serializer(serializer or 'html')
+    
+    events = list(element_events(element, resolver, images))
+    if not events:
+        return None
+    return serializer.serialize(events)
+
+def run_image_events(run, images):
+    """生成run中内嵌图片（DrawingML）的事件：('image', 图片URL, 属性)，属性含alt和像素宽高"""
+    for drawing in run._r.xpath('.//w:drawing'):
+        for embed in drawing.xpath('.//a:blip/@r:embed'):
+            src = images.get(embed)
+            if src is None:
+                continue
+            attrs = {'alt': ''}
+            doc_pr = drawing.xpath('.//wp:docPr')
+            if doc_pr:
+                attrs['alt'] = doc_pr[0].get('descr') or ''
+            extent = drawing.xpath('.//wp:extent')
+            if extent:
+                # EMU -> 像素（96dpi）
+                attrs['width'] = round(int(extent[0].get('cx', 0)) / 9525)
+                attrs['height'] = round(int(extent[0].get('cy', 0)) / 9525)
+            yield ('image', src, attrs)
+
+def has_content(paragraph, images=None):
+    """段落是否有需要输出的内容（非空白文本，或提供images时的图片）"""
+    if paragraph.text.strip():
+        return True
+    return bool(images) and any(embed in images for embed in paragraph._p.xpath('.//a:blip/@r:embed'))
+
+def paragraph_events(paragraph, resolver=None, images=None):
+    """生成段落的事件序列：paragraph_start、各run、paragraph_end"""
+    # 获取段落样式
+    yield ('paragraph_start', get_paragraph_style(paragraph, resolver))
+    
+    # 处理段落中的run样式
+    paragraph_style_id = StyleResolver.paragraph_style_id(paragraph) if resolver else None
+    for run in paragraph.runs:
+        if run.text.strip():
+            if resolver:
+                yield ('run', run.text, resolver.run_style(run, paragraph_style_id))
+            else:
+                yield ('run', run.text, get_run_style(run))
+        if images:
+            yield from run_image_events(run, images)
+    
+    yield ('paragraph_end',)
+
+def element_events(element, resolver=None, images=None):
+    """生成顶层元素的格式无关事件序列（见serializers模块说明），空段落不生成事件"""
+    if element['type'] == 'paragraph':
+        paragraph = element['content']
+        if has_content(paragraph, images):
+            yield from paragraph_events(paragraph, resolver, images)
+    
+    elif element['type'] == 'table':
+        table = element['content']
+        yield ('table_start',)
+        for row in table.rows:
+            yield ('row_start',)
+            for cell in row.cells:
+                yield ('cell_start',)
+                for paragraph in cell.paragraphs:
+                    if has_content(paragraph, images):
+                        # 处理表格单元格中的文本样式
+                        yield from paragraph_events(paragraph, resolver, images)
+                yield ('cell_end',)
+            yield ('row_end',)
+        yield ('table_end',)
 
 def get_document_elements_in_order(doc):
     """获取文档中的所有元素（段落和表格）并保持原有顺序"""
-    elements = []
-    
-    # 获取所有段落的索引位置
-    paragraph_indices = {}
-    for i, paragraph in enumerate(doc.paragraphs):
-        paragraph_indices[paragraph._element] = i
-    
-    # 获取所有表格的索引位置
-    table_indices = {}
-    for i, table in enumerate(doc.tables):
-        table_indices[table._element] = i
-    
-    # 遍历文档的所有元素，按照它们在XML中的顺序
-    for element in doc.element.body:
-        if element in paragraph_indices:
-            # 这是一个段落
-            paragraph_index = paragraph_indices[element]
-            elements.append({
+    return list(iter_document_elements(doc))
+
+def iter_document_elements(doc, deadline=None):
+    """按文档顺序逐个生成顶层元素（段落和表格），提供deadline时每个元素检查一次"""
+    # 直接遍历body的子元素，与 doc.paragraphs / doc.tables 使用相同的父对象；
+    # 不按索引反复访问 doc.paragraphs（每次访问都会重建整个段落列表）
+    body = doc._body
+    for element in doc.element.body.iterchildren():
+        if deadline is not None:
+            deadline.check()
+        if element.tag == qn('w:p'):
+            yield {
                 'type': 'paragraph',
-                'content': doc.paragraphs[paragraph_index]
-            })
-        elif element in table_indices:
-            # 这是一个表格
-            table_index = table_indices[element]
-            elements.append({
+                'content': Paragraph(element, body)
+            }
+        elif element.tag == qn('w:tbl'):
+            yield {
                 'type': 'table',
-                'content': doc.tables[table_index]
-            })
-    
-    return elements
+                'content': Table(element, body)
+            }
 
-def get_paragraph_style(paragraph):
+def get_paragraph_style(paragraph, resolver=None):
     """获取段落的样式属性"""
     styles = {}
     
-    if paragraph.style.name:
-        styles['class'] = paragraph.style.name.lower().replace(' ', '-')
+    # 有样式解析器时从缓存中取样式名，避免每个段落都在样式表中线性查找
+    if resolver:
+        style_name = resolver.paragraph_style_name(StyleResolver.paragraph_style_id(paragraph))
+    else:
+        style_name = paragraph.style.name
+    if style_name:
+        styles['class'] = style_name.lower().replace(' ', '-')
     
     # 获取对齐方式
     alignment = paragraph.alignment
@@ -139,7 +193,7 @@ def get_paragraph_style(paragraph):
     return styles
 
 def get_run_style(run):
-    """获取run的样式属性"""
+    """获取run的直接格式（不含样式继承，完整的有效格式见 StyleResolver.run_style）"""
     styles = {}
     
     if run.bold:
@@ -155,29 +209,20 @@ def get_run_style(run):
     
     # 获取字号
     if run.font.size:
-        # Word中字号是以half-points为单位，需要转换为pt
-        font_size_pt = run.font.size / 2
-        styles['font-size'] = f'{font_size_pt}pt'
+        # font.size 是Length（EMU），直接取pt值
+        styles['font-size'] = f'{run.font.size.pt}pt'
     
     # 获取颜色
     if run.font.color and run.font.color.rgb:
         rgb = run.font.color.rgb
-        styles['color'] = f'#{rgb:06x}'
+        styles['color'] = f'#{str(rgb).lower()}'
     
     return styles
 
-def escape_html(text):
-    """转义HTML特殊字符"""
-    return (text.replace('&', '&amp;')
-               .replace('<', '&lt;')
-               .replace('>', '&gt;')
-               .replace('"', '&quot;')
-               .replace("'", '&#39;'))
-
-def is_heading_tag(html_content, position):
-    """检查指定位置是否是标题标签的结尾"""
+def is_heading_tag(html_content, position, start=0):
+    """检查指定位置是否是标题标签的结尾（只在start之后查找）"""
     # 查找position附近的标签
-    start_pos = max(0, position - 100)
+    start_pos = max(start, position - 100)
     end_pos = min(len(html_content), position + 100)
     context = html_content[start_pos:end_pos]
     
@@ -193,48 +238,53 @@ def is_heading_tag(html_content, position):
     
     return False
 
-def find_safe_split_point(html_content, max_length):
-    """找到安全的分割点，确保不在标题处分割且不在标签中间切割"""
-    if len(html_content) <= max_length:
+def find_safe_split_point(html_content, max_length, start=0):
+    """找到安全的分割点，确保不在标题处分割且不在标签中间切割
+    
+    从start位置开始计算片段，返回分割点在html_content中的绝对位置，
+    不需要为剩余内容创建切片副本。
+    """
+    if len(html_content) - start <= max_length:
         return len(html_content)
     
     # 从max_length位置开始向前查找合适的分割点
-    split_point = max_length
+    limit = start + max_length
+    split_point = limit
     
     # 避免在标题处分割
-    while split_point > max_length - 500 and split_point > 0:
-        if not is_heading_tag(html_content, split_point):
+    while split_point > limit - 500 and split_point > start:
+        if not is_heading_tag(html_content, split_point, start):
             # 查找段落结束标签
-            paragraph_end = html_content.rfind('</p>', 0, split_point)
-            if paragraph_end != -1 and paragraph_end > max_length - 500:
+            paragraph_end = html_content.rfind('</p>', start, split_point)
+            if paragraph_end != -1 and paragraph_end > limit - 500:
                 split_point = paragraph_end + 4  # 包含</p>标签
                 break
         split_point -= 1
     
     # 如果没找到合适的段落结束，查找其他标签结束
-    if split_point == max_length:
-        for i in range(max_length, max(max_length - 500, 0), -1):
-            if html_content[i] == '>' and not is_heading_tag(html_content, i):
+    if split_point == limit:
+        for i in range(limit, max(limit - 500, start), -1):
+            if html_content[i] == '>' and not is_heading_tag(html_content, i, start):
                 split_point = i + 1
                 break
     
     # 确保不在标签中间切割
-    split_point = ensure_not_in_tag_middle(html_content, split_point)
+    split_point = ensure_not_in_tag_middle(html_content, split_point, start)
     
     # 检查分割点是否在标题标签开始处，如果是则提前分割点
-    split_point = avoid_heading_tag_at_split_point(html_content, split_point)
+    split_point = avoid_heading_tag_at_split_point(html_content, split_point, start)
     
     return split_point
 
-def avoid_heading_tag_at_split_point(html_content, split_point):
+def avoid_heading_tag_at_split_point(html_content, split_point, start=0):
     """避免标题标签出现在分割点处，将整个标题标签移到下个片段"""
-    if split_point <= 0 or split_point >= len(html_content):
+    if split_point <= start or split_point >= len(html_content):
         return split_point
     
     # 检查分割点附近是否有标题标签的开始
     # 向前查找最近的标签开始
-    for i in range(split_point - 1, max(-1, split_point - 200), -1):
-        if i < 0:
+    for i in range(split_point - 1, max(start - 1, split_point - 200), -1):
+        if i < start:
             break
         if html_content[i] == '<':
             # 检查是否是标题相关的标签（如 p class="heading-1"）
@@ -262,15 +312,15 @@ def is_heading_tag_start(tag_content):
             return True
     return False
 
-def ensure_not_in_tag_middle(html_content, split_point):
+def ensure_not_in_tag_middle(html_content, split_point, start=0):
     """确保分割点不在标签中间，只在标签开始前或结束后切割"""
-    if split_point <= 0 or split_point >= len(html_content):
+    if split_point <= start or split_point >= len(html_content):
         return split_point
     
     # 检查分割点是否在标签中间
     # 向前查找最近的标签开始或结束
-    for i in range(split_point - 1, max(-1, split_point - 100), -1):
-        if i < 0:
+    for i in range(split_point - 1, max(start - 1, split_point - 100), -1):
+        if i < start:
             break
         if html_content[i] == '<':
             # 找到了标签开始，检查是否是结束标签
@@ -300,62 +350,708 @@ def ensure_not_in_tag_middle(html_content, split_point):
     
     return split_point
 
-def split_html_content(html_content, max_length=MAX_FRAGMENT_LENGTH):
-    """将HTML内容分割成指定长度的片段"""
-    fragments = []
-    remaining_content = html_content
+def split_html_offsets(html_content, max_length=MAX_FRAGMENT_LENGTH, deadline=None):
+    """计算HTML内容的分割位置，返回 [(起始位置, 结束位置), ...]
     
-    while remaining_content:
-        if len(remaining_content) <= max_length:
-            fragments.append(remaining_content)
+    只在原始字符串上移动位置，不创建剩余内容和片段的副本。
+    提供deadline时每确定一个片段检查一次。
+    """
+    offsets = []
+    start = 0
+    total_length = len(html_content)
+    
+    while start < total_length:
+        if deadline is not None:
+            deadline.check()
+        if total_length - start <= max_length:
+            offsets.append((start, total_length))
             break
         
         # 找到安全的分割点
-        split_point = find_safe_split_point(remaining_content, max_length)
+        split_point = find_safe_split_point(html_content, max_length, start)
         
+        # 确保分割点不会太短
+        if split_point - start < max_length * 0.5:
+            split_point = start + max_length
+        
+        offsets.append((start, split_point))
+        start = split_point
+        
+        print(f"分割片段: 长度 {split_point - offsets[-1][0]}, 剩余长度: {total_length - start}")
+    
+    return offsets
+
+def iter_html_offsets(blocks, max_length=MAX_FRAGMENT_LENGTH, separator='\n', deadline=None):
+    """split_html_offsets 的惰性版本：从块迭代器边拼接边分割，每确定一个片段就生成其位置
+    
+    只在缓冲区中保留当前片段起点之后的内容，并且只在未分割的内容超过
+    max_length + SPLIT_LOOKAHEAD 或块已用完时才计算分割点，因此结果与对完整内容调用
+    split_html_offsets 相同，而只需要渲染到最后一个所需片段之后的少量内容。
+    """
+    blocks = iter(blocks)
+    window = ''  # 完整内容中从 base 开始的部分
+    base = 0
+    first = True
+    exhausted = False
+    
+    while True:
+        if deadline is not None:
+            deadline.check()
+        # 补充内容，直到足够确定下一个分割点
+        parts = [window]
+        buffered = len(window)
+        while not exhausted and buffered <= max_length + SPLIT_LOOKAHEAD:
+            block = next(blocks, None)
+            if block is None:
+                exhausted = True
+                break
+            if not first:
+                parts.append(separator)
+                buffered += len(separator)
+            parts.append(block)
+            buffered += len(block)
+            first = False
+        window = ''.join(parts)
+        
+        if not window:
+            return
+        if exhausted and len(window) <= max_length:
+            yield (base, base + len(window))
+            return
+        
+        split_point = find_safe_split_point(window, max_length)
         # 确保分割点不会太短
         if split_point < max_length * 0.5:
             split_point = max_length
+        yield (base, base + split_point)
+        window = window[split_point:]
+        base += split_point
+
+def add_offset_overlap(html_content, offsets, overlap, separator='\n', align_tags=True):
+    """为相邻片段增加重叠区域：每个片段（第一个除外）的起点向前延伸最多overlap个字符
+    
+    延伸后的起点对齐到块边界（separator之后，与序列化时连接块的分隔符相同，如Markdown为空行，
+    窗口不会从分隔符或表格等多行块的中间开始）；找不到时align_tags为True（HTML）则对齐到标签开始，
+    仍找不到则不延伸，避免窗口从标签中间开始。
+    """
+    if overlap <= 0:
+        return list(offsets)
+    
+    windows = []
+    for index, (start, end) in enumerate(offsets):
+        if index > 0 and start > 0:
+            earliest = max(0, start - overlap)
+            block_start = html_content.find(separator, earliest, start)
+            if block_start != -1:
+                start = block_start + len(separator)
+            elif align_tags:
+                tag_start = html_content.find('<', earliest, start)
+                if tag_start != -1 and html_content[tag_start + 1:tag_start + 2] != '/':
+                    start = tag_start
+        windows.append((start, end))
+    return windows
+
+def split_html_content(html_content, max_length=MAX_FRAGMENT_LENGTH, deadline=None):
+    """将HTML内容分割成指定长度的片段"""
+    return [html_content[start:end] for start, end in split_html_offsets(html_content, max_length, deadline)]
+
+def content_hash(data):
+    """计算文本或字节的稳定内容哈希（32位十六进制）"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def document_styles_digest(doc):
+    """样式表的内容哈希；块的渲染结果依赖样式定义，源哈希中需要包含它"""
+    return content_hash(etree.tostring(doc.styles.element))
+
+def render_source_blocks(doc, previous_blocks=None, output_format='html', images=None, elements=None,
+                         deadline=None):
+    """逐个渲染顶层元素并计算其XML源哈希，源哈希命中previous_blocks时直接复用HTML
+    
+    源哈希包含输出格式、样式表哈希和图片映射，不同格式的块不会互相复用；
+    块XML中只有图片的关系ID，图片内容变化时通过图片映射（URL含内容哈希）区分。
+    返回 (源哈希列表, HTML列表, 复用的块数)，两个列表与文档顶层元素一一对应，空段落的HTML为None。
+    """
+    previous_blocks = previous_blocks or {}
+    serializer = get_serializer(output_format)
+    resolver = StyleResolver.for_document(doc)
+    styles_digest = f'{output_format}:{document_styles_digest(doc)}'
+    if images:
+        styles_digest += ':' + content_hash(json.dumps(images, sort_keys=True))
+    styles_digest = styles_digest.encode('ascii')
+    source_hashes = []
+    block_html = []
+    reused = 0
+    
+    if elements is None:
+        elements = get_document_elements_in_order(doc)
+    for element in elements:
+        if deadline is not None:
+            deadline.check()
+        source_hash = content_hash(styles_digest + etree.tostring(element['content']._element))
+        if source_hash in previous_blocks:
+            html_block = previous_blocks[source_hash]
+            reused += 1
+        else:
+            html_block = render_element(element, serializer, resolver, images)
+        source_hashes.append(source_hash)
+        block_html.append(html_block)
+    
+    return source_hashes, block_html, reused
+
+def is_anchor_block(block_hash, block_length, target_length):
+    """判断块之后是否为内容锚定的分割点
+    
+    只取决于块自身的哈希和长度：每个块成为锚点的概率与其长度成正比，
+    平均每 target_length 个字符出现一个锚点，与块在文档中的位置无关。
+    """
+    threshold = min(1.0, block_length / target_length) * 0xFFFFFFFF
+    return int(block_hash[:8], 16) < threshold
+
+def split_blocks_anchored(blocks, max_length=MAX_FRAGMENT_LENGTH, block_hashes=None,
+                          separator='\n', split_oversized=True, deadline=None):
+    """按块边界进行内容锚定的分割，返回在 separator.join(blocks) 中的 [(起始, 结束), ...]
+    
+    片段只在块之间断开，断点由块内容决定（见 is_anchor_block），
+    因此修改某一节只影响包含它的片段，之后的片段边界和哈希保持不变。
+    片段达到 max_length 时强制断开；单个块超过 max_length 时单独成为片段，
+    split_oversized为True时再按常规方式分割。
+    """
+    return list(iter_anchored_offsets(blocks, max_length, block_hashes, separator, split_oversized, deadline))
+
+def iter_anchored_offsets(blocks, max_length=MAX_FRAGMENT_LENGTH, block_hashes=None,
+                          separator='\n', split_oversized=True, deadline=None):
+    """split_blocks_anchored 的惰性版本：blocks可以是迭代器，每确定一个片段就生成其位置"""
+    # 不提供哈希时边迭代边计算，blocks只被遍历一次
+    if block_hashes is None:
+        pairs = ((block, content_hash(block)) for block in blocks)
+    else:
+        pairs = zip(blocks, block_hashes)
+    
+    target_length = max_length / 2
+    min_length = max_length / 4
+    
+    fragment_start = None
+    fragment_end = None
+    position = 0
+    
+    for block, block_hash in pairs:
+        if deadline is not None:
+            deadline.check()
+        block_start = position
+        block_end = position + len(block)
+        position = block_end + len(separator)
+        
+        if len(block) > max_length:
+            # 超长块（如大表格）：结束当前片段，块内按常规方式分割
+            if fragment_start is not None:
+                yield (fragment_start, fragment_end)
+                fragment_start = None
+            if split_oversized:
+                yield from ((block_start + start, block_start + end)
+                            for start, end in split_html_offsets(block, max_length, deadline))
+            else:
+                yield (block_start, block_end)
+            continue
         
-        fragment = remaining_content[:split_point]
-        fragments.append(fragment)
-        remaining_content = remaining_content[split_point:]
+        if fragment_start is not None and block_end - fragment_start > max_length:
+            # 加入当前块会超长，在块之前强制断开
+            yield (fragment_start, fragment_end)
+            fragment_start = None
         
-        print(f"分割片段: 长度 {len(fragment)}, 剩余长度: {len(remaining_content)}")
+        if fragment_start is None:
+            fragment_start = block_start
+        fragment_end = block_end
+        
+        if fragment_end - fragment_start >= min_length and is_anchor_block(block_hash, len(block), target_length):
+            yield (fragment_start, fragment_end)
+            fragment_start = None
     
-    return fragments
+    if fragment_start is not None:
+        yield (fragment_start, fragment_end)
 
-def word_to_html_array(url, max_length=MAX_FRAGMENT_LENGTH):
-    """主函数：将Word文档从URL转换为HTML数组"""
-    print(f"开始处理URL: {url}")
-    print(f"最大片段长度: {max_length}")
+def document_outline(doc, elements=None):
+    """返回文档的标题树（按标题样式的段落），用于按章节部分转换
     
-    # 下载Word文件
-    print("正在下载Word文件...")
-    word_content = download_word_from_url(url)
+    每个标题节点: id（文档中的标题序号）、title、level、start_block / end_block
+    （章节在顶层元素序列中的 [起始, 结束) 位置，包含其下级章节）、children。
+    返回 {'headings': 顶层标题节点列表, 'heading_count': 标题总数, 'total_blocks': 顶层元素总数}
+    """
+    if elements is None:
+        elements = get_document_elements_in_order(doc)
+    resolver = StyleResolver.for_document(doc)
     
-    # 解析Word文档
-    print("正在解析Word文档...")
-    # 使用临时文件来处理字节数据
-    with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_file:
-        temp_file.write(word_content)
-        temp_file_path = temp_file.name
+    roots = []
+    stack = []
+    heading_count = 0
+    for index, element in enumerate(elements):
+        if element['type'] != 'paragraph':
+            continue
+        paragraph = element['content']
+        style_name = resolver.paragraph_style_name(StyleResolver.paragraph_style_id(paragraph))
+        level = heading_level({'class': style_name.lower().replace(' ', '-')}) if style_name else 0
+        if not level:
+            continue
+        title = paragraph.text.strip()
+        if not title:
+            continue
+        
+        heading = {
+            'id': heading_count,
+            'title': title,
+            'level': level,
+            'start_block': index,
+            'end_block': None,
+            'children': []
+        }
+        heading_count += 1
+        # 同级或更高级的标题结束之前的章节
+        while stack and stack[-1]['level'] >= level:
+            stack.pop()['end_block'] = index
+        (stack[-1]['children'] if stack else roots).append(heading)
+        stack.append(heading)
+    
+    for heading in stack:
+        heading['end_block'] = len(elements)
+    
+    return {'headings': roots, 'heading_count': heading_count, 'total_blocks': len(elements)}
+
+def iter_outline(headings):
+    """按文档顺序遍历标题树中的所有节点"""
+    for heading in headings:
+        yield heading
+        yield from iter_outline(heading['children'])
+
+def resolve_selection(total_blocks, outline=None, sections=None, block_range=None):
+    """将章节选择和块范围解析为排序合并后的顶层元素范围 [(起始, 结束), ...]
     
+    sections中的每一项为标题id（整数）或标题文本（忽略大小写和首尾空白），
+    block_range为 (起始, 结束)。无效的选择抛出SelectionError。
+    """
+    ranges = []
+    for selector in sections or []:
+        if isinstance(selector, int) and not isinstance(selector, bool):
+            matches = [heading for heading in iter_outline(outline['headings']) if heading['id'] == selector]
+        elif isinstance(selector, str):
+            title = selector.strip().casefold()
+            matches = [heading for heading in iter_outline(outline['headings'])
+                       if heading['title'].casefold() == title]
+        else:
+            raise SelectionError(f'无效的章节: {selector!r}')
+        if not matches:
+            raise SelectionError(f'未找到章节: {selector}')
+        ranges.extend((heading['start_block'], heading['end_block']) for heading in matches)
+    
+    if block_range is not None:
+        start, end = block_range
+        if not 0 <= start < end <= total_blocks:
+            raise SelectionError(f'块范围必须满足 0 <= 起始 < 结束 <= {total_blocks}')
+        ranges.append((start, end))
+    
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def referenced_images(elements):
+    """返回元素中引用的图片关系ID集合"""
+    rel_ids = set()
+    for element in elements:
+        rel_ids.update(element['content']._element.xpath('.//a:blip/@r:embed'))
+    return rel_ids
+
+def iter_packed_offsets(blocks, max_length=MAX_FRAGMENT_LENGTH, separator='\n', split_oversized=True,
+                        deadline=None):
+    """按块边界贪心打包：依次把块放入当前片段，加入下一个块会超过 max_length 时断开，返回在
+    separator.join(blocks) 中的 [(起始, 结束), ...] 迭代器；blocks可以是迭代器
+    
+    用于非HTML格式的默认分割（片段不能从Markdown语法或JSON块中间断开）。
+    单个块超过 max_length 时单独成为片段，split_oversized为True时再按常规方式分割。
+    """
+    fragment_start = None
+    fragment_end = None
+    position = 0
+    
+    for block in blocks:
+        if deadline is not None:
+            deadline.check()
+        block_start = position
+        block_end = position + len(block)
+        position = block_end + len(separator)
+        
+        if len(block) > max_length:
+            if fragment_start is not None:
+                yield (fragment_start, fragment_end)
+                fragment_start = None
+            if split_oversized:
+                yield from ((block_start + start, block_start + end)
+                            for start, end in split_html_offsets(block, max_length, deadline))
+            else:
+                yield (block_start, block_end)
+            continue
+        
+        if fragment_start is not None and block_end - fragment_start > max_length:
+            yield (fragment_start, fragment_end)
+            fragment_start = None
+        
+        if fragment_start is None:
+            fragment_start = block_start
+        fragment_end = block_end
+    
+    if fragment_start is not None:
+        yield (fragment_start, fragment_end)
+
+def convert_document(doc, max_length=MAX_FRAGMENT_LENGTH, split='default', overlap=0, hashes=False,
+                     previous_blocks=None, track_sources=False, parallel=False, output_format='html',
+                     image_store=None, sections=None, block_range=None, fragment_range=None,
+                     max_fragments=None, deadline=None):
+    """将已解析的Word文档转换为完整输出内容和片段位置
+    
+    参数:
+    - split: default（按长度智能分割）/ anchored（按块边界内容锚定分割）
+    - overlap: 相邻片段的重叠字符数
+    - hashes: 是否计算每个片段和每个块的内容哈希
+    - previous_blocks: 上一版本的 源哈希 -> HTML 映射，源哈希未变的块直接复用
+    - track_sources: 是否返回每个顶层元素的源哈希和HTML（用于保存版本记录）
+    - parallel: 是否允许在进程池中并行渲染（元素数量低于阈值时仍串行；增量转换时不使用）
+    - output_format: html / markdown / json，非HTML格式只在块边界断开（默认分割时按块贪心打包，见 iter_packed_offsets）
+    - image_store: ImageStore，提供时提取文档图片（按内容去重保存）并在输出中以URL引用，否则不输出图片
+    - sections / block_range: 只转换选中的章节（标题id或标题文本列表，见 document_outline）
+      和/或顶层元素范围 (起始, 结束)，只渲染和分割选中的元素
+    - fragment_range: 只返回第 起始..结束 个片段（含两端，从0开始）
+    - max_fragments: 最多返回的片段数（预览）
+    - deadline: Deadline，遍历、渲染和分割时定期检查，超时抛出 ConversionTimeout
+    
+    指定 fragment_range 或 max_fragments 时（增量转换除外），遍历、渲染和分割惰性进行，
+    得到所需的最后一个片段后立即停止，不渲染文档的其余部分。
+    
+    返回字典: html（输出内容，非HTML格式时为对应格式的文本）, offsets，
+    hashes为True时另有 fragment_hashes、block_hashes，
+    track_sources为True或提供previous_blocks时另有 source_hashes、block_html、reused_blocks、rendered_blocks，
+    json格式另有 fragment_blocks（每个片段的块对象列表），
+    部分转换时另有 selection（选中的元素范围）、fragment_range 和 total_fragments（提前停止时为None），
+    指定 fragment_range 或 max_fragments 时另有 truncated（之后是否还有未返回的内容）
+    """
+    serializer = get_serializer(output_format)
+    
+    limit = max_fragments
+    if fragment_range is not None:
+        first, last = fragment_range
+        if not 0 <= first <= last:
+            raise SelectionError('片段范围必须满足 0 <= 起始 <= 结束')
+        limit = last + 1 if limit is None else min(limit, last + 1)
+    lazy = limit is not None and not track_sources and previous_blocks is None
+    
+    selection = None
+    if sections or block_range is not None:
+        elements = list(iter_document_elements(doc, deadline))
+        outline = document_outline(doc, elements) if sections else None
+        selection = resolve_selection(len(elements), outline, sections, block_range)
+        elements = [element for start, end in selection for element in elements[start:end]]
+        print(f"部分转换: {len(elements)} 个元素")
+    elif lazy:
+        elements = iter_document_elements(doc, deadline)
+    else:
+        elements = list(iter_document_elements(doc, deadline))
+    
+    if lazy:
+        result = convert_lazily(doc, elements, limit, max_length, split, overlap, hashes,
+                                output_format, image_store, deadline)
+        offsets = result['offsets']
+        truncated = result['truncated']
+        total_fragments = None if truncated else len(offsets)
+        if fragment_range is not None:
+            if fragment_range[0] >= len(offsets):
+                raise SelectionError(f'片段范围的起始必须小于片段总数 {len(offsets)}')
+            result['offsets'] = offsets[fragment_range[0]:]
+            if hashes:
+                result['fragment_hashes'] = result['fragment_hashes'][fragment_range[0]:]
+            if output_format == 'json':
+                result['fragment_blocks'] = result['fragment_blocks'][fragment_range[0]:]
+            result['fragment_range'] = [fragment_range[0], fragment_range[0] + len(result['offsets']) - 1]
+            result['total_fragments'] = total_fragments
+        if selection is not None:
+            result['selection'] = selection
+        return result
+    
+    images = None
+    if image_store is not None:
+        # 部分转换时只提取选中元素引用的图片
+        images = image_store.extract(doc, referenced_images(elements) if selection is not None else None)
+    if images:
+        print(f"提取图片: {len(images)} 个")
+    
+    # 转换为HTML
+    print(f"正在转换为{output_format}...")
+    sources = None
+    if track_sources or previous_blocks is not None:
+        source_hashes, block_html, reused = render_source_blocks(doc, previous_blocks, output_format, images,
+                                                                 elements, deadline)
+        blocks = [html_block for html_block in block_html if html_block is not None]
+        sources = {
+            'source_hashes': source_hashes,
+            'block_html': block_html,
+            'reused_blocks': reused,
+            'rendered_blocks': len(source_hashes) - reused
+        }
+        print(f"增量转换: 复用 {reused} 个块，重新渲染 {len(source_hashes) - reused} 个块")
+    elif parallel:
+        from parallel_render import render_blocks_parallel
+        blocks = render_blocks_parallel(doc, elements, output_format, images, deadline)
+    else:
+        blocks = list(render_blocks(doc, output_format, images, elements, deadline))
+    html_content = serializer.separator.join(blocks)
+    print(f"输出总长度: {len(html_content)}")
+    
+    # 计算分割位置
+    print("正在计算分割位置...")
+    block_hashes = [content_hash(block) for block in blocks] if (hashes or split == 'anchored') else None
+    if split == 'anchored':
+        offsets = split_blocks_anchored(blocks, max_length, block_hashes, serializer.separator,
+                                        serializer.splittable_blocks, deadline)
+    elif output_format != 'html':
+        offsets = list(iter_packed_offsets(blocks, max_length, serializer.separator,
+                                           serializer.splittable_blocks, deadline))
+    else:
+        offsets = split_html_offsets(html_content, max_length, deadline)
+    offsets = add_offset_overlap(html_content, offsets, overlap, serializer.separator, output_format == 'html')
+    print(f"分割完成，共生成{len(offsets)}个片段位置")
+    
+    result = {
+        'html': html_content,
+        'offsets': offsets
+    }
+    if selection is not None:
+        result['selection'] = selection
+    if limit is not None:
+        # 增量转换时不提前停止，完整转换后截取
+        total_fragments = len(offsets)
+        result['truncated'] = total_fragments > limit
+        offsets = offsets[:limit]
+        if fragment_range is not None:
+            if fragment_range[0] >= total_fragments:
+                raise SelectionError(f'片段范围的起始必须小于片段总数 {total_fragments}')
+            offsets = offsets[fragment_range[0]:]
+            result['fragment_range'] = [fragment_range[0], fragment_range[0] + len(offsets) - 1]
+            result['total_fragments'] = total_fragments
+        result['offsets'] = offsets
+    if hashes:
+        result['fragment_hashes'] = [content_hash(html_content[start:end]) for start, end in offsets]
+        result['block_hashes'] = block_hashes
+    if sources:
+        result.update(sources)
+    if output_format == 'json':
+        result['fragment_blocks'] = group_fragment_blocks(blocks, offsets, serializer.separator)
+    return result
+
+def iter_rendered_blocks(doc, elements, output_format='html', image_store=None, deadline=None):
+    """逐个渲染元素并生成非空输出块，提供image_store时只在渲染到引用图片的元素时才提取对应图片"""
+    serializer = get_serializer(output_format)
+    resolver = StyleResolver.for_document(doc)
+    images = {} if image_store is not None else None
+    for element in elements:
+        if deadline is not None:
+            deadline.check()
+        if image_store is not None:
+            rel_ids = referenced_images([element]) - images.keys()
+            if rel_ids:
+                images.update(image_store.extract(doc, rel_ids))
+        block = render_element(element, serializer, resolver, images)
+        if block is not None:
+            yield block
+
+def convert_lazily(doc, elements, limit, max_length=MAX_FRAGMENT_LENGTH, split='default', overlap=0,
+                   hashes=False, output_format='html', image_store=None, deadline=None, partial=False):
+    """惰性地执行 遍历 -> 渲染 -> 分割，得到limit个片段后立即停止（limit为None时处理全部内容）
+    
+    elements可以是迭代器。返回与convert_document相同结构的字典，另有truncated表示之后是否还有内容；
+    提前停止时html只包含到最后一个片段结束为止的内容。
+    超过deadline时，partial为False则抛出 ConversionTimeout；partial为True则返回已确定的片段
+    （与完整转换的前几个片段相同），truncated为True，另有 timed_out 为True。
+    """
+    serializer = get_serializer(output_format)
+    separator = serializer.separator
+    
+    print(f"正在转换为{output_format}（最多{limit or '全部'}个片段）...")
+    source = iter_rendered_blocks(doc, elements, output_format, image_store, deadline)
+    blocks = []
+    
+    def rendered():
+        for block in source:
+            blocks.append(block)
+            yield block
+    
+    if split == 'anchored':
+        offset_iter = iter_anchored_offsets(rendered(), max_length, None, separator,
+                                            serializer.splittable_blocks, deadline)
+    elif output_format != 'html':
+        offset_iter = iter_packed_offsets(rendered(), max_length, separator, serializer.splittable_blocks, deadline)
+    else:
+        offset_iter = iter_html_offsets(rendered(), max_length, separator, deadline)
+    offsets = []
+    timed_out = False
     try:
-        doc = Document(temp_file_path)
-    finally:
-        # 清理临时文件
-        os.unlink(temp_file_path)
+        offsets.extend(itertools.islice(offset_iter, limit))
+    except ConversionTimeout:
+        if not partial:
+            raise
+        timed_out = True
+    offset_iter.close()
+    
+    html_content = separator.join(blocks)
+    truncated = timed_out
+    if not timed_out and len(offsets) == limit:
+        # 已渲染的内容超出最后一个片段，或还有未渲染的非空块
+        truncated = offsets[-1][1] < len(html_content) or next(source, None) is not None
+    if truncated:
+        html_content = html_content[:offsets[-1][1]] if offsets else ''
+        # 只保留与返回内容有重叠的块
+        position = 0
+        kept = 0
+        for block in blocks:
+            if position >= len(html_content):
+                break
+            position += len(block) + len(separator)
+            kept += 1
+        blocks = blocks[:kept]
+    print(f"已渲染 {len(blocks)} 个块，生成{len(offsets)}个片段位置，截断: {truncated}" +
+          ("（超时）" if timed_out else ""))
+    
+    offsets = add_offset_overlap(html_content, offsets, overlap, separator, output_format == 'html')
+    result = {
+        'html': html_content,
+        'offsets': offsets,
+        'truncated': truncated
+    }
+    if timed_out:
+        result['timed_out'] = True
+    if hashes:
+        result['fragment_hashes'] = [content_hash(html_content[start:end]) for start, end in offsets]
+        result['block_hashes'] = [content_hash(block) for block in blocks]
+    if output_format == 'json':
+        result['fragment_blocks'] = group_fragment_blocks(blocks, offsets, separator)
+    return result
+
+def group_fragment_blocks(blocks, offsets, separator):
+    """将按块边界分割的片段位置映射回块，返回每个片段的块对象列表（用于JSON AST输出）"""
+    block_starts = []
+    position = 0
+    for block in blocks:
+        block_starts.append(position)
+        position += len(block) + len(separator)
+    
+    fragments = []
+    for start, end in offsets:
+        first = bisect.bisect_left(block_starts, start)
+        last = bisect.bisect_left(block_starts, end)
+        fragments.append([json.loads(block) for block in blocks[first:last]])
+    return fragments
+
+def load_word_document(source, skip_inspection=False):
+    """解析Word文档，source为本地文件路径或字节数据
+    
+    解析前先检查文档包（见 package_inspector.inspect_package），未通过时抛出DocumentRejected；
+    调用方已检查过同一文档时（如 app.run_admitted）传入 skip_inspection=True，不再重复读取中央目录。
+    """
+    if not skip_inspection:
+        inspect_package(source, PACKAGE_CONFIG)
+    
+    if isinstance(source, (bytes, bytearray)):
+        # 使用临时文件来处理字节数据
+        with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as temp_file:
+            temp_file.write(source)
+            temp_file_path = temp_file.name
+        
+        try:
+            return Document(temp_file_path)
+        finally:
+            # 清理临时文件
+            os.unlink(temp_file_path)
+    
+    return Document(source)
+
+def document_to_html_array(doc, max_length=MAX_FRAGMENT_LENGTH, max_fragments=None, deadline=None,
+                           partial=False):
+    """将已解析的Word文档转换为HTML片段数组
+    
+    max_fragments指定时只返回前max_fragments个片段，得到这些片段后立即停止渲染和分割
+    （需要截断标记时使用 convert_document）。
+    超过deadline时抛出 ConversionTimeout；partial为True时改为返回超时前已确定的片段。
+    """
+    if max_fragments is not None or partial:
+        result = convert_lazily(doc, iter_document_elements(doc, deadline), max_fragments, max_length,
+                                deadline=deadline, partial=partial)
+        return [result['html'][start:end] for start, end in result['offsets']]
     
     # 转换为HTML
     print("正在转换为HTML...")
-    html_content = word_to_html_with_styles(doc)
+    html_content = word_to_html_with_styles(doc, deadline)
     print(f"HTML总长度: {len(html_content)}")
     
     # 分割HTML内容
     print("正在分割HTML内容...")
-    html_fragments = split_html_content(html_content, max_length)
+    html_fragments = split_html_content(html_content, max_length, deadline)
     
     print(f"分割完成，共生成{len(html_fragments)}个片段")
     
-    return html_fragments
\ No newline at end of file
+    return html_fragments
+
+def conversion_deadline(timeout=None):
+    """创建一次转换的截止时间，timeout为None时使用 API_CONFIG['timeout']（为0或None时不限时）"""
+    return Deadline(API_CONFIG['timeout'] if timeout is None else timeout)
+
+def word_file_to_html_array(path, max_length=MAX_FRAGMENT_LENGTH, timeout=None, partial=False):
+    """将本地Word文件转换为HTML数组，timeout和partial见word_to_html_array"""
+    print(f"开始处理文件: {path}")
+    print(f"最大片段长度: {max_length}")
+    deadline = conversion_deadline(timeout)
+    
+    print("正在解析Word文档...")
+    doc = load_word_document(path)
+    
+    return document_to_html_array(doc, max_length, deadline=deadline, partial=partial)
+
+def outline_word_url(url):
+    """从URL下载Word文档并返回其标题树，见document_outline"""
+    print(f"开始处理URL: {url}")
+    doc = load_word_document_from_url(url)
+    return document_outline(doc)
+
+def load_word_document_from_url(url, deadline=None):
+    """从URL下载并解析Word文档，提供deadline时下载超时不超过其剩余时间"""
+    # 下载Word文件
+    print("正在下载Word文件...")
+    word_content = download_word_from_url(url, deadline.remaining() if deadline is not None else None)
+    if deadline is not None:
+        deadline.check()
+    
+    # 解析Word文档
+    print("正在解析Word文档...")
+    return load_word_document(word_content)
+
+def word_to_html_array(url, max_length=MAX_FRAGMENT_LENGTH, max_fragments=None, timeout=None, partial=False):
+    """主函数：将Word文档从URL转换为HTML数组，max_fragments见document_to_html_array
+    
+    timeout为下载和转换的总秒数，默认为 API_CONFIG['timeout']，为0时不限时。
+    超时后立即停止并抛出 ConversionTimeout；partial为True时改为返回超时前已确定的片段。
+    """
+    print(f"开始处理URL: {url}")
+    print(f"最大片段长度: {max_length}")
+    deadline = conversion_deadline(timeout)
+    
+    doc = load_word_document_from_url(url, deadline)
+    
+    return document_to_html_array(doc, max_length, max_fragments, deadline, partial)
+
+def convert_word_url(url, max_length=MAX_FRAGMENT_LENGTH, **options):
+    """将Word文档从URL转换为完整HTML和片段位置，options见convert_document"""
+    print(f"开始处理URL: {url}")
+    print(f"最大片段长度: {max_length}")
+    
+    doc = load_word_document_from_url(url)
+    
+    return convert_document(doc, max_length, **options)